@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(ROOT))
+sys.path.insert(0, ROOT)
+
+from mock_api import load_sessions, start_server
+from suite import make_workspace, percentile
+
+
+async def client(path, workspace, turns, rounds, latencies):
+    # One simulated user: a single connection and session, replaying every
+    # scripted turn in order.
+    reader, writer = await asyncio.open_unix_connection(path)
+    session = None
+    for _ in range(rounds):
+        for user_input in turns:
+            start = time.perf_counter()
+            request = {"session": session, "cwd": workspace, "input": user_input}
+            writer.write(json.dumps(request).encode() + b"\n")
+            await writer.drain()
+            while True:
+                message = json.loads(await reader.readline())
+                if "error" in message:
+                    raise RuntimeError(message["error"])
+                if message.get("done"):
+                    session = message["session"]
+                    break
+            latencies.append(time.perf_counter() - start)
+    writer.close()
+    await writer.wait_closed()
+
+
+async def load(path, workspace, turns, sessions, rounds):
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(path, workspace, turns, rounds, latencies) for _ in range(sessions)))
+    return time.perf_counter() - start, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Jarvis daemon against the local mock API")
+    parser.add_argument("sessions", nargs="*", default=[os.path.join(ROOT, "sessions")])
+    parser.add_argument("--concurrency", default="1,2,4,8,16,32", help="comma-separated session counts")
+    parser.add_argument("--rounds", type=int, default=2, help="times each session replays the scripted turns")
+    parser.add_argument("--latency", type=float, default=0.02, help="mock API latency per request in seconds")
+    parser.add_argument("--token-delay", type=float, default=0.002, help="mock delay between streamed deltas")
+    parser.add_argument("--workers", type=int, help="daemon turn workers (default: JARVIS_DAEMON_WORKERS)")
+    args = parser.parse_args()
+
+    scripted = load_sessions(args.sessions)
+    turns = [turn["user"] for session in scripted for turn in session["turns"]]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = start_server(scripted, args.latency, args.token_delay)
+        os.environ.update(
+            OPENAI_BASE_URL=server.base_url,
+            OPENAI_API_KEY="sk-mock",
+            JARVIS_CACHE_DIR=os.path.join(tmp, "cache"),
+        )
+        workspace = os.path.join(tmp, "workspace")
+        make_workspace(workspace)
+
+        from jarvis import daemon, main_agent
+
+        kwargs = {"workers": args.workers} if args.workers else {}
+        jarvis_daemon = daemon.Daemon(main_agent.get_assistant_id(), {"directories": {}}, **kwargs)
+        path = os.path.join(tmp, "daemon.sock")
+        ready = threading.Event()
+        threading.Thread(
+            target=asyncio.run, args=(daemon.serve(jarvis_daemon, path, ready.set),), name="jarvis-daemon", daemon=True
+        ).start()
+        ready.wait()
+
+        print(f"{'sessions':>8} {'turns':>7} {'turns/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+        for sessions in [int(count) for count in args.concurrency.split(",")]:
+            elapsed, latencies = asyncio.run(load(path, workspace, turns, sessions, args.rounds))
+            print(
+                f"{sessions:>8} {len(latencies):>7} {len(latencies) / elapsed:>9.1f} "
+                f"{percentile(latencies, 0.5) * 1000:>9.1f} {percentile(latencies, 0.99) * 1000:>9.1f}"
+            )
+        jarvis_daemon.shutdown()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from jarvis.local_llm import LOCAL_MODEL, LocalLLM, load_model
+from jarvis.response_cache import ResponseCache
+
+MESSAGES = [
+    {"role": "system", "content": "You are a directory navigation assistant. Use the provided functions to navigate and list directory contents."},
+    {"role": "user", "content": "Explain in one sentence what a symbolic link is."},
+]
+QUERIES = [
+    ("change_directory", "go to the backup folder"),
+    ("read_file", "show me the last lines of server.log"),
+    ("search_files", "find TODO comments in python files"),
+    ("copy_file_or_directory", "copy notes.txt to archive/notes.txt"),
+]
+
+
+def measure(llm, call, runs):
+    timings, rates = [], []
+    for _ in range(runs):
+        call()
+        timings.append(llm.last_stats.seconds)
+        rates.append(llm.last_stats.tokens_per_second)
+    return statistics.median(timings), statistics.median(rates), llm.last_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure LocalLLM latency and throughput on CPU")
+    parser.add_argument("--model", default=LOCAL_MODEL)
+    parser.add_argument("--no-quantize", action="store_true", help="keep fp32 weights instead of int8")
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    quantize = not args.no_quantize
+
+    start = time.perf_counter()
+    load_model(args.model, quantize)
+    print(f"model load ({'int8' if quantize else 'fp32'}): {time.perf_counter() - start:.2f} s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # A zero-size response cache, so every call really runs the model.
+        cache = ResponseCache(os.path.join(tmp, "responses.sqlite3"), max_entries=0)
+        for prefix_cache in (False, True):
+            llm = LocalLLM(args.model, quantize, prefix_cache, args.max_new_tokens, cache)
+            label = "prefix cache" if prefix_cache else "no prefix cache"
+            seconds, rate, stats = measure(llm, lambda: llm.generate_text(MESSAGES), args.runs)
+            print(
+                f"generate_text, {label}: {seconds * 1000:.0f} ms, {rate:.1f} tokens/s "
+                f"({stats.prompt_tokens} prompt tokens, {stats.cached_tokens} cached)"
+            )
+            for tool, query in QUERIES:
+                seconds, _, stats = measure(llm, lambda: llm.extract_function_inputs(query, tool), args.runs)
+                print(
+                    f"extract {tool}, {label}: {seconds * 1000:.0f} ms "
+                    f"({stats.prompt_tokens} prompt tokens, {stats.cached_tokens} cached, "
+                    f"{stats.generated_tokens} generated) -> {llm.extract_function_inputs(query, tool)}"
+                )
+
+
+if __name__ == "__main__":
+    main()
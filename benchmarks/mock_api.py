@@ -0,0 +1,521 @@
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+# A local stand-in for the parts of the OpenAI API that Jarvis uses:
+# assistants, threads, messages, streamed runs with requires_action and
+# submit_tool_outputs, chat completions and embeddings. Replies come from
+# scripted sessions; with an upstream URL it proxies instead and records
+# what the real API did into the same session format.
+#
+# Session files look like:
+#   {"name": "navigation", "turns": [
+#       {"user": "what is in here?",
+#        "steps": [{"tool_calls": [{"name": "list_directory_contents", "arguments": {}}]},
+#                  {"text": "There are three files."}]}]}
+
+EMBEDDING_DIM = 64
+DEFAULT_REPLY = "OK."
+# Jarvis's session mode prefixes a message with a state header, ended by a
+# blank line. It is stripped to find the scripted turn; the turn's steps
+# still play back as recorded.
+STATE_HEADER = "[Session state]"
+
+
+def load_sessions(paths: List[str]) -> List[Dict[str, Any]]:
+    sessions = []
+    for path in paths:
+        if os.path.isdir(path):
+            sessions.extend(load_sessions(sorted(
+                os.path.join(path, name) for name in os.listdir(path) if name.endswith(".json")
+            )))
+        else:
+            with open(path) as session_file:
+                sessions.append(json.load(session_file))
+    return sessions
+
+
+def _embedding(text: str) -> List[float]:
+    # Hashed bag of words: stable across runs and similar for similar text.
+    vector = [0.0] * EMBEDDING_DIM
+    for word in re.findall(r"\w+", text.lower()):
+        digest = hashlib.blake2b(word.encode("utf-8"), digest_size=4).digest()
+        vector[int.from_bytes(digest[:2], "little") % EMBEDDING_DIM] += 1.0 if digest[2] & 1 else -1.0
+    norm = sum(value * value for value in vector) ** 0.5 or 1.0
+    return [value / norm for value in vector]
+
+
+class MockState:
+    def __init__(self, sessions: List[Dict[str, Any]], latency: float = 0.0, token_delay: float = 0.0):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.turns: Dict[str, List[Dict[str, Any]]] = {}
+        self.completions: Dict[str, str] = {}
+        for session in sessions:
+            for turn in session.get("turns", []):
+                self.turns[turn["user"]] = turn["steps"]
+            self.completions.update(session.get("completions", {}))
+        self.assistants: Dict[str, Dict[str, Any]] = {}
+        self.threads: Dict[str, List[Dict[str, Any]]] = {}
+        self.runs: Dict[str, Dict[str, Any]] = {}
+        self.requests: Dict[str, int] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def new_id(self, prefix: str) -> str:
+        return f"{prefix}_mock{next(self._ids)}"
+
+    def count(self, endpoint: str) -> None:
+        with self._lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+
+
+def _split_header(content: str) -> Tuple[str, str]:
+    if content.startswith(STATE_HEADER) and "\n\n" in content:
+        header, _, text = content.partition("\n\n")
+        return header, text
+    return "", content
+
+
+def _tokens(text: str) -> int:
+    # Roughly four characters per token, which is close enough to compare runs.
+    return (len(text) + 3) // 4
+
+
+def _assistant(assistant_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": assistant_id,
+        "object": "assistant",
+        "created_at": int(time.time()),
+        "name": body.get("name"),
+        "description": None,
+        "model": body.get("model", "gpt-4-turbo"),
+        "instructions": body.get("instructions"),
+        "tools": body.get("tools", []),
+        "metadata": {},
+    }
+
+
+def _message(message_id: str, thread_id: str, role: str, text: Optional[str], run_id: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "id": message_id,
+        "object": "thread.message",
+        "created_at": int(time.time()),
+        "thread_id": thread_id,
+        "role": role,
+        "status": "completed" if text is not None else "in_progress",
+        "content": [] if text is None else [{"type": "text", "text": {"value": text, "annotations": []}}],
+        "assistant_id": None,
+        "run_id": run_id,
+        "attachments": [],
+        "metadata": {},
+    }
+
+
+def _run(run: Dict[str, Any], status: str, required_action: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    return {
+        "id": run["id"],
+        "object": "thread.run",
+        "created_at": run["created_at"],
+        "thread_id": run["thread_id"],
+        "assistant_id": run["assistant_id"],
+        "status": status,
+        "required_action": required_action,
+        "last_error": None,
+        "model": run.get("model", "gpt-4-turbo"),
+        "instructions": "",
+        "tools": [],
+        "metadata": {},
+        "parallel_tool_calls": True,
+        "usage": run.get("usage") if status == "completed" else None,
+    }
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "JarvisMock/1.0"
+    upstream: Optional[str] = None
+    state: MockState = None
+    recorder: Optional["Recorder"] = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        self._raw_body = raw
+        return json.loads(raw) if raw else {}
+
+    def _send_json(self, payload: Dict[str, Any], status: int = 200) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _start_stream(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _event(self, event: str, data: Any) -> None:
+        payload = data if isinstance(data, str) else json.dumps(data)
+        self._chunk(f"event: {event}\ndata: {payload}\n\n".encode("utf-8"))
+
+    def _end_stream(self) -> None:
+        self._event("done", "[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+    def _handle(self, method: str) -> None:
+        path = self.path.split("?", 1)[0]
+        if path.startswith("/v1"):
+            path = path[3:]
+        body = self._body()
+        if self.upstream is not None:
+            self._proxy(method, path, body)
+            return
+        if self.state.latency:
+            time.sleep(self.state.latency)
+
+        for pattern, handler_name in ROUTES:
+            match = re.fullmatch(pattern, f"{method} {path}")
+            if match:
+                self.state.count(handler_name)
+                getattr(self, handler_name)(body, *match.groups())
+                return
+        self._send_json({"error": {"message": f"Mock has no route for {method} {path}", "type": "invalid_request_error"}}, 404)
+
+    def create_assistant(self, body):
+        assistant = _assistant(self.state.new_id("asst"), body)
+        self.state.assistants[assistant["id"]] = assistant
+        self._send_json(assistant)
+
+    def update_assistant(self, body, assistant_id):
+        if assistant_id not in self.state.assistants:
+            self._send_json({"error": {"message": f"No assistant found with id '{assistant_id}'.", "type": "invalid_request_error"}}, 404)
+            return
+        assistant = _assistant(assistant_id, {**self.state.assistants[assistant_id], **body})
+        self.state.assistants[assistant_id] = assistant
+        self._send_json(assistant)
+
+    def get_assistant(self, body, assistant_id):
+        if assistant_id not in self.state.assistants:
+            self._send_json({"error": {"message": "not found", "type": "invalid_request_error"}}, 404)
+            return
+        self._send_json(self.state.assistants[assistant_id])
+
+    def delete_assistant(self, body, assistant_id):
+        deleted = self.state.assistants.pop(assistant_id, None) is not None
+        self._send_json({"id": assistant_id, "object": "assistant.deleted", "deleted": deleted})
+
+    def create_thread(self, body):
+        thread_id = self.state.new_id("thread")
+        self.state.threads[thread_id] = []
+        for message in body.get("messages", []):
+            self.state.threads[thread_id].append(message)
+        self._send_json({"id": thread_id, "object": "thread", "created_at": int(time.time()), "metadata": {}})
+
+    def create_message(self, body, thread_id):
+        content = body.get("content")
+        if isinstance(content, list):
+            content = "".join(part.get("text", "") for part in content if isinstance(part, dict))
+        self.state.threads.setdefault(thread_id, []).append({"role": body.get("role", "user"), "content": content})
+        self._send_json(_message(self.state.new_id("msg"), thread_id, body.get("role", "user"), content))
+
+    def create_run(self, body, thread_id):
+        if body.get("assistant_id") not in self.state.assistants:
+            message = f"No assistant found with id '{body.get('assistant_id')}'."
+            self._send_json({"error": {"message": message, "type": "invalid_request_error"}}, 404)
+            return
+        user_messages = [m["content"] for m in self.state.threads.get(thread_id, []) if m["role"] == "user"]
+        # Scripted steps play back as recorded whatever the header says; how
+        # a real model uses the header is only known from recorded sessions.
+        _, user = _split_header(user_messages[-1] if user_messages else "")
+        steps = list(self.state.turns.get(user, [{"text": DEFAULT_REPLY}]))
+        run = {
+            "id": self.state.new_id("run"),
+            "created_at": int(time.time()),
+            "thread_id": thread_id,
+            "assistant_id": body.get("assistant_id"),
+            "steps": steps or [{"text": DEFAULT_REPLY}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+        self.state.runs[run["id"]] = run
+        self._stream_run(run, created=True)
+
+    def submit_tool_outputs(self, body, thread_id, run_id):
+        run = self.state.runs.get(run_id)
+        if run is None:
+            self._send_json({"error": {"message": "run not found", "type": "invalid_request_error"}}, 404)
+            return
+        run["tool_outputs"] = body.get("tool_outputs", [])
+        thread = self.state.threads.setdefault(thread_id, [])
+        for output in run["tool_outputs"]:
+            thread.append({"role": "tool", "content": output.get("output", "")})
+        self._stream_run(run, created=False)
+
+    def _charge(self, run: Dict[str, Any], completion: str) -> None:
+        # Every model call reads the instructions, the tool schemas and the
+        # whole thread so far, so long threads cost more per call.
+        assistant = self.state.assistants.get(run["assistant_id"], {})
+        prompt = _tokens((assistant.get("instructions") or "") + json.dumps(assistant.get("tools", [])))
+        prompt += sum(_tokens(str(message.get("content") or "")) for message in self.state.threads.get(run["thread_id"], []))
+        usage = run["usage"]
+        usage["prompt_tokens"] += prompt
+        usage["completion_tokens"] += _tokens(completion)
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+    def _stream_run(self, run: Dict[str, Any], created: bool) -> None:
+        self._start_stream()
+        if created:
+            self._event("thread.run.created", _run(run, "queued"))
+        self._event("thread.run.in_progress", _run(run, "in_progress"))
+        step = run["steps"].pop(0) if run["steps"] else {"text": DEFAULT_REPLY}
+
+        if "tool_calls" in step:
+            calls = [
+                {
+                    "id": self.state.new_id("call"),
+                    "type": "function",
+                    "function": {"name": call["name"], "arguments": json.dumps(call.get("arguments", {}))},
+                }
+                for call in step["tool_calls"]
+            ]
+            action = {"type": "submit_tool_outputs", "submit_tool_outputs": {"tool_calls": calls}}
+            self._charge(run, json.dumps(calls))
+            self._event("thread.run.requires_action", _run(run, "requires_action", action))
+            self._end_stream()
+            return
+
+        message_id = self.state.new_id("msg")
+        self._event("thread.message.created", _message(message_id, run["thread_id"], "assistant", None, run["id"]))
+        self._event("thread.message.in_progress", _message(message_id, run["thread_id"], "assistant", None, run["id"]))
+        text = step.get("text", DEFAULT_REPLY)
+        self._charge(run, text)
+        self.state.threads.setdefault(run["thread_id"], []).append({"role": "assistant", "content": text})
+        for index, piece in enumerate(re.findall(r"\S+\s*|\s+", text)):
+            if index and self.state.token_delay:
+                time.sleep(self.state.token_delay)
+            self._event("thread.message.delta", {
+                "id": message_id,
+                "object": "thread.message.delta",
+                "delta": {"content": [{"index": 0, "type": "text", "text": {"value": piece, "annotations": []}}]},
+            })
+        self._event("thread.message.completed", _message(message_id, run["thread_id"], "assistant", text, run["id"]))
+        self._event("thread.run.completed", _run(run, "completed"))
+        self._end_stream()
+
+    def chat_completion(self, body):
+        messages = body.get("messages", [])
+        last = messages[-1].get("content", "") if messages else ""
+        content = self.state.completions.get(last, DEFAULT_REPLY)
+        self._send_json({
+            "id": self.state.new_id("chatcmpl"),
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-3.5-turbo"),
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+    def embeddings(self, body):
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        self._send_json({
+            "object": "list",
+            "model": body.get("model", "text-embedding-ada-002"),
+            "data": [{"object": "embedding", "index": i, "embedding": _embedding(text)} for i, text in enumerate(inputs)],
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        })
+
+    def _proxy(self, method: str, path: str, body: Dict[str, Any]) -> None:
+        headers = {
+            key: value for key, value in self.headers.items()
+            if key.lower() in ("authorization", "content-type", "openai-beta", "openai-organization")
+        }
+        request = self.recorder.client.build_request(
+            method, f"{self.upstream}{path}", headers=headers, content=self._raw_body or None
+        )
+        response = self.recorder.client.send(request, stream=True)
+        try:
+            if "text/event-stream" not in response.headers.get("content-type", ""):
+                data = response.read()
+                self.send_response(response.status_code)
+                self.send_header("Content-Type", response.headers.get("content-type", "application/json"))
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                if response.status_code < 400:
+                    self.recorder.observe(method, path, body, json.loads(data) if data else {})
+                return
+            self.send_response(response.status_code)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            event = None
+            for line in response.iter_lines():
+                self._chunk((line + "\n").encode("utf-8"))
+                if line.startswith("event: "):
+                    event = line[7:]
+                elif line.startswith("data: ") and event is not None:
+                    self.recorder.stream_event(event, line[6:])
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        finally:
+            response.close()
+
+
+ROUTES = [
+    (r"POST /assistants", "create_assistant"),
+    (r"POST /assistants/([^/]+)", "update_assistant"),
+    (r"GET /assistants/([^/]+)", "get_assistant"),
+    (r"DELETE /assistants/([^/]+)", "delete_assistant"),
+    (r"POST /threads", "create_thread"),
+    (r"POST /threads/([^/]+)/messages", "create_message"),
+    (r"POST /threads/([^/]+)/runs", "create_run"),
+    (r"POST /threads/([^/]+)/runs/([^/]+)/submit_tool_outputs", "submit_tool_outputs"),
+    (r"POST /chat/completions", "chat_completion"),
+    (r"POST /embeddings", "embeddings"),
+]
+
+
+class Recorder:
+    # Turns proxied traffic back into scripted session turns.
+
+    def __init__(self, path: str, name: str):
+        import httpx
+
+        self.path = path
+        self.session = {"name": name, "turns": [], "completions": {}}
+        self.client = httpx.Client(timeout=httpx.Timeout(120.0, connect=10.0))
+        self._pending_user: Dict[str, str] = {}
+        self._turn: Optional[Dict[str, Any]] = None
+        self._text: List[str] = []
+        self._lock = threading.Lock()
+
+    def observe(self, method: str, path: str, body: Dict[str, Any], response: Dict[str, Any]) -> None:
+        with self._lock:
+            if re.fullmatch(r"/threads/[^/]+/messages", path) and body.get("role", "user") == "user":
+                self._pending_user[path.split("/")[2]] = _split_header(body.get("content") or "")[1]
+            elif path == "/chat/completions":
+                messages = body.get("messages", [])
+                if messages and response.get("choices"):
+                    self.session["completions"][messages[-1].get("content", "")] = (
+                        response["choices"][0]["message"].get("content")
+                    )
+                    self._save()
+
+    def stream_event(self, event: str, data: str) -> None:
+        if data == "[DONE]":
+            return
+        payload = json.loads(data)
+        with self._lock:
+            if event == "thread.run.created":
+                user = self._pending_user.pop(payload.get("thread_id"), "")
+                self._turn = {"user": user, "steps": []}
+                self.session["turns"].append(self._turn)
+            elif self._turn is None:
+                return
+            elif event == "thread.run.requires_action":
+                calls = payload["required_action"]["submit_tool_outputs"]["tool_calls"]
+                self._turn["steps"].append({"tool_calls": [
+                    {"name": call["function"]["name"], "arguments": json.loads(call["function"]["arguments"] or "{}")}
+                    for call in calls
+                ]})
+            elif event == "thread.message.delta":
+                for part in payload["delta"].get("content", []):
+                    self._text.append(part.get("text", {}).get("value", ""))
+            elif event in ("thread.run.completed", "thread.run.failed", "thread.run.cancelled"):
+                if self._text:
+                    self._turn["steps"].append({"text": "".join(self._text)})
+                self._text = []
+                self._turn = None
+                self._save()
+
+    def _save(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as session_file:
+            json.dump(self.session, session_file, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def start_server(
+    sessions: Optional[List[Dict[str, Any]]] = None,
+    latency: float = 0.0,
+    token_delay: float = 0.0,
+    host: str = "127.0.0.1",
+    port: int = 0,
+    upstream: Optional[str] = None,
+    record_path: Optional[str] = None,
+):
+    state = MockState(sessions or [], latency, token_delay)
+    recorder = None
+    if upstream is not None:
+        name = os.path.splitext(os.path.basename(record_path or "recorded"))[0]
+        recorder = Recorder(record_path or "recorded.json", name)
+    handler = type("Handler", (MockHandler,), {
+        "state": state,
+        "upstream": upstream.rstrip("/") if upstream else None,
+        "recorder": recorder,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="jarvis-mock-api", daemon=True)
+    thread.start()
+    server.state = state
+    server.base_url = f"http://{host}:{server.server_port}/v1"
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the OpenAI Assistants and Chat APIs")
+    parser.add_argument("sessions", nargs="*", default=[os.path.join(os.path.dirname(os.path.abspath(__file__)), "sessions")])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added before every response")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds between streamed text deltas")
+    parser.add_argument("--upstream", help="proxy to this API base URL (e.g. https://api.openai.com/v1) and record")
+    parser.add_argument("--record", help="session file written while proxying")
+    args = parser.parse_args()
+
+    server = start_server(
+        load_sessions(args.sessions) if not args.upstream else [],
+        args.latency,
+        args.token_delay,
+        port=args.port,
+        upstream=args.upstream,
+        record_path=args.record,
+    )
+    print(f"Mock API listening on {server.base_url}; set OPENAI_BASE_URL to use it")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(ROOT))
+sys.path.insert(0, ROOT)
+
+from mock_api import load_sessions, start_server
+from suite import make_workspace, percentile
+
+
+def counter_total(telemetry, name):
+    return sum(telemetry.counters.get(name, {}).values())
+
+
+def replay(sessions, workspace, server, session_mode, budget):
+    # Plays every scripted session from the workspace root, one conversation
+    # per session, and returns per-turn averages.
+    from jarvis import main_agent
+    from jarvis.conversation import Conversation
+    from jarvis.telemetry import telemetry
+    from jarvis.tools import ToolContext
+
+    assistant_id = main_agent.get_assistant_id()
+    rounds = counter_total(telemetry, "jarvis_model_round_trips_total")
+    tokens = counter_total(telemetry, "jarvis_tokens_total")
+    requests = sum(server.state.requests.values())
+    turns = []
+    for session in sessions:
+        context = ToolContext(workspace, {"directories": {}})
+        conversation = Conversation(context, budget=budget) if session_mode else None
+        for turn in session["turns"]:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                if conversation is not None:
+                    main_agent.run_session_turn(assistant_id, conversation, turn["user"])
+                else:
+                    main_agent.run_turn(assistant_id, turn["user"], context=context)
+            turns.append(time.perf_counter() - start)
+
+    count = len(turns)
+    return {
+        "round trips per turn": (counter_total(telemetry, "jarvis_model_round_trips_total") - rounds) / count,
+        "API requests per turn": (sum(server.state.requests.values()) - requests) / count,
+        "tokens per turn": (counter_total(telemetry, "jarvis_tokens_total") - tokens) / count,
+        "turn p50 ms": percentile(turns, 0.5) * 1000,
+        "turn mean ms": statistics.mean(turns) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare a new thread per input with session mode against the mock API")
+    parser.add_argument("sessions", nargs="*", default=[os.path.join(ROOT, "sessions")])
+    parser.add_argument("--latency", type=float, default=0.02, help="mock API latency per request in seconds")
+    parser.add_argument("--token-delay", type=float, default=0.002, help="mock delay between streamed deltas")
+    parser.add_argument("--budget", type=int, default=12000, help="session mode thread token budget")
+    args = parser.parse_args()
+
+    scripted = load_sessions(args.sessions)
+    with tempfile.TemporaryDirectory() as tmp:
+        server = start_server(scripted, args.latency, args.token_delay)
+        os.environ.update(
+            OPENAI_BASE_URL=server.base_url,
+            OPENAI_API_KEY="sk-mock",
+            JARVIS_CACHE_DIR=os.path.join(tmp, "cache"),
+        )
+        workspace = os.path.join(tmp, "workspace")
+        make_workspace(workspace)
+
+        per_input = replay(scripted, workspace, server, False, args.budget)
+        session = replay(scripted, workspace, server, True, args.budget)
+        server.shutdown()
+
+    print(f"{'':<24} {'thread per input':>17} {'session mode':>13} {'change':>8}")
+    for name, before in per_input.items():
+        after = session[name]
+        change = (after - before) / before * 100 if before else 0.0
+        print(f"{name:<24} {before:>17.2f} {after:>13.2f} {change:>+7.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from jarvis.assistant_cache import get_or_create_assistant
+from jarvis.main_agent import INSTRUCTIONS, MODEL, TOOLS
+
+
+class SlowAssistants:
+    # Stands in for client.beta.assistants with a fixed network round trip.
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    def create(self, **kwargs):
+        time.sleep(self.latency)
+        self.calls += 1
+        return SimpleNamespace(id=f"asst_bench_{self.calls}")
+
+    def update(self, assistant_id, **kwargs):
+        time.sleep(self.latency)
+        self.calls += 1
+        return SimpleNamespace(id=assistant_id)
+
+
+def time_import(runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", "import jarvis.main_agent"], cwd=ROOT, check=True
+        )
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def time_assistant(latency, runs):
+    assistants = SlowAssistants(latency)
+    client = SimpleNamespace(api_key="bench", beta=SimpleNamespace(assistants=assistants))
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, "assistants.json")
+
+        start = time.perf_counter()
+        get_or_create_assistant(client, MODEL, INSTRUCTIONS, TOOLS, cache_path)
+        cold = time.perf_counter() - start
+
+        warm = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            get_or_create_assistant(client, MODEL, INSTRUCTIONS, TOOLS, cache_path)
+            warm.append(time.perf_counter() - start)
+    return cold, min(warm), assistants.calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure Jarvis cold and warm startup")
+    parser.add_argument("--latency", type=float, default=0.4, help="simulated assistants API round trip in seconds")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    import_time = time_import(args.runs)
+    cold, warm, calls = time_assistant(args.latency, args.runs)
+
+    print(f"import jarvis.main_agent: {import_time * 1000:.1f} ms (no network)")
+    print(f"assistant cold start:     {cold * 1000:.1f} ms")
+    print(f"assistant warm start:     {warm * 1000:.3f} ms")
+    print(f"assistants API calls:     {calls} over {args.runs + 1} starts")
+    print(f"warm speedup:             {cold / warm:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
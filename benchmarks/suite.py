@@ -0,0 +1,212 @@
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(ROOT))
+sys.path.insert(0, ROOT)
+
+from mock_api import load_sessions, start_server
+
+WORKSPACE = {
+    "README.md": "# Demo project\n\nA small tree for the Jarvis benchmarks.\n",
+    "notes.txt": "TODO: rotate logs\nTODO: add tests\nTODO: tidy utils\n",
+    "src/app.py": "from utils import greet\n\n\ndef main():\n    print(greet('world'))\n\n\nif __name__ == '__main__':\n    main()\n",
+    "src/utils.py": "def greet(name):\n    return f'Hello, {name}!'\n",
+    "logs/server.log": "".join(f"2024-01-01 12:00:{i % 60:02d} INFO request {i} served\n" for i in range(5000)) + "shutdown complete\n",
+    "logs/worker.log": "worker started\nworker stopped\n",
+}
+
+DISPATCH_CALLS = [
+    ("get_current_directory", {}),
+    ("list_directory_contents", {}),
+    ("read_file", {"file_path": "README.md"}),
+    ("read_file", {"file_path": "logs/server.log", "mode": "tail"}),
+    ("search_files", {"pattern": "def main"}),
+    ("find_files", {"pattern": "*.log"}),
+    ("change_directory", {"directory": "."}),
+]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def make_workspace(path):
+    for name, content in WORKSPACE.items():
+        full_path = os.path.join(path, name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "w") as workspace_file:
+            workspace_file.write(content)
+
+
+def time_startup(base_url, runs, tmp):
+    # A fresh process each time: import, client setup and the assistant
+    # lookup. Cold starts have an empty cache and create the assistant.
+    command = [sys.executable, "-c", "from jarvis.main_agent import get_assistant_id; get_assistant_id()"]
+    env = dict(os.environ, OPENAI_BASE_URL=base_url, OPENAI_API_KEY="sk-mock")
+    cold, warm = [], []
+    for run in range(runs):
+        env["JARVIS_CACHE_DIR"] = os.path.join(tmp, f"startup-{run}")
+        for timings in (cold, warm):
+            start = time.perf_counter()
+            subprocess.run(command, cwd=os.path.dirname(ROOT), env=env, check=True)
+            timings.append(time.perf_counter() - start)
+    return statistics.median(cold), statistics.median(warm)
+
+
+def time_dispatch(registry, context_factory, runs):
+    results = {}
+    for name, arguments in DISPATCH_CALLS:
+        payload = json.dumps(arguments)
+        label = f"{name}({', '.join(f'{k}={v}' for k, v in arguments.items())})"
+        context = context_factory()
+        registry.call(context, name, payload)
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            registry.call(context, name, payload)
+            timings.append(time.perf_counter() - start)
+        results[label] = statistics.median(timings)
+    return results
+
+
+def run_sessions(sessions, workspace, runs):
+    from jarvis import main_agent
+    from jarvis.tools import ToolContext
+
+    class TimedHandler(main_agent.EventHandler):
+        first_token = None
+        rounds = 0
+
+        def on_event(self, event):
+            if event.event == "thread.run.in_progress":
+                TimedHandler.rounds += 1
+            super().on_event(event)
+
+        def on_text_delta(self, delta, snapshot):
+            if TimedHandler.first_token is None:
+                TimedHandler.first_token = time.perf_counter()
+
+    assistant_id = main_agent.get_assistant_id()
+    turns, first_tokens, per_session, rounds = [], [], {}, []
+    for _ in range(runs):
+        for session in sessions:
+            main_agent._context = ToolContext(workspace, main_agent.get_config())
+            session_times = per_session.setdefault(session["name"], [])
+            for turn in session["turns"]:
+                TimedHandler.first_token = None
+                TimedHandler.rounds = 0
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    main_agent.run_turn(assistant_id, turn["user"], TimedHandler)
+                elapsed = time.perf_counter() - start
+                turns.append(elapsed)
+                session_times.append(elapsed)
+                rounds.append(TimedHandler.rounds)
+                if TimedHandler.first_token is not None:
+                    first_tokens.append(TimedHandler.first_token - start)
+    return turns, first_tokens, per_session, rounds
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, previous_path):
+    with open(previous_path) as previous_file:
+        previous = json.load(previous_file)
+    print(f"\nCompared with {os.path.basename(previous_path)} ({previous.get('revision') or 'unknown revision'}):")
+    for name, value in current["metrics"].items():
+        before = previous.get("metrics", {}).get(name)
+        if before:
+            change = (value - before) / before * 100
+            print(f"  {name:<60} {before * 1000:10.3f} -> {value * 1000:10.3f} ms ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Jarvis benchmarks against the local mock API")
+    parser.add_argument("sessions", nargs="*", default=[os.path.join(ROOT, "sessions")])
+    parser.add_argument("--latency", type=float, default=0.02, help="mock API latency per request in seconds")
+    parser.add_argument("--token-delay", type=float, default=0.002, help="mock delay between streamed deltas")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--results-dir", help="where results are stored (default: <cache dir>/benchmarks)")
+    parser.add_argument("--compare", help="results file to compare against (default: the previous run)")
+    parser.add_argument("--label", default="")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results_dir = args.results_dir or os.path.join(
+            os.getenv("JARVIS_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "jarvis"), "benchmarks"
+        )
+        os.makedirs(results_dir, exist_ok=True)
+
+        server = start_server(load_sessions(args.sessions), args.latency, args.token_delay)
+        os.environ.update(
+            OPENAI_BASE_URL=server.base_url,
+            OPENAI_API_KEY="sk-mock",
+            JARVIS_CACHE_DIR=os.path.join(tmp, "cache"),
+        )
+        workspace = os.path.join(tmp, "workspace")
+        make_workspace(workspace)
+
+        from jarvis.tools import ToolContext, registry
+
+        metrics = {}
+        cold, warm = time_startup(server.base_url, max(1, args.runs // 2), tmp)
+        metrics["startup.cold"] = cold
+        metrics["startup.warm"] = warm
+        for label, seconds in time_dispatch(registry, lambda: ToolContext(workspace, {"directories": {}}), args.runs * 20).items():
+            metrics[f"dispatch.{label}"] = seconds
+
+        sessions = load_sessions(args.sessions)
+        turns, first_tokens, per_session, rounds = run_sessions(sessions, workspace, args.runs)
+        metrics["turn.p50"] = percentile(turns, 0.5)
+        metrics["turn.p95"] = percentile(turns, 0.95)
+        metrics["first_token.p50"] = percentile(first_tokens, 0.5)
+        metrics["first_token.p95"] = percentile(first_tokens, 0.95)
+        for name, timings in per_session.items():
+            metrics[f"session.{name}.p50"] = percentile(timings, 0.5)
+        server.shutdown()
+
+    result = {
+        "label": args.label,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "config": {"latency": args.latency, "token_delay": args.token_delay, "runs": args.runs},
+        "requests": dict(server.state.requests),
+        "rounds_per_turn": statistics.mean(rounds) if rounds else 0,
+        "metrics": metrics,
+    }
+
+    for name, value in metrics.items():
+        print(f"{name:<60} {value * 1000:10.3f} ms")
+    print(f"{'model round trips per turn':<60} {result['rounds_per_turn']:10.2f}")
+
+    previous = sorted(glob.glob(os.path.join(results_dir, "*.json")))
+    path = os.path.join(results_dir, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    with open(path, "w") as result_file:
+        json.dump(result, result_file, indent=2)
+    print(f"\nResults saved to {path}")
+
+    baseline = args.compare or (previous[-1] if previous else None)
+    if baseline:
+        compare(result, baseline)
+
+
+if __name__ == "__main__":
+    main()
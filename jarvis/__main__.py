@@ -0,0 +1,3 @@
+from .main_agent import main
+
+main()
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from openai import NotFoundError
+
+from .paths import cache_dir
+
+
+def schema_hash(model: str, instructions: str, tools: List[Dict[str, Any]]) -> str:
+    payload = json.dumps(
+        {"model": model, "instructions": instructions, "tools": tools},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _account_key(api_key: Optional[str]) -> str:
+    # Assistants are scoped to an account, so never reuse an ID across keys.
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+
+def _load(path: str) -> Dict[str, Any]:
+    try:
+        with open(path) as cache_file:
+            return json.load(cache_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save(path: str, data: Dict[str, Any]) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as cache_file:
+        json.dump(data, cache_file, indent=2)
+    os.replace(tmp_path, path)
+
+
+def get_or_create_assistant(
+    client,
+    model: str,
+    instructions: str,
+    tools: List[Dict[str, Any]],
+    cache_path: Optional[str] = None,
+    stale: Optional[str] = None,
+) -> str:
+    # `stale` names an assistant the API no longer knows; its cache entry is
+    # dropped and a new assistant created, unless another process already
+    # replaced it.
+    if cache_path is None:
+        cache_path = os.path.join(cache_dir(), "assistants.json")
+
+    digest = schema_hash(model, instructions, tools)
+    account = _account_key(client.api_key)
+    cache = _load(cache_path)
+    entry = cache.get(account, {})
+    if stale is not None and entry.get("assistant_id") == stale:
+        entry = {}
+
+    if entry.get("hash") == digest and entry.get("assistant_id"):
+        return entry["assistant_id"]
+
+    assistant_id = None
+    if entry.get("assistant_id"):
+        # The schema changed: update the existing assistant in place rather
+        # than leaving another orphan behind.
+        try:
+            assistant_id = client.beta.assistants.update(
+                entry["assistant_id"],
+                instructions=instructions,
+                model=model,
+                tools=tools,
+            ).id
+        except NotFoundError:
+            assistant_id = None
+
+    if assistant_id is None:
+        assistant_id = client.beta.assistants.create(
+            instructions=instructions,
+            model=model,
+            tools=tools,
+        ).id
+
+    cache[account] = {"assistant_id": assistant_id, "hash": digest}
+    _save(cache_path, cache)
+    return assistant_id
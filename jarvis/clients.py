@@ -0,0 +1,88 @@
+import asyncio
+import os
+import threading
+import weakref
+from typing import Dict, Optional
+
+import httpx
+from dotenv import load_dotenv
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+
+TIMEOUT = float(os.getenv("JARVIS_OPENAI_TIMEOUT", "60"))
+CONNECT_TIMEOUT = float(os.getenv("JARVIS_OPENAI_CONNECT_TIMEOUT", "5"))
+MAX_RETRIES = int(os.getenv("JARVIS_OPENAI_MAX_RETRIES", "4"))
+MAX_CONNECTIONS = int(os.getenv("JARVIS_OPENAI_MAX_CONNECTIONS", "32"))
+KEEPALIVE_SECONDS = 60.0
+
+_lock = threading.Lock()
+_env_loaded = False
+_clients: Dict[Optional[str], OpenAI] = {}
+# httpx async pools belong to the event loop that opened their connections,
+# so async clients are shared per loop rather than per process.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Optional[str], AsyncOpenAI]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_SECONDS,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(TIMEOUT, connect=CONNECT_TIMEOUT)
+
+
+def _api_key(api_key: Optional[str]) -> Optional[str]:
+    global _env_loaded
+    if api_key is None:
+        if not _env_loaded:
+            load_dotenv()
+            _env_loaded = True
+        api_key = os.getenv("OPENAI_API_KEY")
+    return api_key
+
+
+def get_openai_client(api_key: Optional[str] = None) -> OpenAI:
+    # The SDK retries connection errors, 408, 409, 429 and 5xx responses
+    # with jittered exponential backoff and honours Retry-After.
+    api_key = _api_key(api_key)
+    with _lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = OpenAI(
+                api_key=api_key,
+                timeout=_timeout(),
+                max_retries=MAX_RETRIES,
+                http_client=DefaultHttpxClient(limits=_limits(), timeout=_timeout()),
+            )
+            _clients[api_key] = client
+    return client
+
+
+def get_async_openai_client(api_key: Optional[str] = None) -> AsyncOpenAI:
+    api_key = _api_key(api_key)
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(api_key)
+        if client is None:
+            client = AsyncOpenAI(
+                api_key=api_key,
+                timeout=_timeout(),
+                max_retries=MAX_RETRIES,
+                http_client=DefaultAsyncHttpxClient(limits=_limits(), timeout=_timeout()),
+            )
+            clients[api_key] = client
+    return client
+
+
+async def close_async_clients() -> None:
+    # Nothing else closes a loop's pool: call this before the loop ends.
+    with _lock:
+        clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.close()
@@ -0,0 +1,87 @@
+import os
+from collections import Counter
+from typing import Dict, List, Optional
+
+DEFAULT_BUDGET = int(os.getenv("JARVIS_TOOL_TOKEN_BUDGET", "4000"))
+# Tools that already page their output get room for a full page.
+TOOL_BUDGETS = {
+    "read_file": 20000,
+    "job_output": 20000,
+    "execute_file": 20000,
+    "read_script_output": 20000,
+}
+CHARS_PER_TOKEN = 4
+SUMMARY_GROUPS = 3
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def describe(item: str, noun: str = "lines") -> str:
+    item = item.strip()
+    if item.endswith("/"):
+        return "directories"
+    # "path:line: text" from searches, "name  size  mtime" from listings.
+    name = item.split(":", 1)[0] if ":" in item else item
+    name = name.split()[0].rstrip("@") if name.split() else ""
+    ext = os.path.splitext(name)[1].lower()
+    if 1 < len(ext) <= 10 and ext[1:].isalnum():
+        return f"{ext} files"
+    return noun
+
+
+def summarize(items: List[str], noun: str = "lines") -> str:
+    counts = Counter(describe(item, noun) for item in items)
+    rest = counts.pop(noun, 0)
+    groups = counts.most_common()
+    parts = [f"+{count:,} more {label}" for label, count in groups[:SUMMARY_GROUPS]]
+    rest += sum(count for _, count in groups[SUMMARY_GROUPS:])
+    if rest:
+        parts.append(f"+{rest:,} {'other' if parts else 'more'} {noun}")
+    return ", ".join(parts)
+
+
+def compact(text: str, budget: int) -> str:
+    if estimate_tokens(text) <= budget:
+        return text
+    max_chars = budget * CHARS_PER_TOKEN
+
+    lines = text.split("\n")
+    footer = ""
+    if len(lines) > 1 and lines[-1].startswith("[") and lines[-1].endswith("]"):
+        footer = "\n" + lines.pop()
+    if len(lines) == 1 and ", " in lines[0]:
+        items, separator, noun = lines[0].split(", "), ", ", "entries"
+    else:
+        items, separator, noun = lines, "\n", "lines"
+
+    kept, used = [], 0
+    for item in items:
+        if used + len(item) + len(separator) > max_chars:
+            break
+        kept.append(item)
+        used += len(item) + len(separator)
+
+    if "cursor=" in footer:
+        # The cursor continues after the whole page, so it would skip the
+        # items dropped here; send the model back for a smaller page instead.
+        footer = "\n[the page was cut short and its cursor dropped; read it again with a smaller page]"
+    if not kept:
+        # One enormous item: cut it on a character boundary instead.
+        return (
+            f"{text[:max_chars]}\n"
+            f"[truncated to fit ~{budget:,} tokens: +{len(text) - max_chars:,} more characters]{footer}"
+        )
+    return (
+        f"{separator.join(kept)}\n"
+        f"[truncated to fit ~{budget:,} tokens: {summarize(items[len(kept):], noun)}]{footer}"
+    )
+
+
+def tool_budget(name: str, budgets: Optional[Dict[str, int]] = None) -> int:
+    return (budgets or {}).get(name) or TOOL_BUDGETS.get(name, DEFAULT_BUDGET)
+
+
+def compact_tool_output(name: str, output: str, budgets: Optional[Dict[str, int]] = None) -> str:
+    return compact(output, tool_budget(name, budgets))
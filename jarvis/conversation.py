@@ -0,0 +1,108 @@
+import json
+import os
+from typing import Dict, List, NamedTuple, Optional
+
+from .compactor import CHARS_PER_TOKEN, estimate_tokens
+from .tools import ToolContext
+
+THREAD_TOKEN_BUDGET = int(os.getenv("JARVIS_THREAD_TOKEN_BUDGET", "12000"))
+KEEP_TURNS = int(os.getenv("JARVIS_KEEP_TURNS", "4"))
+STATE_HEADER = "[Session state]"
+RESULT_CHARS = 160
+RECENT_RESULTS = 4
+SUMMARY_CHARS = 200
+SUMMARY_BUDGET_CHARS = 4000
+
+
+class Exchange(NamedTuple):
+    user: str
+    reply: str
+
+
+def _snippet(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}… (+{len(text) - limit:,} chars)"
+
+
+def _arguments(arguments: str) -> str:
+    try:
+        return ", ".join(f"{key}={value}" for key, value in json.loads(arguments or "{}").items())
+    except (ValueError, AttributeError):
+        return arguments
+
+
+def state_header(context: ToolContext) -> str:
+    # One line per fact and never a blank line: the message body starts
+    # after the first blank line.
+    lines = [f"{STATE_HEADER} cwd: {context.cwd}"]
+    recent = list(context.history)[-RECENT_RESULTS:]
+    if recent:
+        lines.append("recent: " + "; ".join(
+            f"{result.name}({_arguments(result.arguments)}) -> {_snippet(result.output, RESULT_CHARS)}"
+            for result in recent
+        ))
+    return "\n".join(lines)
+
+
+class Conversation:
+    # One thread for a whole session. A message carries a state header when
+    # the state changed since the last one sent on the thread, so the model
+    # does not have to ask for the cwd or repeat recent calls, and once the
+    # thread's estimated size passes the budget it is replaced by a new one
+    # holding a condensed summary and the last few exchanges.
+
+    def __init__(self, context: ToolContext, budget: int = THREAD_TOKEN_BUDGET, keep_turns: int = KEEP_TURNS):
+        self.context = context
+        self.budget = budget
+        self.keep_turns = keep_turns
+        self.thread_id: Optional[str] = None
+        self.exchanges: List[Exchange] = []
+        self.summary: List[str] = []
+        self.tokens = 0
+        self._header: Optional[str] = None
+
+    def message(self, user_input: str) -> str:
+        header = state_header(self.context)
+        if self.thread_id is not None and header == self._header:
+            return user_input
+        self._header = header
+        return f"{header}\n\n{user_input}"
+
+    def record(self, user_input: str, message: str, reply: str, output_chars: int) -> None:
+        self.exchanges.append(Exchange(user_input, reply.strip()))
+        self.tokens += estimate_tokens(message) + estimate_tokens(reply) + output_chars // CHARS_PER_TOKEN
+
+    def needs_compaction(self) -> bool:
+        if self.thread_id is None:
+            # A failed turn dropped the thread; reseed a new one.
+            return bool(self.exchanges)
+        return self.tokens > self.budget
+
+    def compact(self) -> List[Dict[str, str]]:
+        # The messages to seed the next thread with. Tool calls and outputs
+        # are not carried over; the state header restates what matters.
+        older = self.exchanges[:-self.keep_turns] if self.keep_turns else self.exchanges
+        recent = self.exchanges[len(older):]
+        self.summary.extend(
+            f"- {_snippet(exchange.user, SUMMARY_CHARS)} -> {_snippet(exchange.reply, SUMMARY_CHARS)}"
+            for exchange in older
+        )
+        while self.summary and sum(len(line) for line in self.summary) > SUMMARY_BUDGET_CHARS:
+            self.summary.pop(0)
+
+        messages = []
+        if self.summary:
+            messages.append({"role": "user", "content": "Summary of the earlier conversation:\n" + "\n".join(self.summary)})
+        for exchange in recent:
+            messages.append({"role": "user", "content": exchange.user})
+            if exchange.reply:
+                messages.append({"role": "assistant", "content": exchange.reply})
+
+        self.exchanges = recent
+        self.tokens = sum(estimate_tokens(message["content"]) for message in messages)
+        self.thread_id = None
+        # The new thread has not seen a header yet.
+        self._header = None
+        return messages
@@ -0,0 +1,215 @@
+import hashlib
+import os
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+COPY_WORKERS = int(os.getenv("JARVIS_COPY_WORKERS", str(min(8, (os.cpu_count() or 1) * 2))))
+FICLONE = 0x40049409
+_CHUNK = 8 * 1024 * 1024
+
+
+def _human_bytes(size: float) -> str:
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if size < 1024 or unit == "TB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+class CopyStats:
+    def __init__(self):
+        self.files_total = 0
+        self.bytes_total = 0
+        self.files_copied = 0
+        self.files_skipped = 0
+        self.bytes_copied = 0
+        self.errors: List[str] = []
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def add(self, copied: bool, size: int) -> None:
+        with self._lock:
+            if copied:
+                self.files_copied += 1
+                self.bytes_copied += size
+            else:
+                self.files_skipped += 1
+
+    def error(self, message: str) -> None:
+        with self._lock:
+            self.errors.append(message)
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    def progress(self) -> str:
+        done = self.files_copied + self.files_skipped
+        return f"{done}/{self.files_total} files, {_human_bytes(self.bytes_copied)} copied"
+
+    def summary(self) -> str:
+        rate = self.bytes_copied / self.elapsed if self.elapsed > 0 else 0
+        text = (
+            f"Copied {self.files_copied} files ({_human_bytes(self.bytes_copied)}) "
+            f"in {self.elapsed:.2f}s at {_human_bytes(rate)}/s"
+        )
+        if self.files_skipped:
+            text += f", skipped {self.files_skipped} unchanged"
+        if self.errors:
+            text += f", {len(self.errors)} errors:\n" + "\n".join(self.errors[:10])
+            if len(self.errors) > 10:
+                text += f"\n... and {len(self.errors) - 10} more"
+        return text
+
+
+_no_reflink = set()
+
+
+def _clone(src_fd: int, dst_fd: int, device: int) -> bool:
+    if fcntl is None or not sys.platform.startswith("linux") or device in _no_reflink:
+        return False
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        return True
+    except OSError:
+        # Remember filesystems without reflink support; no need to ask again.
+        _no_reflink.add(device)
+        return False
+
+
+def _copy_range(src_fd: int, dst_fd: int, size: int) -> bool:
+    for kernel_copy in (getattr(os, "copy_file_range", None), getattr(os, "sendfile", None)):
+        if kernel_copy is None:
+            continue
+        copied = 0
+        try:
+            while copied < size:
+                if kernel_copy is os.sendfile:
+                    sent = os.sendfile(dst_fd, src_fd, copied, min(_CHUNK, size - copied))
+                else:
+                    sent = os.copy_file_range(src_fd, dst_fd, min(_CHUNK, size - copied), copied, copied)
+                if sent == 0:
+                    break
+                copied += sent
+            return True
+        except OSError:
+            if copied:
+                raise
+    return False
+
+
+def copy_file(src: str, dst: str, src_stat: Optional[os.stat_result] = None) -> int:
+    src_stat = src_stat or os.stat(src)
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+        if not _clone(src_fd, dst_fd, src_stat.st_dev) and not _copy_range(src_fd, dst_fd, src_stat.st_size):
+            shutil.copyfileobj(fsrc, fdst, _CHUNK)
+    shutil.copystat(src, dst)
+    return src_stat.st_size
+
+
+def _digest(path: str) -> bytes:
+    hasher = hashlib.blake2b()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(_CHUNK), b""):
+            hasher.update(chunk)
+    return hasher.digest()
+
+
+def is_unchanged(src: str, dst: str, src_stat: os.stat_result, checksum: bool) -> bool:
+    try:
+        dst_stat = os.stat(dst)
+    except FileNotFoundError:
+        return False
+    if dst_stat.st_size != src_stat.st_size:
+        return False
+    if checksum:
+        return _digest(src) == _digest(dst)
+    # Whole seconds, like rsync, so coarse filesystem timestamps still match.
+    return int(dst_stat.st_mtime) == int(src_stat.st_mtime)
+
+
+def _walk(
+    src: str, dst: str, stats: CopyStats
+) -> Tuple[List[Tuple[str, str, os.stat_result]], List[Tuple[str, str]]]:
+    # Symlinks are recreated as symlinks rather than followed.
+    files = []
+    directories = []
+    stack = [(src, dst)]
+    while stack:
+        src_dir, dst_dir = stack.pop()
+        try:
+            os.makedirs(dst_dir, exist_ok=True)
+            directories.append((src_dir, dst_dir))
+            with os.scandir(src_dir) as it:
+                entries = list(it)
+        except OSError as e:
+            stats.error(f"{src_dir}: {e.strerror or e}")
+            continue
+        for entry in entries:
+            target = os.path.join(dst_dir, entry.name)
+            try:
+                if entry.is_symlink():
+                    if os.path.lexists(target):
+                        os.remove(target)
+                    os.symlink(os.readlink(entry.path), target)
+                elif entry.is_dir():
+                    stack.append((entry.path, target))
+                elif entry.is_file():
+                    entry_stat = entry.stat()
+                    files.append((entry.path, target, entry_stat))
+                    stats.files_total += 1
+                    stats.bytes_total += entry_stat.st_size
+            except OSError as e:
+                stats.error(f"{entry.path}: {e.strerror or e}")
+    return files, directories
+
+
+def copy_tree(
+    src: str,
+    dst: str,
+    incremental: bool = False,
+    checksum: bool = False,
+    workers: int = COPY_WORKERS,
+    progress: Optional[Callable[[CopyStats], None]] = None,
+    progress_interval: float = 0.5,
+) -> CopyStats:
+    stats = CopyStats()
+    files, directories = _walk(src, dst, stats)
+
+    def copy_one(item):
+        src_path, dst_path, src_stat = item
+        try:
+            if incremental and is_unchanged(src_path, dst_path, src_stat, checksum):
+                stats.add(False, 0)
+            else:
+                stats.add(True, copy_file(src_path, dst_path, src_stat))
+        except OSError as e:
+            stats.error(f"{src_path}: {e.strerror or e}")
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="jarvis-copy") as pool:
+        pending = {pool.submit(copy_one, item) for item in files}
+        while pending:
+            _, pending = wait(pending, timeout=progress_interval)
+            if progress is not None:
+                progress(stats)
+
+    # Modes and times last, deepest first: copying into a directory changes
+    # its mtime, and a read-only mode would block the copy.
+    for src_dir, dst_dir in reversed(directories):
+        try:
+            shutil.copystat(src_dir, dst_dir)
+        except OSError as e:
+            stats.error(f"{src_dir}: {e.strerror or e}")
+
+    stats.finished = time.monotonic()
+    return stats
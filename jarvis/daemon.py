@@ -0,0 +1,208 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from . import main_agent
+from .conversation import Conversation
+from .intent_router import router_from_config
+from .paths import daemon_socket
+from .telemetry import telemetry
+from .tools import ToolContext, index, jobs, registry, trash
+
+TURN_WORKERS = int(os.getenv("JARVIS_DAEMON_WORKERS", "16"))
+MAX_SESSIONS = int(os.getenv("JARVIS_MAX_SESSIONS", "256"))
+SESSION_TTL = float(os.getenv("JARVIS_SESSION_TTL", "3600"))
+
+
+class DaemonRunning(Exception):
+    pass
+
+
+class Session:
+    def __init__(self, session_id: str, context: ToolContext):
+        self.id = session_id
+        self.context = context
+        self.conversation = Conversation(context)
+        # A thread takes one run at a time, so a session's turns queue up.
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+        # Turns running or queued; a busy session is never evicted.
+        self.active = 0
+
+
+class Daemon:
+    # One process, one assistant and one OpenAI client pool for every
+    # session. Connections are handled on the event loop; turns use the
+    # blocking streaming client, so they run on a bounded pool of their own
+    # and their tools on the shared pool from dispatch.py.
+
+    def __init__(
+        self,
+        assistant_id: str,
+        config: Dict[str, Any],
+        router=None,
+        workers: int = TURN_WORKERS,
+        max_sessions: int = MAX_SESSIONS,
+        session_ttl: float = SESSION_TTL,
+    ):
+        self.assistant_id = assistant_id
+        self.config = config
+        self.router = router
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self.sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jarvis-turn")
+
+    def _evict(self, now: float, room: int) -> None:
+        # Oldest first, skipping sessions with a turn in flight; if they are
+        # all busy the limit is exceeded until one finishes.
+        idle = [session for session in self.sessions.values() if not session.active]
+        for session in idle:
+            if now - session.last_used >= self.session_ttl or len(self.sessions) > self.max_sessions - room:
+                del self.sessions[session.id]
+
+    def session(self, session_id: Optional[str], cwd: Optional[str]) -> Session:
+        now = time.monotonic()
+        self._evict(now, 0 if session_id in self.sessions else 1)
+        session = self.sessions.get(session_id) if session_id else None
+        if session is None:
+            session_id = session_id or uuid.uuid4().hex
+            session = Session(session_id, ToolContext(cwd or os.getcwd(), self.config, owner=session_id))
+            self.sessions[session.id] = session
+            telemetry.count("jarvis_daemon_sessions_total")
+        else:
+            self.sessions.move_to_end(session.id)
+        session.last_used = now
+        return session
+
+    def _turn(self, session: Session, user_input: str, write: Callable[[str], None]) -> None:
+        # Tool output that would go to a terminal goes to this turn's client.
+        session.context.write = write
+        try:
+            if self.router is not None:
+                output = self.router.handle(session.context, user_input)
+                if output is not None:
+                    write(output + "\n")
+                    return
+            if main_agent.SESSION_MODE:
+                main_agent.run_session_turn(self.assistant_id, session.conversation, user_input, write=write)
+            else:
+                main_agent.run_turn(self.assistant_id, user_input, context=session.context, write=write)
+        finally:
+            session.context.write = None
+
+    async def _send(self, writer: asyncio.StreamWriter, message: Dict[str, Any]) -> None:
+        writer.write(json.dumps(message).encode() + b"\n")
+        await writer.drain()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # One JSON object per line each way. A request is
+        # {"session": id or null, "cwd": path, "input": text}; the reply is
+        # any number of {"text": ...} lines and then {"done": true, ...}.
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    user_input = str(request["input"])
+                except (ValueError, KeyError, TypeError):
+                    await self._send(writer, {"error": "Expected a JSON object with an input field"})
+                    continue
+
+                session = self.session(request.get("session"), request.get("cwd"))
+                session.active += 1
+                try:
+                    async with session.lock:
+                        queue: asyncio.Queue = asyncio.Queue()
+
+                        def write(text: str) -> None:
+                            loop.call_soon_threadsafe(queue.put_nowait, text)
+
+                        turn = loop.run_in_executor(self.executor, self._turn, session, user_input, write)
+                        # Scheduled after every write the turn made, so it arrives last.
+                        turn.add_done_callback(lambda _: queue.put_nowait(None))
+                        while True:
+                            text = await queue.get()
+                            if text is None:
+                                break
+                            await self._send(writer, {"text": text})
+                        try:
+                            turn.result()
+                        except Exception as e:
+                            await self._send(writer, {"error": f"{type(e).__name__}: {e}"})
+                        session.last_used = time.monotonic()
+                finally:
+                    session.active -= 1
+                await self._send(writer, {"done": True, "session": session.id, "cwd": session.context.cwd})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def serve(daemon: Daemon, path: Optional[str] = None, ready: Optional[Callable[[], None]] = None) -> None:
+    path = path or daemon_socket()
+    if os.path.exists(path):
+        try:
+            _, writer = await asyncio.open_unix_connection(path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            # Left behind by a daemon that did not exit cleanly.
+            os.unlink(path)
+        else:
+            writer.close()
+            raise DaemonRunning(f"A Jarvis daemon is already listening on {path}")
+    server = await asyncio.start_unix_server(daemon.handle, path=path)
+    os.chmod(path, 0o600)
+    if ready is not None:
+        ready()
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve Jarvis sessions over a unix socket")
+    parser.add_argument("--socket", help="socket path (default: $JARVIS_SOCKET or <cache dir>/daemon.sock)")
+    parser.add_argument("--workers", type=int, default=TURN_WORKERS, help="turns that may run at once")
+    args = parser.parse_args()
+
+    config = main_agent.get_config()
+    daemon = Daemon(
+        main_agent.get_assistant_id(),
+        config,
+        router_from_config(registry, index, config),
+        workers=args.workers,
+    )
+    trash.start()
+    path = args.socket or daemon_socket()
+    try:
+        asyncio.run(serve(daemon, path, ready=lambda: print(f"Jarvis daemon listening on {path}", flush=True)))
+    except DaemonRunning as e:
+        print(e)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.shutdown()
+        jobs.shutdown()
+        telemetry.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+
+MAX_WORKERS = int(os.getenv("JARVIS_TOOL_WORKERS", "4"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=MAX_WORKERS, thread_name_prefix="jarvis-tool"
+        )
+    return _executor
+
+
+def _safe_call(run_tool: Callable[[Any], str], tool) -> str:
+    try:
+        return run_tool(tool)
+    except Exception as e:
+        return f"Error running {tool.function.name}: {str(e)}"
+
+
+def dispatch_tool_calls(
+    tool_calls: List[Any],
+    run_tool: Callable[[Any], str],
+    is_read_only: Callable[[str], bool],
+) -> List[str]:
+    outputs: List[Optional[str]] = [None] * len(tool_calls)
+    batch = []
+
+    def flush():
+        if len(batch) == 1:
+            index, tool = batch[0]
+            outputs[index] = _safe_call(run_tool, tool)
+        elif batch:
+            # Each call runs in a copy of the caller's context so its span
+            # nests under the current turn.
+            futures = [
+                (index, get_executor().submit(contextvars.copy_context().run, _safe_call, run_tool, tool))
+                for index, tool in batch
+            ]
+            for index, future in futures:
+                outputs[index] = future.result()
+        batch.clear()
+
+    # Consecutive read-only calls run together on the pool. A state-changing
+    # call waits for the batch before it, runs alone on the calling thread,
+    # and is finished before any later call starts, so a read_file issued
+    # after a change_directory still sees the new directory.
+    for index, tool in enumerate(tool_calls):
+        if is_read_only(tool.function.name):
+            batch.append((index, tool))
+        else:
+            flush()
+            outputs[index] = _safe_call(run_tool, tool)
+    flush()
+
+    return outputs
@@ -0,0 +1,152 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from pydantic.v1 import PrivateAttr
+
+from semantic_router.encoders import BaseEncoder
+from semantic_router.index.local import LocalIndex
+
+from .paths import cache_dir
+
+
+class EmbeddingStore:
+    def __init__(self, path: Optional[str] = None):
+        if path is None:
+            path = os.path.join(cache_dir(), "embeddings.sqlite3")
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, dim INTEGER NOT NULL, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit.
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, items: List[Tuple[str, np.ndarray]]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dim, vector) VALUES (?, ?, ?)",
+                [(key, len(vector), vector.astype(np.float32).tobytes()) for key, vector in items],
+            )
+            self._conn.commit()
+
+
+class CachedEncoder(BaseEncoder):
+    type: str = "cached"
+    _encoder: Any = PrivateAttr()
+    _store: Any = PrivateAttr()
+    _memory: Any = PrivateAttr()
+    _memory_size: int = PrivateAttr()
+    _lock: Any = PrivateAttr()
+
+    def __init__(
+        self,
+        encoder: BaseEncoder,
+        store: Optional[EmbeddingStore] = None,
+        memory_size: int = 2048,
+    ):
+        super().__init__(name=encoder.name, score_threshold=encoder.score_threshold)
+        self._encoder = encoder
+        self._store = store if store is not None else EmbeddingStore()
+        self._memory = OrderedDict()
+        self._memory_size = memory_size
+        self._lock = threading.Lock()
+
+    def _key(self, doc: str) -> str:
+        # Content-hashed per encoder, so switching models never returns
+        # another model's vectors.
+        raw = f"{self._encoder.type}:{self._encoder.name}\0{doc}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._memory_size:
+            self._memory.popitem(last=False)
+
+    def __call__(self, docs: List[str]) -> List[List[float]]:
+        keys = [self._key(doc) for doc in docs]
+        vectors: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    vectors[key] = self._memory[key]
+                    self._memory.move_to_end(key)
+
+        missing = [key for key in dict.fromkeys(keys) if key not in vectors]
+        if missing:
+            vectors.update(self._store.get_many(missing))
+
+        uncached = {}
+        for doc, key in zip(docs, keys):
+            if key not in vectors:
+                uncached.setdefault(key, doc)
+        if uncached:
+            # One batched call for everything not seen before.
+            embedded = self._encoder(list(uncached.values()))
+            fresh = [
+                (key, np.asarray(vector, dtype=np.float32))
+                for key, vector in zip(uncached, embedded)
+            ]
+            self._store.put_many(fresh)
+            vectors.update(fresh)
+
+        with self._lock:
+            for key in keys:
+                self._remember(key, vectors[key])
+        return [vectors[key].tolist() for key in keys]
+
+
+class NormalizedIndex(LocalIndex):
+    # Rows are L2-normalized once when added, so a query is a single matrix
+    # product instead of recomputing every utterance norm per lookup.
+
+    def add(self, embeddings: List[List[float]], routes: List[str], utterances: List[str]):
+        embeds = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(embeds, axis=1, keepdims=True)
+        embeds = embeds / np.where(norms == 0, 1, norms)
+        super().add(embeddings=embeds, routes=routes, utterances=utterances)
+
+    def query(
+        self,
+        vector: np.ndarray,
+        top_k: int = 5,
+        route_filter: Optional[List[str]] = None,
+    ) -> Tuple[np.ndarray, List[str]]:
+        if self.index is None or self.routes is None:
+            raise ValueError("Index or routes are not populated.")
+        matrix = self.index
+        routes = self.routes
+        if route_filter is not None:
+            mask = np.isin(routes, route_filter)
+            if not mask.any():
+                raise ValueError("No routes found matching the filter criteria.")
+            matrix = matrix[mask]
+            routes = routes[mask]
+
+        query = np.asarray(vector, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(query)
+        sim = matrix @ (query / (norm if norm else 1))
+        top_k = min(top_k, sim.shape[0])
+        idx = np.argpartition(sim, -top_k)[-top_k:]
+        return sim[idx], [routes[i] for i in idx]
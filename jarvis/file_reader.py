@@ -0,0 +1,216 @@
+import base64
+import json
+import mimetypes
+import mmap
+import os
+from typing import Optional, Tuple, Union
+
+PAGE_BYTES = int(os.getenv("JARVIS_READ_PAGE_BYTES", str(64 * 1024)))
+# No single read returns more than this, whatever length is asked for.
+MAX_READ_BYTES = int(os.getenv("JARVIS_READ_MAX_BYTES", str(256 * 1024)))
+SNIFF_BYTES = 8192
+
+_TEXT_BYTES = bytes({7, 8, 9, 10, 12, 13, 27} | set(range(0x20, 0x100)) - {0x7F})
+
+
+class ReadError(ValueError):
+    pass
+
+
+def is_binary(sample: bytes) -> bool:
+    if not sample:
+        return False
+    if b"\0" in sample:
+        return True
+    try:
+        sample.decode("utf-8")
+        return False
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off at the end of the sample is fine.
+        if e.start >= len(sample) - 3:
+            return False
+    # Mostly control bytes is binary; mostly printable is a legacy encoding.
+    nontext = sample.translate(None, _TEXT_BYTES)
+    return len(nontext) / len(sample) > 0.3
+
+
+def _human_size(size: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def describe_binary(path: str, size: int, sample: bytes) -> str:
+    mime, _ = mimetypes.guess_type(path)
+    head = " ".join(f"{b:02x}" for b in sample[:16])
+    return (
+        f"Binary file ({_human_size(size)}, {mime or 'unknown type'}) not decoded. "
+        f"First bytes: {head}"
+    )
+
+
+# A page of a line-range read: the line it starts at and the last line asked
+# for, which the cursor carries so later pages stop there too.
+Lines = Tuple[int, Optional[int]]
+# A mapped file, or the bytes read from one that cannot be mapped.
+Buffer = Union[mmap.mmap, bytes]
+
+
+def encode_cursor(offset: int, stat: os.stat_result, lines: Optional[Lines] = None) -> str:
+    state = {"o": offset, "s": stat.st_size, "m": stat.st_mtime_ns}
+    if lines is not None:
+        state["l"], state["e"] = lines
+    raw = json.dumps(state)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, stat: os.stat_result) -> Tuple[int, Optional[Lines]]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        state = json.loads(raw)
+        offset = int(state["o"])
+        lines = (int(state["l"]), None if state.get("e") is None else int(state["e"])) if "l" in state else None
+    except (ValueError, KeyError, TypeError):
+        raise ReadError("Invalid cursor")
+    if state.get("s") != stat.st_size or state.get("m") != stat.st_mtime_ns:
+        raise ReadError("File changed since the cursor was issued; start again without a cursor")
+    return offset, lines
+
+
+def _page_end(mm: Buffer, start: int, limit: int) -> int:
+    end = min(start + limit, len(mm))
+    if end < len(mm):
+        # Prefer to stop after a newline so pages hold whole lines.
+        newline = mm.rfind(b"\n", start, end)
+        if newline >= start:
+            return newline + 1
+        # Otherwise never split a UTF-8 sequence.
+        while end > start and (mm[end] & 0xC0) == 0x80:
+            end -= 1
+    return end
+
+
+def _line_offset(mm: Buffer, line: int) -> int:
+    position = 0
+    for _ in range(line - 1):
+        newline = mm.find(b"\n", position)
+        if newline < 0:
+            return len(mm)
+        position = newline + 1
+    return position
+
+
+def _tail_start(mm: Buffer, limit: int) -> int:
+    start = max(0, len(mm) - limit)
+    if start > 0:
+        newline = mm.find(b"\n", start)
+        if 0 <= newline < len(mm) - 1:
+            start = newline + 1
+    return start
+
+
+def _line_page(
+    mm: Buffer, start: int, first: int, end_line: Optional[int], limit: int
+) -> Tuple[int, int, str, bool, Optional[Lines]]:
+    end = _page_end(mm, start, limit)
+    if end_line is not None:
+        end = min(end, _line_offset(mm, end_line + 1)) if end_line >= first else start
+    lines = mm[start:end].count(b"\n") + (0 if end == start or mm[end - 1] == 10 else 1)
+    label = f"lines {first}-{first + lines - 1}" if lines else f"no lines from {first}"
+    more = end < len(mm) and (end_line is None or first + lines - 1 < end_line)
+    return start, end, label, more, (first + lines, end_line)
+
+
+def _select(
+    mm: Buffer,
+    stat: os.stat_result,
+    offset: Optional[int],
+    length: Optional[int],
+    start_line: Optional[int],
+    end_line: Optional[int],
+    mode: str,
+    cursor: Optional[str],
+    max_bytes: Optional[int],
+) -> Tuple[int, int, str, bool, Optional[Lines]]:
+    # Returns the byte range to show, a label for it, whether a continuation
+    # cursor makes sense after it, and the line state that cursor carries.
+    limit = min(length or PAGE_BYTES, max_bytes or MAX_READ_BYTES, MAX_READ_BYTES)
+    if cursor:
+        start, lines = decode_cursor(cursor, stat)
+        start = min(start, len(mm))
+        if lines is not None:
+            return _line_page(mm, start, lines[0], lines[1], limit)
+        end = _page_end(mm, start, limit)
+    elif start_line is not None or end_line is not None:
+        first = max(start_line or 1, 1)
+        return _line_page(mm, _line_offset(mm, first), first, end_line, limit)
+    elif offset is not None:
+        start = min(max(offset, 0), len(mm))
+        end = min(start + limit, len(mm)) if length is not None else _page_end(mm, start, limit)
+    elif mode == "tail":
+        start = _tail_start(mm, limit)
+        end = len(mm)
+    else:
+        start = 0
+        end = _page_end(mm, 0, limit)
+    return start, end, f"bytes {start}-{end}", end < len(mm), None
+
+
+def read_text(
+    path: str,
+    offset: Optional[int] = None,
+    length: Optional[int] = None,
+    start_line: Optional[int] = None,
+    end_line: Optional[int] = None,
+    mode: str = "head",
+    cursor: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+) -> str:
+    # max_bytes caps a page below MAX_READ_BYTES, so that a page always fits
+    # the caller's output budget whole and its cursor stays valid.
+    with open(path, "rb") as file:
+        stat = os.fstat(file.fileno())
+        try:
+            mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else None
+        except (OSError, ValueError):
+            mm = None
+        if mm is None:
+            # Pseudo-files in /proc and /sys report a size of 0, and some
+            # files cannot be mapped; read those, bounded, instead.
+            data = file.read(MAX_READ_BYTES)
+            return _render(path, data, stat, offset, length, start_line, end_line, mode, cursor, max_bytes)
+        with mm:
+            return _render(path, mm, stat, offset, length, start_line, end_line, mode, cursor, max_bytes)
+
+
+def _render(
+    path: str,
+    mm: Buffer,
+    stat: os.stat_result,
+    offset: Optional[int],
+    length: Optional[int],
+    start_line: Optional[int],
+    end_line: Optional[int],
+    mode: str,
+    cursor: Optional[str],
+    max_bytes: Optional[int],
+) -> str:
+    if not mm:
+        return ""
+    sample = mm[:SNIFF_BYTES]
+    if is_binary(sample):
+        return describe_binary(path, len(mm), sample)
+
+    start, end, label, more, lines = _select(
+        mm, stat, offset, length, start_line, end_line, mode, cursor, max_bytes
+    )
+    content = mm[start:end].decode("utf-8", errors="replace")
+    if start == 0 and end == len(mm):
+        return content
+
+    footer = f"[{label} of {len(mm)} bytes"
+    if more:
+        footer += f"; continue with cursor={encode_cursor(end, stat, lines)}"
+    separator = "" if not content or content.endswith("\n") else "\n"
+    return f"{content}{separator}{footer}]"
@@ -0,0 +1,202 @@
+import ctypes
+import ctypes.util
+import difflib
+import os
+import struct
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+MAX_DIRECTORIES = int(os.getenv("JARVIS_INDEX_SIZE", "512"))
+
+
+class Entry(NamedTuple):
+    name: str
+    is_dir: bool
+    is_link: bool = False
+
+
+class _CachedDirectory:
+    __slots__ = ("mtime_ns", "entries", "by_name", "watch")
+
+    def __init__(self, mtime_ns: int, entries: List[Entry], watch: Optional[int]):
+        self.mtime_ns = mtime_ns
+        self.entries = entries
+        self.by_name = {entry.name: entry for entry in entries}
+        self.watch = watch
+
+
+class _Inotify:
+    # Only the handful of calls the index needs, through ctypes, so there is
+    # no extra dependency. Events are drained without blocking on each lookup.
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_DELETE_SELF = 0x400
+    IN_MOVE_SELF = 0x800
+    IN_Q_OVERFLOW = 0x4000
+    IN_IGNORED = 0x8000
+    IN_ONLYDIR = 0x1000000
+    MASK = (
+        IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+        | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+    )
+    _HEADER = struct.Struct("iIII")
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path: str) -> Optional[int]:
+        wd = self._add_watch(self.fd, os.fsencode(path), self.MASK)
+        # Running out of watches (ENOSPC) just means mtime checks for this one.
+        return wd if wd >= 0 else None
+
+    def rm_watch(self, wd: int) -> None:
+        self._rm_watch(self.fd, wd)
+
+    def read_events(self) -> Tuple[List[int], bool]:
+        changed = []
+        overflow = False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = self._HEADER.unpack_from(data, offset)
+                offset += self._HEADER.size + length
+                if mask & self.IN_Q_OVERFLOW:
+                    overflow = True
+                elif not mask & self.IN_IGNORED:
+                    changed.append(wd)
+        return changed, overflow
+
+
+class DirectoryIndex:
+    def __init__(self, max_directories: int = MAX_DIRECTORIES, use_inotify: bool = True):
+        self.max_directories = max_directories
+        self._cache: "OrderedDict[str, _CachedDirectory]" = OrderedDict()
+        self._by_watch: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._inotify = None
+        if use_inotify and sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError):
+                self._inotify = None
+
+    def _drain_events(self) -> None:
+        changed, overflow = self._inotify.read_events()
+        if overflow:
+            self._clear()
+            return
+        for wd in changed:
+            path = self._by_watch.get(wd)
+            if path is not None:
+                self._drop(path)
+
+    def _drop(self, path: str) -> None:
+        cached = self._cache.pop(path, None)
+        if cached is not None and cached.watch is not None:
+            self._by_watch.pop(cached.watch, None)
+            self._inotify.rm_watch(cached.watch)
+
+    def _clear(self) -> None:
+        for path in list(self._cache):
+            self._drop(path)
+
+    def _load(self, path: str) -> _CachedDirectory:
+        watch = None
+        if self._inotify is not None:
+            # Watch before scanning so a change racing the scan still
+            # invalidates the entry.
+            watch = self._inotify.add_watch(path)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            with os.scandir(path) as it:
+                entries = [Entry(e.name, e.is_dir(), e.is_symlink()) for e in it]
+        except OSError:
+            if watch is not None:
+                self._inotify.rm_watch(watch)
+            raise
+        if watch is not None:
+            # Watch descriptors are reused per inode, so a re-added watch
+            # replaces whatever path it used to point to.
+            stale = self._by_watch.get(watch)
+            if stale is not None and stale != path:
+                self._cache.pop(stale, None)
+            self._by_watch[watch] = path
+        return _CachedDirectory(mtime_ns, entries, watch)
+
+    def _get(self, path: str) -> _CachedDirectory:
+        path = os.path.abspath(path)
+        with self._lock:
+            if self._inotify is not None:
+                self._drain_events()
+            cached = self._cache.get(path)
+            if cached is not None and cached.watch is None:
+                try:
+                    if os.stat(path).st_mtime_ns != cached.mtime_ns:
+                        self._drop(path)
+                        cached = None
+                except OSError:
+                    self._drop(path)
+                    cached = None
+            if cached is None:
+                cached = self._load(path)
+                self._cache[path] = cached
+                while len(self._cache) > self.max_directories:
+                    self._drop(next(iter(self._cache)))
+            else:
+                self._cache.move_to_end(path)
+            return cached
+
+    def entries(self, path: str) -> List[Entry]:
+        return list(self._get(path).entries)
+
+    def names(self, path: str) -> List[str]:
+        return [entry.name for entry in self._get(path).entries]
+
+    def subdirectories(self, path: str) -> List[str]:
+        return [entry.name for entry in self._get(path).entries if entry.is_dir]
+
+    def is_dir(self, path: str) -> bool:
+        path = os.path.abspath(path)
+        parent, name = os.path.split(path)
+        if not name:
+            return os.path.isdir(path)
+        try:
+            entry = self._get(parent).by_name.get(name)
+        except OSError:
+            return os.path.isdir(path)
+        return entry is not None and entry.is_dir
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        with self._lock:
+            if path is None:
+                self._clear()
+            else:
+                self._drop(os.path.abspath(path))
+
+
+def fuzzy_match(name: str, candidates: List[str], cutoff: float = 0.75) -> Optional[str]:
+    lowered = {}
+    for candidate in candidates:
+        lowered.setdefault(candidate.lower(), candidate)
+    key = name.strip().strip("/").lower()
+    if key in lowered:
+        return lowered[key]
+    matches = difflib.get_close_matches(key, list(lowered), n=1, cutoff=cutoff)
+    return lowered[matches[0]] if matches else None
@@ -0,0 +1,212 @@
+import json
+import os
+import re
+from collections import Counter
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from .fs_index import fuzzy_match
+
+Encoder = Callable[[List[str]], List[List[float]]]
+
+DEFAULT_THRESHOLD = 0.9
+
+_DIRECTORY_WORDS = r"(?:\s+(?:directory|folder|dir))?"
+
+# (pattern, tool, confidence). Named groups become tool arguments.
+RULES = [
+    (
+        r"(?:ls|ll|dir|list|list (?:the )?(?:files|contents)(?: here)?"
+        r"|list (?:the )?(?:current )?(?:directory|folder)(?: contents)?"
+        r"|show (?:me )?(?:the )?files(?: here)?|what(?:'s| is) (?:in )?here)",
+        "list_directory_contents",
+        1.0,
+    ),
+    (
+        r"(?:pwd|where am i|(?:what(?:'s| is)|show(?: me)?) (?:the )?(?:current|working) "
+        r"(?:directory|folder|path))",
+        "get_current_directory",
+        1.0,
+    ),
+    (
+        r"(?:go(?: back)? up(?: one level)?|up one level|(?:go to )?(?:the )?parent(?: directory| folder)?)",
+        "change_directory:..",
+        1.0,
+    ),
+    (
+        r"(?:cd|go to|goto|change (?:directory|dir|folder) to|navigate to|take me to|switch to)"
+        r"\s+(?:the\s+)?['\"]?(?P<directory>[^'\"]+?)['\"]?" + _DIRECTORY_WORDS,
+        "change_directory",
+        0.95,
+    ),
+]
+
+# Paraphrases for the embedding stage. Only tools without arguments are
+# matched this way; anything that needs arguments goes through the rules.
+UTTERANCES = {
+    "list_directory_contents": [
+        "what files are in this folder",
+        "show me what's in this directory",
+        "list everything here",
+        "what does this directory contain",
+    ],
+    "get_current_directory": [
+        "which directory am I in",
+        "what folder is this",
+        "tell me the current path",
+        "print working directory",
+    ],
+}
+
+
+class Intent(NamedTuple):
+    tool: str
+    arguments: Dict[str, Any]
+    confidence: float
+    source: str
+
+
+class IntentRouter:
+    def __init__(
+        self,
+        registry,
+        index,
+        threshold: float = DEFAULT_THRESHOLD,
+        encoder: Optional[Encoder] = None,
+        embedding_threshold: Optional[float] = None,
+    ):
+        self.registry = registry
+        self.index = index
+        self.threshold = threshold
+        self.encoder = encoder
+        # An embedding match is scored by its similarity, so it has to clear
+        # the routing threshold too; a lower value would match and be dropped.
+        self.embedding_threshold = max(embedding_threshold or threshold, threshold)
+        self.counters: Counter = Counter()
+        self._rules = [
+            (re.compile(rf"^\s*{pattern}\s*[.!?]*\s*$", re.IGNORECASE), tool, confidence)
+            for pattern, tool, confidence in RULES
+        ]
+        self._utterance_tools: List[str] = []
+        self._utterance_matrix = None
+        self._query_cache: Dict[str, np.ndarray] = {}
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.asarray(self.encoder(texts), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def _match_embedding(self, text: str) -> Optional[Intent]:
+        if self._utterance_matrix is None:
+            texts = []
+            for tool, utterances in UTTERANCES.items():
+                texts.extend(utterances)
+                self._utterance_tools.extend([tool] * len(utterances))
+            self._utterance_matrix = self._embed(texts)
+
+        key = text.strip().lower()
+        query = self._query_cache.get(key)
+        if query is None:
+            query = self._embed([key])[0]
+            if len(self._query_cache) >= 1024:
+                self._query_cache.pop(next(iter(self._query_cache)))
+            self._query_cache[key] = query
+
+        scores = self._utterance_matrix @ query
+        best = int(np.argmax(scores))
+        if scores[best] < self.embedding_threshold:
+            return None
+        return Intent(self._utterance_tools[best], {}, float(scores[best]), "embedding")
+
+    def _directory_confidence(self, ctx, directory: str, confidence: float) -> float:
+        # Only take the shortcut when the target resolves locally; otherwise
+        # the assistant is better placed to work out what was meant.
+        index = self.index
+        if index.is_dir(ctx.resolve(directory)) or directory in ctx.config["directories"]:
+            return confidence
+        try:
+            candidates = index.subdirectories(ctx.cwd)
+        except OSError:
+            candidates = []
+        if fuzzy_match(directory, candidates + list(ctx.config["directories"])):
+            return confidence * 0.95
+        return 0.0
+
+    def route(self, ctx, text: str) -> Optional[Intent]:
+        for pattern, tool, confidence in self._rules:
+            match = pattern.match(text)
+            if match is None:
+                continue
+            tool, _, fixed = tool.partition(":")
+            arguments = {k: v.strip() for k, v in match.groupdict().items() if v}
+            if fixed:
+                arguments = {"directory": fixed}
+            if tool == "change_directory":
+                confidence = self._directory_confidence(ctx, arguments["directory"], confidence)
+            return Intent(tool, arguments, confidence, "rule")
+
+        if self.encoder is not None:
+            try:
+                return self._match_embedding(text)
+            except Exception:
+                self.counters["embedding_errors"] += 1
+        return None
+
+    def handle(self, ctx, text: str) -> Optional[str]:
+        self.counters["inputs"] += 1
+        intent = self.route(ctx, text)
+        if intent is None or intent.confidence < self.threshold:
+            self.counters["fallback"] += 1
+            return None
+
+        cwd, arguments = ctx.cwd, json.dumps(intent.arguments)
+        try:
+            output = self.registry.call(ctx, intent.tool, arguments)
+        except Exception:
+            # Let the assistant deal with it rather than end the session.
+            self.counters["tool_errors"] += 1
+            self.counters["fallback"] += 1
+            return None
+        self.counters["fast_path"] += 1
+        self.counters[f"fast_path.{intent.source}"] += 1
+        self.counters[f"tool.{intent.tool}"] += 1
+        # The model never sees this call, so the session header has to.
+        ctx.remember(intent.tool, arguments, output, cwd)
+        return output
+
+    def stats(self) -> Dict[str, Any]:
+        inputs = self.counters["inputs"]
+        stats = dict(self.counters)
+        stats["hit_rate"] = self.counters["fast_path"] / inputs if inputs else 0.0
+        return stats
+
+    def summary(self) -> str:
+        stats = self.stats()
+        return (
+            f"Fast path: {stats.get('fast_path', 0)}/{stats.get('inputs', 0)} inputs "
+            f"({stats['hit_rate']:.0%}) answered locally"
+        )
+
+
+def router_from_config(registry, index, config: Dict[str, Any]) -> Optional[IntentRouter]:
+    settings = config.get("fast_path", {})
+    if not settings.get("enabled", True):
+        return None
+
+    encoder = None
+    if settings.get("embeddings", False):
+        from semantic_router.encoders import OpenAIEncoder
+
+        from .embedding_cache import CachedEncoder
+
+        encoder = CachedEncoder(OpenAIEncoder())
+
+    threshold = float(os.getenv("JARVIS_FAST_PATH_THRESHOLD", settings.get("threshold", DEFAULT_THRESHOLD)))
+    return IntentRouter(
+        registry,
+        index,
+        threshold=threshold,
+        encoder=encoder,
+        embedding_threshold=settings.get("embedding_threshold"),
+    )
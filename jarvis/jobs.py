@@ -0,0 +1,167 @@
+import itertools
+import os
+import shutil
+import signal
+import subprocess
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .paths import cache_dir
+
+MAX_JOBS = int(os.getenv("JARVIS_MAX_JOBS", "4"))
+MAX_OUTPUT_BYTES = 64 * 1024
+
+
+class Job:
+    def __init__(self, job_id: str, command: str, cwd: str, log_path: str, owner: Optional[str] = None):
+        self.id = job_id
+        self.command = command
+        self.cwd = cwd
+        self.log_path = log_path
+        # The daemon session that started it; None outside the daemon.
+        self.owner = owner
+        self.status = "queued"
+        self.returncode: Optional[int] = None
+        self.pid: Optional[int] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.future: Optional[Future] = None
+        self.process: Optional[subprocess.Popen] = None
+        self.done = threading.Event()
+
+    @property
+    def runtime(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    def output_size(self) -> int:
+        try:
+            return os.path.getsize(self.log_path)
+        except OSError:
+            return 0
+
+    def describe(self) -> str:
+        line = f"job {self.id} [{self.status}] {self.command}"
+        if self.returncode is not None:
+            line += f" (exit {self.returncode})"
+        if self.started_at is not None:
+            line += f", {self.runtime:.1f}s"
+        return line + f", {self.output_size()} bytes of output"
+
+
+class JobManager:
+    def __init__(self, max_jobs: int = MAX_JOBS, spool_dir: Optional[str] = None):
+        self.max_jobs = max_jobs
+        self.spool_dir = spool_dir
+        self._jobs: Dict[str, Job] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _ensure_started(self) -> None:
+        if self._executor is None:
+            if self.spool_dir is None:
+                self.spool_dir = cache_dir("jobs", str(os.getpid()))
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_jobs, thread_name_prefix="jarvis-job"
+            )
+
+    def _run(self, job: Job) -> None:
+        with self._lock:
+            if job.status == "killed":
+                job.done.set()
+                return
+            # Output goes straight from the child to the spool file; nothing
+            # in this process has to keep up with it.
+            with open(job.log_path, "ab") as log:
+                try:
+                    job.process = subprocess.Popen(
+                        job.command,
+                        shell=True,
+                        cwd=job.cwd,
+                        stdin=subprocess.DEVNULL,
+                        stdout=log,
+                        stderr=subprocess.STDOUT,
+                        start_new_session=True,
+                    )
+                except OSError as e:
+                    log.write(f"Could not start job: {e}\n".encode())
+                    job.status = "failed"
+                    job.done.set()
+                    return
+            job.pid = job.process.pid
+            job.started_at = time.monotonic()
+            job.status = "running"
+        job.returncode = job.process.wait()
+        job.finished_at = time.monotonic()
+        if job.status == "running":
+            job.status = "finished" if job.returncode == 0 else "failed"
+        job.done.set()
+
+    def start(self, command: str, cwd: str, owner: Optional[str] = None) -> Job:
+        with self._lock:
+            self._ensure_started()
+            job_id = str(next(self._ids))
+            job = Job(job_id, command, cwd, os.path.join(self.spool_dir, f"job-{job_id}.log"), owner)
+            open(job.log_path, "wb").close()
+            self._jobs[job_id] = job
+            job.future = self._executor.submit(self._run, job)
+        return job
+
+    # An owner of None sees every job; a daemon session sees only its own.
+    def get(self, job_id: str, owner: Optional[str] = None) -> Optional[Job]:
+        job = self._jobs.get(str(job_id))
+        return job if job is not None and owner in (None, job.owner) else None
+
+    def list(self, owner: Optional[str] = None) -> List[Job]:
+        return [job for job in self._jobs.values() if owner in (None, job.owner)]
+
+    def read_output(
+        self, job: Job, offset: Optional[int] = None, tail_bytes: Optional[int] = None
+    ) -> Tuple[str, int, int]:
+        size = job.output_size()
+        limit = MAX_OUTPUT_BYTES
+        if offset is None:
+            start = max(0, size - min(tail_bytes or limit, limit))
+        else:
+            start = min(max(offset, 0), size)
+        with open(job.log_path, "rb") as log:
+            log.seek(start)
+            data = log.read(min(limit, size - start))
+        return data.decode("utf-8", errors="replace"), start, start + len(data)
+
+    def wait(self, job: Job, timeout: float) -> bool:
+        return job.done.wait(timeout)
+
+    def kill(self, job: Job) -> bool:
+        with self._lock:
+            if job.done.is_set() or job.status == "killed":
+                return False
+            cancelled = job.status == "queued" and job.future.cancel()
+            job.status = "killed"
+            process = job.process
+        if cancelled:
+            job.done.set()
+        elif process is not None and process.poll() is None:
+            try:
+                os.killpg(process.pid, signal.SIGTERM)
+                process.wait(timeout=5)
+            except ProcessLookupError:
+                pass
+            except subprocess.TimeoutExpired:
+                os.killpg(process.pid, signal.SIGKILL)
+        return True
+
+    def shutdown(self) -> None:
+        # Must run before interpreter exit: the pool's workers are blocked in
+        # wait() and would otherwise keep the process alive until jobs end.
+        for job in self.list():
+            self.kill(job)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self.spool_dir is not None:
+            shutil.rmtree(self.spool_dir, ignore_errors=True)
@@ -0,0 +1,147 @@
+import base64
+import fnmatch
+import hashlib
+import json
+import os
+import time
+from typing import Callable, List, NamedTuple, Optional
+
+from .compactor import summarize
+from .file_reader import _human_size
+from .fs_index import DirectoryIndex
+
+PAGE_SIZE = int(os.getenv("JARVIS_LIST_PAGE_SIZE", "200"))
+MAX_PAGE_SIZE = 1000
+
+
+class ListingError(ValueError):
+    pass
+
+
+class Listed(NamedTuple):
+    name: str
+    is_dir: bool
+    is_link: bool
+    size: int = 0
+    mtime: float = 0.0
+
+
+def label(entry: Listed) -> str:
+    if entry.is_link:
+        return entry.name + "@"
+    return entry.name + "/" if entry.is_dir else entry.name
+
+
+def _query_key(path: str, pattern: Optional[str], sort: str, reverse: bool, entry_type: str) -> str:
+    raw = json.dumps([path, pattern, sort, reverse, entry_type])
+    return hashlib.sha1(raw.encode()).hexdigest()[:12]
+
+
+def encode_cursor(offset: int, key: str) -> str:
+    raw = json.dumps({"o": offset, "q": key})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, key: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        state = json.loads(raw)
+        offset = int(state["o"])
+    except (ValueError, KeyError, TypeError):
+        raise ListingError("Invalid cursor")
+    if state.get("q") != key:
+        raise ListingError("The cursor belongs to a different listing; start again without a cursor")
+    return offset
+
+
+def _filter(pattern: Optional[str], entry_type: str) -> Callable[[Listed], bool]:
+    def keep(entry: Listed) -> bool:
+        if entry_type == "dir" and not entry.is_dir:
+            return False
+        if entry_type == "file" and entry.is_dir:
+            return False
+        if entry_type == "symlink" and not entry.is_link:
+            return False
+        return pattern is None or fnmatch.fnmatch(entry.name, pattern)
+
+    return keep
+
+
+def _stat_entries(path: str, keep: Callable[[Listed], bool]) -> List[Listed]:
+    # Sizes and times are not kept in the directory index (it is not told
+    # about writes), so they come fresh from scandir, filtered first.
+    entries = []
+    with os.scandir(path) as it:
+        for e in it:
+            try:
+                entry = Listed(e.name, e.is_dir(), e.is_symlink())
+                if not keep(entry):
+                    continue
+                stat = e.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            entries.append(entry._replace(size=stat.st_size, mtime=stat.st_mtime))
+    return entries
+
+
+def _detail(entry: Listed) -> str:
+    size = "-" if entry.is_dir and not entry.is_link else _human_size(entry.size)
+    return f"{label(entry)}  {size}  {time.strftime('%Y-%m-%d %H:%M', time.localtime(entry.mtime))}"
+
+
+def list_entries(
+    index: DirectoryIndex,
+    path: str,
+    pattern: Optional[str] = None,
+    sort: str = "name",
+    reverse: bool = False,
+    entry_type: str = "all",
+    page_size: Optional[int] = None,
+    cursor: Optional[str] = None,
+    max_chars: Optional[int] = None,
+) -> str:
+    key = _query_key(path, pattern, sort, reverse, entry_type)
+    start = decode_cursor(cursor, key) if cursor else 0
+    page_size = max(1, min(page_size or PAGE_SIZE, MAX_PAGE_SIZE))
+    keep = _filter(pattern, entry_type)
+
+    if sort == "name":
+        entries = [
+            listed for listed in (Listed(e.name, e.is_dir, e.is_link) for e in index.entries(path)) if keep(listed)
+        ]
+        entries.sort(key=lambda entry: entry.name.casefold(), reverse=reverse)
+    else:
+        entries = _stat_entries(path, keep)
+        # Largest and newest first unless reversed.
+        entries.sort(key=lambda entry: getattr(entry, sort), reverse=not reverse)
+
+    if not entries:
+        if pattern is not None or entry_type != "all":
+            return "No entries match"
+        return "The directory is empty"
+    if start >= len(entries):
+        raise ListingError("The cursor is past the end of the listing; start again without a cursor")
+
+    render = label if sort == "name" else _detail
+    end = min(start + page_size, len(entries))
+    if max_chars is not None:
+        # End the page early rather than have it cut after the cursor is
+        # issued, which would skip the entries cut.
+        used = 0
+        for position in range(start, end):
+            used += len(render(entries[position])) + 2
+            if used > max_chars and position > start:
+                end = position
+                break
+    page = entries[start:end]
+    output = (", " if sort == "name" else "\n").join(render(entry) for entry in page)
+
+    if end < len(entries):
+        rest = summarize([label(entry) for entry in entries[end:]], "entries")
+        output += (
+            f"\n[showing {start + 1:,}-{end:,} of {len(entries):,} entries; {rest}; "
+            f"continue with cursor={encode_cursor(end, key)}]"
+        )
+    elif start > 0:
+        output += f"\n[showing {start + 1:,}-{end:,} of {len(entries):,} entries]"
+    return output
@@ -0,0 +1,20 @@
+import os
+from typing import Any, Dict
+
+
+def llm_from_config(config: Dict[str, Any], **kwargs):
+    settings = config.get("llm", {})
+    backend = os.getenv("JARVIS_LLM_BACKEND", settings.get("backend", "openai"))
+    if backend == "local":
+        from .local_llm import LOCAL_MODEL, LocalLLM
+
+        return LocalLLM(
+            model_name=settings.get("model", LOCAL_MODEL),
+            quantize=settings.get("quantize", True),
+            prefix_cache=settings.get("prefix_cache", True),
+        )
+    if backend == "openai":
+        from .openai_llm import OpenAILLM
+
+        return OpenAILLM(**kwargs)
+    raise ValueError(f"Unknown llm backend: {backend}")
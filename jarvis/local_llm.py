@@ -0,0 +1,335 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from jsonschema import ValidationError
+
+from .prompts import EXTRACTION_PROMPT_TAIL, EXTRACTION_SYSTEM_PROMPT, extraction_prompt_head
+from .response_cache import ResponseCache, cache_key
+from .telemetry import telemetry
+from .tools import registry
+
+LOCAL_MODEL = os.getenv("JARVIS_LOCAL_MODEL", "Qwen/Qwen2.5-0.5B-Instruct")
+MAX_NEW_TOKENS = int(os.getenv("JARVIS_LOCAL_MAX_TOKENS", "256"))
+THREADS = int(os.getenv("JARVIS_LOCAL_THREADS", "0"))
+MAX_VALUE_TOKENS = 48
+PREFIX_CACHE_SIZE = 16
+_QUERY = "\x00query\x00"
+_NUMBER_CHARS = set("0123456789-+.eE")
+
+_models: Dict[Tuple[str, bool], Tuple[Any, Any, threading.Lock]] = {}
+_models_lock = threading.Lock()
+
+
+def load_model(name: str = LOCAL_MODEL, quantize: bool = True):
+    # Loaded once per process and kept resident; every LocalLLM for the
+    # same model shares the weights.
+    with _models_lock:
+        key = (name, quantize)
+        if key not in _models:
+            try:
+                import torch
+                from transformers import AutoModelForCausalLM, AutoTokenizer
+            except ImportError as e:
+                raise ImportError(
+                    "The local backend needs torch and transformers: pip install torch transformers"
+                ) from e
+            if THREADS:
+                torch.set_num_threads(THREADS)
+            tokenizer = AutoTokenizer.from_pretrained(name)
+            model = AutoModelForCausalLM.from_pretrained(name, torch_dtype=torch.float32)
+            model.eval()
+            if quantize:
+                # bitsandbytes' int8 kernels need CUDA; dynamic quantization
+                # gives int8 linear layers on CPU.
+                model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            _models[key] = (tokenizer, model, threading.Lock())
+        return _models[key]
+
+
+class GenerationStats(NamedTuple):
+    prompt_tokens: int
+    cached_tokens: int
+    generated_tokens: int
+    seconds: float
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.generated_tokens / self.seconds if self.seconds > 0 else 0.0
+
+
+class _Decoder:
+    # Greedy decoding over a KV cache that can be rewound, so candidate
+    # continuations are scored without copying the cache.
+
+    def __init__(self, llm: "LocalLLM", past, logits, prompt_tokens: int, cached_tokens: int):
+        self.llm = llm
+        self.past = past
+        self.logits = logits
+        self.prompt_tokens = prompt_tokens
+        self.cached_tokens = cached_tokens
+        self.generated = 0
+
+    def feed(self, ids: List[int]) -> None:
+        if ids:
+            self.logits, self.past = self.llm._forward(ids, self.past)
+
+    def feed_text(self, text: str) -> None:
+        self.feed(self.llm._encode(text))
+
+    def _score(self, ids: List[int]) -> float:
+        import torch
+
+        score = float(torch.log_softmax(self.logits, dim=-1)[ids[0]])
+        if len(ids) > 1:
+            length = self.past.get_seq_length()
+            logits, _ = self.llm._forward(ids, self.past, all_logits=True)
+            self.past.crop(length)
+            logprobs = torch.log_softmax(logits[:-1], dim=-1)
+            score += float(logprobs[torch.arange(len(ids) - 1), torch.tensor(ids[1:])].sum())
+        return score
+
+    def choose(self, options: List[str]) -> str:
+        encoded = [self.llm._encode(option) for option in options]
+        scores = [self._score(ids) for ids in encoded]
+        best = max(range(len(options)), key=scores.__getitem__)
+        self.feed(encoded[best])
+        self.generated += len(encoded[best])
+        return options[best]
+
+    def generate(self, max_tokens: int, allowed=None, stop=None) -> Tuple[str, str]:
+        # Returns the text up to the stop condition, and the part of it from
+        # the stopping token that has not been fed to the model yet.
+        tokenizer = self.llm.tokenizer
+        tokens: List[int] = []
+        for _ in range(max_tokens):
+            logits = self.logits
+            if allowed is not None:
+                logits = logits + allowed
+            token = int(logits.argmax())
+            if token == tokenizer.eos_token_id or token in self.llm._stop_ids:
+                return tokenizer.decode(tokens), ""
+            self.generated += 1
+            if stop is not None:
+                piece = tokenizer.decode([token])
+                cut = stop(piece)
+                if cut is not None:
+                    return tokenizer.decode(tokens) + piece[:cut], piece[:cut]
+            tokens.append(token)
+            self.feed([token])
+        return tokenizer.decode(tokens), ""
+
+
+class LocalLLM:
+    def __init__(
+        self,
+        model_name: str = LOCAL_MODEL,
+        quantize: bool = True,
+        prefix_cache: bool = True,
+        max_new_tokens: int = MAX_NEW_TOKENS,
+        cache: Optional[ResponseCache] = None,
+    ):
+        self.model_name = model_name
+        self.tokenizer, self.model, self._lock = load_model(model_name, quantize)
+        self.prefix_cache = prefix_cache
+        self.max_new_tokens = max_new_tokens
+        self.cache = cache if cache is not None else ResponseCache()
+        self.last_stats: Optional[GenerationStats] = None
+        self._prefixes: "OrderedDict[str, Tuple[int, Any]]" = OrderedDict()
+        self._stop_ids = {
+            token_id
+            for token_id in (self.tokenizer.convert_tokens_to_ids(token) for token in ("<|im_end|>", "<|eot_id|>"))
+            if isinstance(token_id, int) and token_id != self.tokenizer.unk_token_id
+        }
+        self._number_mask = None
+
+    def _encode(self, text: str) -> List[int]:
+        return self.tokenizer(text, add_special_tokens=False).input_ids
+
+    def _forward(self, ids: List[int], past, all_logits: bool = False):
+        import torch
+
+        with torch.inference_mode():
+            out = self.model(input_ids=torch.tensor([ids]), past_key_values=past, use_cache=True)
+        logits = out.logits[0] if all_logits else out.logits[0, -1]
+        return logits, out.past_key_values
+
+    def _render(self, messages: List[Dict], generation_prompt: bool = True) -> str:
+        return self.tokenizer.apply_chat_template(
+            messages, tokenize=False, add_generation_prompt=generation_prompt
+        )
+
+    def _start(self, prefix: str, rest: str) -> _Decoder:
+        # The prefix (system prompt, tool schema) is encoded once and its KV
+        # cache kept; each call only runs the tokens after it.
+        rest_ids = self._encode(rest)
+        if not self.prefix_cache or not prefix:
+            ids = self._encode(prefix) + rest_ids
+            logits, past = self._forward(ids, None)
+            return _Decoder(self, past, logits, len(ids), 0)
+
+        entry = self._prefixes.get(prefix)
+        cached = 0
+        if entry is None:
+            prefix_ids = self._encode(prefix)
+            _, past = self._forward(prefix_ids, None)
+            entry = (len(prefix_ids), past)
+            self._prefixes[prefix] = entry
+            while len(self._prefixes) > PREFIX_CACHE_SIZE:
+                self._prefixes.popitem(last=False)
+        else:
+            self._prefixes.move_to_end(prefix)
+            cached = entry[0]
+        length, past = entry
+        logits, past = self._forward(rest_ids, past)
+        return _Decoder(self, past, logits, length + len(rest_ids), cached)
+
+    def _finish(self, decoder: _Decoder, prefix: str, started: float) -> None:
+        entry = self._prefixes.get(prefix)
+        if entry is not None:
+            # Rewind the shared cache to the end of the prefix for the next call.
+            entry[1].crop(entry[0])
+        self.last_stats = GenerationStats(
+            decoder.prompt_tokens, decoder.cached_tokens, decoder.generated, time.perf_counter() - started
+        )
+
+    def generate_text(self, messages: List[Dict], task: str = "response") -> str:
+        key = cache_key("generate", self.model_name, messages)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        text = self._render(messages)
+        prefix = ""
+        if messages and messages[0].get("role") == "system":
+            prefix = self._render(messages[:1], generation_prompt=False)
+            if not text.startswith(prefix):
+                prefix = ""
+        with self._lock, telemetry.span("llm", labels={"call": "generate_text", "backend": "local"}) as span:
+            started = time.perf_counter()
+            decoder = self._start(prefix, text[len(prefix):])
+            try:
+                output, _ = decoder.generate(self.max_new_tokens)
+            finally:
+                self._finish(decoder, prefix, started)
+                span.set(**self.last_stats._asdict())
+        output = output.strip()
+        self.cache.put(key, output)
+        return output
+
+    def _numbers(self):
+        import torch
+
+        if self._number_mask is None:
+            mask = torch.full((self.model.config.vocab_size,), float("-inf"))
+            for token_id in range(len(self.tokenizer)):
+                piece = self.tokenizer.decode([token_id]).strip()
+                if piece and (set(piece) <= _NUMBER_CHARS or piece[0] in ",}\n"):
+                    mask[token_id] = 0.0
+            self._number_mask = mask
+        return self._number_mask
+
+    def _value(self, decoder: _Decoder, schema: Dict[str, Any], after: str) -> Any:
+        if "enum" in schema:
+            choice = decoder.choose([json.dumps(option) for option in schema["enum"]])
+            decoder.feed_text(after)
+            return json.loads(choice)
+        kind = schema.get("type")
+        if isinstance(kind, list):
+            # Optional parameters are [type, "null"]; a chosen key gets a value.
+            kind = next((k for k in kind if k != "null"), "string")
+        if kind == "boolean":
+            choice = decoder.choose(["true", "false"])
+            decoder.feed_text(after)
+            return choice == "true"
+        if kind in ("integer", "number"):
+            text, pending = decoder.generate(
+                MAX_VALUE_TOKENS,
+                allowed=self._numbers(),
+                stop=lambda piece: next((i for i, c in enumerate(piece) if c not in _NUMBER_CHARS and not c.isspace()), None),
+            )
+            decoder.feed_text(pending + after)
+            try:
+                return int(text.strip()) if kind == "integer" else float(text.strip())
+            except ValueError:
+                return schema.get("default", 0)
+
+        decoder.feed_text('"')
+        text, pending = decoder.generate(
+            MAX_VALUE_TOKENS,
+            stop=lambda piece: next((i for i, c in enumerate(piece) if c in '"\n'), None),
+        )
+        decoder.feed_text(pending + '"' + after)
+        return text
+
+    def _extract(self, decoder: _Decoder, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        # Grammar-constrained object: the model only picks which allowed key
+        # comes next (or to stop) and fills in values, so the result is
+        # always well-formed JSON with known keys.
+        properties = parameters.get("properties", {})
+        required = set(parameters.get("required", []))
+        result: Dict[str, Any] = {}
+        decoder.feed_text("{")
+        separator = ""
+        while True:
+            remaining = [name for name in properties if name not in result]
+            options = [f"{separator}{json.dumps(name)}" for name in remaining]
+            if required <= set(result) or not remaining:
+                options.append("}")
+            if options == ["}"]:
+                break
+            choice = decoder.choose(options)
+            if choice == "}":
+                break
+            name = json.loads(choice[len(separator):])
+            decoder.feed_text(": ")
+            result[name] = self._value(decoder, properties[name], "")
+            separator = ", "
+        return result
+
+    def extract_function_inputs(
+        self, query: str, function_schema: Union[str, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        if isinstance(function_schema, str):
+            function_schema = registry.get(function_schema).schema["function"]
+        schema_json = json.dumps(function_schema, sort_keys=True, separators=(",", ":"))
+        key = cache_key("extract", self.model_name, schema_json, query)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return json.loads(cached)
+
+        text = self._render([
+            {"role": "system", "content": EXTRACTION_SYSTEM_PROMPT},
+            {"role": "user", "content": extraction_prompt_head(schema_json) + _QUERY + EXTRACTION_PROMPT_TAIL},
+        ])
+        prefix, suffix = text.split(_QUERY, 1)
+        with self._lock, telemetry.span("llm", labels={"call": "extract_function_inputs", "backend": "local"}) as span:
+            started = time.perf_counter()
+            decoder = self._start(prefix, query + suffix)
+            try:
+                extracted_inputs = self._extract(decoder, function_schema.get("parameters", {}))
+            finally:
+                self._finish(decoder, prefix, started)
+                span.set(function=function_schema.get("name"), **self.last_stats._asdict())
+        try:
+            registry.validator_for(function_schema).validate(extracted_inputs)
+        except ValidationError:
+            return {}
+        self.cache.put(key, json.dumps(extracted_inputs))
+        return extracted_inputs
+
+    async def agenerate_text(self, messages: List[Dict], task: str = "response") -> str:
+        return await asyncio.to_thread(self.generate_text, messages, task)
+
+    async def aextract_function_inputs(
+        self, query: str, function_schema: Union[str, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.extract_function_inputs, query, function_schema)
+
+    def generate_batch(self, batch: List[List[Dict]], concurrency: int = 1) -> List[str]:
+        # One resident model; requests run back to back.
+        return [self.generate_text(messages) for messages in batch]
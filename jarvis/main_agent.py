@@ -1,15 +1,17 @@
 import os
-import subprocess
-import select
-import uuid
 import sys
-import shutil
 import json
-from openai import OpenAI, AssistantEventHandler
-from dotenv import load_dotenv
-load_dotenv()
-api_key = os.getenv('OPENAI_API_KEY')
-client = OpenAI(api_key=api_key)
+import time
+from openai import AssistantEventHandler, NotFoundError
+
+from .assistant_cache import get_or_create_assistant
+from .clients import get_openai_client
+from .compactor import compact_tool_output
+from .conversation import Conversation
+from .dispatch import dispatch_tool_calls
+from .intent_router import router_from_config
+from .telemetry import telemetry
+from .tools import ToolContext, index, jobs, registry, trash
 
 import termios
 import tty
@@ -25,315 +27,112 @@ def getch():
     return ch
 
 
+MODEL = "gpt-4-turbo"
+INSTRUCTIONS = "You are a directory navigation assistant. Use the provided functions to navigate and list directory contents."
+TOOLS = registry.schemas()
+# Keep one thread per session instead of starting one for every input. Off
+# by default: on the scripted sessions it saves requests but not tokens.
+SESSION_MODE = os.getenv("JARVIS_SESSION_MODE", "0").lower() not in ("0", "false", "no", "off")
+
+_config = None
+_context = None
+# Assistants found deleted on the account, and what replaced them.
+_replaced_assistants = {}
+
+
+def get_client():
+    return get_openai_client()
+
+
+def get_config():
+    global _config
+    if _config is None:
+        # Load the configuration file
+        try:
+            with open("config.json") as config_file:
+                _config = json.load(config_file)
+        except FileNotFoundError:
+            _config = {}
+        _config.setdefault("directories", {})
+    return _config
+
+
+def get_context():
+    global _context
+    if _context is None:
+        _context = ToolContext(os.getcwd(), get_config())
+    return _context
+
+
+def get_assistant_id():
+    return get_or_create_assistant(get_client(), MODEL, INSTRUCTIONS, TOOLS)
+
+
+def replace_assistant(assistant_id):
+    new_id = get_or_create_assistant(get_client(), MODEL, INSTRUCTIONS, TOOLS, stale=assistant_id)
+    _replaced_assistants[assistant_id] = new_id
+    return new_id
+
+
+def write_stdout(text):
+    print(text, end="", flush=True)
 
-# Load the configuration file
-with open("config.json") as config_file:
-    config = json.load(config_file)
-
-client = OpenAI()
-
-assistant = client.beta.assistants.create(
-    instructions="You are a directory navigation assistant. Use the provided functions to navigate and list directory contents.",
-    model="gpt-4-turbo",
-    tools=[
-        {
-            "type": "function",
-            "function": {
-                "name": "list_directory_contents",
-                "description": "List the contents of the current directory",
-                "parameters": {
-                    "type": "object",
-                    "properties": {},
-                    "required": []
-                }
-            }
-        },
-        {
-            "type": "function",
-            "function": {
-                "name": "change_directory",
-                "description": "Change the current directory",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "directory": {
-                            "type": "string",
-                            "description": "The directory to change to (relative or absolute path)"
-                        }
-                    },
-                    "required": ["directory"]
-                }
-            }
-        },
-        {
-            "type": "function",
-            "function": {
-                "name": "get_current_directory",
-                "description": "Get the current working directory",
-                "parameters": {
-                    "type": "object",
-                    "properties": {},
-                    "required": []
-                }
-            }
-        },
-
-        {
-            "type": "function",
-            "function": {
-                "name": "read_file",
-                "description": "Read the contents of a file",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "file_path": {
-                            "type": "string",
-                            "description": "The path to the file to read"
-                        }
-                    },
-                    "required": ["file_path"]
-                }
-            }
-        },
-        {
-            "type": "function",
-            "function": {
-                "name": "execute_file",
-                "description": "Execute a file",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "file_path": {
-                            "type": "string",
-                            "description": "The path to the file to execute"
-                        }
-                    },
-                    "required": ["file_path"]
-                }
-            }
-        },
-        {
-            "type": "function",
-            "function": {
-                "name": "copy_file_or_directory",
-                "description": "Copy a file or directory to another directory",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "src_path": {
-                            "type": "string",
-                            "description": "The path to the source file or directory"
-                        },
-                        "dst_path": {
-                            "type": "string",
-                            "description": "The path to the destination directory"
-                        }
-                    },
-                    "required": ["src_path", "dst_path"]
-                }
-            }
-        },
-        {
-            "type": "function",
-            "function": {
-                "name": "remove_file_or_directory",
-                "description": "Remove a file or directory",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "path": {
-                            "type": "string",
-                            "description": "The path to the file or directory to remove"
-                        }
-                    },
-                    "required": ["path"]
-                }
-            }
-        },
-        {
-            "type": "function",
-            "function": {
-                "name": "read_script_output",
-                "description": "Read the output of a script",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "script_path": {
-                            "type": "string",
-                            "description": "The path to the script to execute"
-                        }
-                    },
-                    "required": ["script_path"]
-                }
-            }
-        },
-        {
-            "type": "function",
-            "function": {
-                "name": "activate_virtual_env",
-                "description": "Activate a virtual environment",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "venv_path": {
-                            "type": "string",
-                            "description": "The path to the virtual environment"
-                        }
-                    },
-                    "required": ["venv_path"]
-                }
-            }
-        }
-    ]
-)
-
-
-current_directory = os.getcwd()
 
 class EventHandler(AssistantEventHandler):
+    def __init__(self, context=None, write=None):
+        super().__init__()
+        # Each handler serves one streamed request, i.e. one model round trip.
+        self.opened = time.perf_counter()
+        # The session's tool state and where its reply goes; the daemon
+        # serves many of these from one process.
+        self.context = context if context is not None else get_context()
+        self.write = write or write_stdout
+        self._cwds = {}
+
     def on_event(self, event):
-        global current_directory
+        if event.event == 'thread.run.created':
+            telemetry.observe("jarvis_run_created_seconds", time.perf_counter() - self.opened)
+        elif event.event in ('thread.run.requires_action', 'thread.run.completed',
+                             'thread.run.failed', 'thread.run.cancelled', 'thread.run.expired'):
+            status = event.event.rsplit('.', 1)[1]
+            elapsed = time.perf_counter() - self.opened
+            telemetry.observe("jarvis_model_round_trip_seconds", elapsed)
+            telemetry.count("jarvis_model_round_trips_total", status=status)
+            telemetry.event("model.round_trip", status=status, ms=round(elapsed * 1000, 3))
+            # Only finished runs report usage, covering all of their steps.
+            usage = getattr(event.data, 'usage', None)
+            if usage is not None:
+                telemetry.count("jarvis_tokens_total", usage.prompt_tokens, kind="prompt")
+                telemetry.count("jarvis_tokens_total", usage.completion_tokens, kind="completion")
+
         if event.event == 'thread.run.requires_action':
             run_id = event.data.id
             self.handle_requires_action(event.data, run_id)
 
+    def on_text_delta(self, delta, snapshot):
+        span = telemetry.current()
+        turn = span.find("turn") if span is not None else None
+        if turn is not None and "first_token_ms" not in turn.attrs:
+            elapsed = turn.elapsed()
+            turn.set(first_token_ms=round(elapsed * 1000, 3))
+            telemetry.observe("jarvis_first_token_seconds", elapsed)
+        self.write(delta.value or "")
+
+    def on_text_done(self, text):
+        self.write("\n")
+
     def handle_requires_action(self, data, run_id):
-        global current_directory
-        tool_outputs = []
-
-        for tool in data.required_action.submit_tool_outputs.tool_calls:
-            if tool.function.name == "list_directory_contents":
-                contents = os.listdir(current_directory)
-                tool_outputs.append({"tool_call_id": tool.id, "output": ", ".join(contents)})
-            elif tool.function.name == "change_directory":
-                directory = json.loads(tool.function.arguments)["directory"]
-                new_directory = os.path.abspath(os.path.join(current_directory, directory))
-
-                if os.path.exists(new_directory) and os.path.isdir(new_directory):
-                    current_directory = new_directory
-                    output = f"Changed current directory to {current_directory}"
-                    directories = [d for d in os.listdir(current_directory) if os.path.isdir(os.path.join(current_directory, d))]
-                    if directories:
-                        output += f"\nDirectories in the current directory: {', '.join(directories)}"
-                    tool_outputs.append({"tool_call_id": tool.id, "output": output})
-                else:
-                    directories_in_current_path = [d for d in os.listdir(current_directory) if os.path.isdir(os.path.join(current_directory, d))]
-                    if directory in directories_in_current_path:
-                        new_directory = os.path.abspath(os.path.join(current_directory, directory))
-                        current_directory = new_directory
-                        output = f"Changed current directory to {current_directory}"
-                        directories = [d for d in os.listdir(current_directory) if os.path.isdir(os.path.join(current_directory, d))]
-                        if directories:
-                            output += f"\nDirectories in the current directory: {', '.join(directories)}"
-                        tool_outputs.append({"tool_call_id": tool.id, "output": output})
-                    elif directory in config["directories"]:
-                        new_directory = config["directories"][directory]
-                        if os.path.exists(new_directory) and os.path.isdir(new_directory):
-                            current_directory = new_directory
-                            output = f"Changed current directory to {current_directory}"
-                            directories = [d for d in os.listdir(current_directory) if os.path.isdir(os.path.join(current_directory, d))]
-                            if directories:
-                                output += f"\nDirectories in the current directory: {', '.join(directories)}"
-                            tool_outputs.append({"tool_call_id": tool.id, "output": output})
-                        else:
-                            tool_outputs.append({"tool_call_id": tool.id, "output": "Invalid directory"})
-                    else:
-                        tool_outputs.append({"tool_call_id": tool.id, "output": "Invalid directory"})
-            elif tool.function.name == "get_current_directory":
-                tool_outputs.append({"tool_call_id": tool.id, "output": current_directory})
-            elif tool.function.name == "read_file":
-                file_path = json.loads(tool.function.arguments)["file_path"]
-                try:
-                    with open(file_path, 'r') as file:
-                        content = file.read()
-                    tool_outputs.append({"tool_call_id": tool.id, "output": content})
-                except FileNotFoundError:
-                    tool_outputs.append({"tool_call_id": tool.id, "output": "File not found"})
-            elif tool.function.name == "execute_file":
-                file_path = json.loads(tool.function.arguments)["file_path"]
-                full_path = os.path.join(current_directory, file_path)
-                try:
-                    process = subprocess.Popen(full_path, shell=True, universal_newlines=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                    output = ""
-                    error = ""
-
-                    while True:
-                        try:
-                            reads, _, _ = select.select([process.stdout.fileno(), process.stderr.fileno(), sys.stdin.fileno()], [], [], 1)
-                            for fd in reads:
-                                if fd == process.stdout.fileno():
-                                    line = process.stdout.readline()
-                                    if not line:
-                                        break
-                                    output += line
-                                    print(line, end='')
-                                if fd == process.stderr.fileno():
-                                    line = process.stderr.readline()
-                                    if not line:
-                                        break
-                                    error += line
-                                    print(line, end='', file=sys.stderr)
-                                if fd == sys.stdin.fileno():
-                                    if sys.stdin.read(1) == ' ':
-                                        process.kill()
-                                        print(f"\nExecution of {full_path} was interrupted by the user.")
-                                        tool_outputs.append({"tool_call_id": tool.id, "output": f"Execution interrupted by the user."})
-                                        return
-
-                            if process.poll() is not None:
-                                break
-                        except KeyboardInterrupt:
-                            process.kill()
-                            print(f"\nExecution of {full_path} was interrupted by the user.")
-                            tool_outputs.append({"tool_call_id": tool.id, "output": f"Execution interrupted by the user."})
-                            return
-
-                    return_code = process.poll()
-                    if return_code != 0:
-                        tool_outputs.append({"tool_call_id": tool.id, "output": f"Error executing file:\nOutput: {output}\nError: {error}"})
-                    else:
-                        tool_outputs.append({"tool_call_id": tool.id, "output": f"File executed successfully:\nOutput: {output}\nError: {error}"})
-                except subprocess.CalledProcessError as e:
-                    print(f"Error executing {full_path}:")
-                    print(e.output)
-                    tool_outputs.append({"tool_call_id": tool.id, "output": f"Error executing file: {str(e)}"})
-            elif tool.function.name == "copy_file_or_directory":
-                src_path = json.loads(tool.function.arguments)["src_path"]
-                dst_path = json.loads(tool.function.arguments)["dst_path"]
-                try:
-                    if os.path.isfile(src_path):
-                        shutil.copy(src_path, dst_path)
-                    elif os.path.isdir(src_path):
-                        shutil.copytree(src_path, dst_path)
-                    tool_outputs.append({"tool_call_id": tool.id, "output": "Copy successful"})
-                except FileNotFoundError:
-                    tool_outputs.append({"tool_call_id": tool.id, "output": "Source file or directory not found"})
-                except shutil.SameFileError:
-                    tool_outputs.append({"tool_call_id": tool.id, "output": "Source and destination are the same"})
-            elif tool.function.name == "remove_file_or_directory":
-                path = json.loads(tool.function.arguments)["path"]
-                try:
-                    if os.path.isfile(path):
-                        os.remove(path)
-                    elif os.path.isdir(path):
-                        shutil.rmtree(path)
-                    tool_outputs.append({"tool_call_id": tool.id, "output": "Removal successful"})
-                except FileNotFoundError:
-                    tool_outputs.append({"tool_call_id": tool.id, "output": "File or directory not found"})
-            elif tool.function.name == "read_script_output":
-                script_path = json.loads(tool.function.arguments)["script_path"]
-                try:
-                    output = subprocess.check_output(script_path, shell=True, universal_newlines=True)
-                    tool_outputs.append({"tool_call_id": tool.id, "output": output})
-                except subprocess.CalledProcessError as e:
-                    tool_outputs.append({"tool_call_id": tool.id, "output": f"Error executing script: {str(e)}"})
-            elif tool.function.name == "activate_virtual_env":
-                venv_path = json.loads(tool.function.arguments)["venv_path"]
-                try:
-                    os.system(f"source {venv_path}/bin/activate")
-                    tool_outputs.append({"tool_call_id": tool.id, "output": "Virtual environment activated"})
-                except Exception as e:
-                    tool_outputs.append({"tool_call_id": tool.id, "output": f"Error activating virtual environment: {str(e)}"})
+        tool_calls = data.required_action.submit_tool_outputs.tool_calls
+        with telemetry.span("tool_calls", calls=len(tool_calls)):
+            outputs = dispatch_tool_calls(tool_calls, self.run_tool, registry.is_read_only)
+        tool_outputs = [
+            {"tool_call_id": tool.id, "output": self.compact(tool.function.name, output)}
+            for tool, output in zip(tool_calls, outputs)
+        ]
+        for tool, tool_output in zip(tool_calls, tool_outputs):
+            self.context.remember(
+                tool.function.name, tool.function.arguments, tool_output["output"], self._cwds.pop(tool.id, self.context.cwd)
+            )
 
         # Check if there are any tool outputs
         if tool_outputs:
@@ -342,39 +141,131 @@ class EventHandler(AssistantEventHandler):
             # If there are no tool outputs, submit an empty list
             self.submit_tool_outputs([], run_id)
 
+    def run_tool(self, tool):
+        # The directory the call ran in, since a later call may change it.
+        self._cwds[tool.id] = self.context.cwd
+        return registry.call(self.context, tool.function.name, tool.function.arguments)
+
+    def compact(self, name, output):
+        # Every output is held to a per-tool token budget before it goes
+        # back to the model; config.json "tool_budgets" overrides the defaults.
+        compacted = compact_tool_output(name, output, self.context.config.get("tool_budgets"))
+        if compacted is not output:
+            telemetry.count("jarvis_tool_output_compacted_total", tool=name)
+            telemetry.count("jarvis_tool_output_dropped_bytes_total", len(output) - len(compacted), tool=name)
+        return compacted
+
 
     def submit_tool_outputs(self, tool_outputs, run_id):
         if not tool_outputs:
             # If there are no tool outputs, submit an empty list
             tool_outputs = []
 
-        with client.beta.threads.runs.submit_tool_outputs_stream(
+        with get_client().beta.threads.runs.submit_tool_outputs_stream(
             thread_id=self.current_run.thread_id,
             run_id=self.current_run.id,
             tool_outputs=tool_outputs,
-            event_handler=EventHandler(),
+            event_handler=type(self)(self.context, self.write),
         ) as stream:
-            for text in stream.text_deltas:
-                print(text, end="", flush=True)
-            print()
-
-while True:
-    user_input = input("User: ")
-    if user_input.lower() == 'exit':
-        break
-
-    thread = client.beta.threads.create()
-    message = client.beta.threads.messages.create(
-        thread_id=thread.id,
-        role="user",
-        content=user_input,
-    )
+            stream.until_done()
+
 
+def _stream_run(client, thread_id, assistant_id, handler):
     with client.beta.threads.runs.stream(
-        thread_id=thread.id,
-        assistant_id=assistant.id,
-        event_handler=EventHandler()
+        thread_id=thread_id,
+        assistant_id=assistant_id,
+        event_handler=handler
     ) as stream:
         stream.until_done()
 
 
+def run_turn(assistant_id, user_input, event_handler=EventHandler, context=None, write=None, thread_id=None):
+    # Returns the thread the turn ran on; without a thread_id each turn
+    # starts a new one.
+    client = get_client()
+    assistant_id = _replaced_assistants.get(assistant_id, assistant_id)
+    with telemetry.span("turn"):
+        with telemetry.span("run.create"):
+            if thread_id is None:
+                thread_id = client.beta.threads.create().id
+            message = client.beta.threads.messages.create(
+                thread_id=thread_id,
+                role="user",
+                content=user_input,
+            )
+
+        try:
+            _stream_run(client, thread_id, assistant_id, event_handler(context, write))
+        except NotFoundError as e:
+            # The cached assistant was deleted on the account.
+            if assistant_id not in str(e):
+                raise
+            telemetry.count("jarvis_assistant_recreated_total")
+            _stream_run(client, thread_id, replace_assistant(assistant_id), event_handler(context, write))
+    telemetry.flush()
+    return thread_id
+
+
+def run_session_turn(assistant_id, conversation, user_input, event_handler=EventHandler, write=None):
+    if conversation.needs_compaction():
+        with telemetry.span("thread.compact", tokens=conversation.tokens):
+            messages = conversation.compact()
+            conversation.thread_id = get_client().beta.threads.create(messages=messages).id
+        telemetry.count("jarvis_thread_compactions_total")
+
+    write = write or write_stdout
+    reply = []
+
+    def capture(text):
+        reply.append(text)
+        write(text)
+
+    message = conversation.message(user_input)
+    output_chars = conversation.context.output_chars
+    try:
+        conversation.thread_id = run_turn(
+            assistant_id, message, event_handler, conversation.context, capture, conversation.thread_id
+        )
+    except BaseException:
+        # The run may still be active on the thread, which then rejects new
+        # messages; the next turn starts a new thread seeded by compact().
+        conversation.thread_id = None
+        telemetry.count("jarvis_thread_dropped_total")
+        raise
+    conversation.record(user_input, message, "".join(reply), conversation.context.output_chars - output_chars)
+
+
+def main():
+    assistant_id = get_assistant_id()
+    router = router_from_config(registry, index, get_config())
+    # Resume reclaiming anything a previous session left in the trash.
+    trash.start()
+    conversation = Conversation(get_context()) if SESSION_MODE else None
+
+    try:
+        while True:
+            user_input = input("User: ")
+            if user_input.lower() == 'exit':
+                if router is not None:
+                    print(router.summary())
+                break
+
+            if router is not None:
+                # Plain navigation and listing commands are answered locally.
+                output = router.handle(get_context(), user_input)
+                if output is not None:
+                    print(output)
+                    continue
+
+            if conversation is not None:
+                run_session_turn(assistant_id, conversation, user_input)
+            else:
+                run_turn(assistant_id, user_input)
+    finally:
+        # Background jobs do not outlive the agent.
+        jobs.shutdown()
+        telemetry.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,25 @@
+import asyncio
+import json
 import os
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from dotenv import load_dotenv
-from jsonschema import ValidationError, validate
-from openai import OpenAI
+from jsonschema import ValidationError
 
 from semantic_router import Route, RouteLayer
 from semantic_router.encoders import OpenAIEncoder
 from semantic_router.schema import Message
 
-load_dotenv()
-api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
+from .clients import close_async_clients, get_async_openai_client, get_openai_client
+from .embedding_cache import CachedEncoder, NormalizedIndex
+from .prompts import EXTRACTION_SYSTEM_PROMPT, extraction_prompt
+from .response_cache import ResponseCache, cache_key
+from .telemetry import telemetry
+from .tools import registry
+
+MODEL = "gpt-3.5-turbo"
+TEMPERATURE = 0.7
+BATCH_CONCURRENCY = int(os.getenv("JARVIS_BATCH_CONCURRENCY", "8"))
 
 
 class OpenAILLM:
@@ -20,112 +28,166 @@ class OpenAILLM:
         api_key: str = None,
         function_routes: List[Route] = None,
         encoder: OpenAIEncoder = None,
+        cache: Optional[ResponseCache] = None,
+        semantic_cache: bool = False,
     ):
         load_dotenv()
-        api_key = os.getenv("OPENAI_API_KEY")
-        client = OpenAI(api_key=api_key)
-
-        print("API KEY: ", api_key)
         if api_key is None:
             api_key = os.getenv("OPENAI_API_KEY")
+
         if api_key is None:
             raise ValueError(
                 "OpenAI API key not found. Please set the OPENAI_API_KEY environment variable or provide the API key as an argument."
             )
 
-        self.client = OpenAI(api_key=api_key)
+        self.api_key = api_key
+        # Shared with the agent, so every caller reuses one connection pool.
+        self.client = get_openai_client(api_key)
 
         if function_routes is None:
             function_routes = []
 
         if encoder is None:
-            self.encoder = OpenAIEncoder()
-        else:
-            self.encoder = encoder
-
-        self.route_layer = RouteLayer(encoder=self.encoder, routes=function_routes)
+            encoder = OpenAIEncoder()
+        # Embeddings are cached on disk, so unchanged routes and repeated
+        # queries are matched without another embedding call.
+        self.encoder = CachedEncoder(encoder)
+
+        self.route_layer = RouteLayer(
+            encoder=self.encoder, routes=function_routes, index=NormalizedIndex()
+        )
+
+        if cache is None:
+            cache = ResponseCache(encoder=self.encoder if semantic_cache else None)
+        self.cache = cache
+
+    @property
+    def async_client(self):
+        return get_async_openai_client(self.api_key)
+
+    def _text_request(self, messages: List[Dict]) -> Tuple[str, str, Optional[str]]:
+        key = cache_key("generate", MODEL, TEMPERATURE, messages)
+        # Near-duplicate lookups only compare the final user message; the
+        # rest of the conversation must match exactly.
+        namespace = cache_key("generate", MODEL, TEMPERATURE, messages[:-1])
+        query = messages[-1].get("content") if messages and messages[-1].get("role") == "user" else None
+        return key, namespace, query
+
+    def _completion(self, name: str, messages: List[Dict]) -> str:
+        telemetry.payload(f"{name}.request", model=MODEL, messages=messages)
+        response = self.client.chat.completions.create(
+            model=MODEL,
+            messages=messages,
+            temperature=TEMPERATURE,
+        )
+        telemetry.payload(f"{name}.response", response=response.model_dump())
+        return response.choices[0].message.content.strip()
+
+    async def _acompletion(self, name: str, messages: List[Dict]) -> str:
+        telemetry.payload(f"{name}.request", model=MODEL, messages=messages)
+        response = await self.async_client.chat.completions.create(
+            model=MODEL,
+            messages=messages,
+            temperature=TEMPERATURE,
+        )
+        telemetry.payload(f"{name}.response", response=response.model_dump())
+        return response.choices[0].message.content.strip()
 
     def generate_text(self, messages: List[Dict], task: str = "response") -> str:
+        with telemetry.span("llm", labels={"call": "generate_text", "backend": "openai"}) as span:
+            key, namespace, query = self._text_request(messages)
+            cached = self.cache.get(key, namespace, query)
+            span.set(cache="hit" if cached is not None else "miss")
+            if cached is not None:
+                return cached
+            text = self._completion("llm.generate_text", messages)
+            self.cache.put(key, text, namespace, query)
+            return text
+
+    async def agenerate_text(self, messages: List[Dict], task: str = "response") -> str:
+        with telemetry.span("llm", labels={"call": "generate_text", "backend": "openai"}) as span:
+            key, namespace, query = self._text_request(messages)
+            cached = self.cache.get(key, namespace, query)
+            span.set(cache="hit" if cached is not None else "miss")
+            if cached is not None:
+                return cached
+            text = await self._acompletion("llm.generate_text", messages)
+            self.cache.put(key, text, namespace, query)
+            return text
+
+    async def agenerate_batch(
+        self, batch: List[List[Dict]], concurrency: int = BATCH_CONCURRENCY
+    ) -> List[str]:
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def generate(messages):
+            async with semaphore:
+                return await self.agenerate_text(messages)
+
+        return await asyncio.gather(*(generate(messages) for messages in batch))
+
+    def generate_batch(self, batch: List[List[Dict]], concurrency: int = BATCH_CONCURRENCY) -> List[str]:
+        async def run():
+            try:
+                return await self.agenerate_batch(batch, concurrency)
+            finally:
+                # The loop ends with this call, so its client pool goes too.
+                await close_async_clients()
+
+        return asyncio.run(run())
+
+    def _extraction_request(self, query: str, function_schema: Union[str, Dict[str, Any]]):
+        if isinstance(function_schema, str):
+            # Tools registered with the agent can be referenced by name.
+            function_schema = registry.get(function_schema).schema["function"]
+        schema_json = json.dumps(function_schema, sort_keys=True, separators=(",", ":"))
+        namespace = cache_key("extract", MODEL, TEMPERATURE, schema_json)
+        messages = [
+            {"role": "system", "content": EXTRACTION_SYSTEM_PROMPT},
+            {"role": "user", "content": extraction_prompt(schema_json, query)},
+        ]
+        return function_schema, cache_key(namespace, query), namespace, messages
+
+    def _parse_extraction(
+        self, extracted_inputs_str: str, function_schema: Dict[str, Any], key: str, namespace: str
+    ) -> Dict[str, Any]:
         try:
-            print(f"OpenAILLM: Sending request to OpenAI API with messages: {messages}")
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=messages,
-                temperature=0.7,
-            )
-            print(f"OpenAILLM: Received response from OpenAI API: {response}")
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            print("OpenAILLM: Error in generate_text:")
-            print(str(e))
-            raise e
+            extracted_inputs = json.loads(extracted_inputs_str) if extracted_inputs_str else {}
+            # Validate the extracted inputs against the function schema
+            registry.validator_for(function_schema).validate(extracted_inputs)
+        except (json.JSONDecodeError, ValidationError) as e:
+            error = e.message if isinstance(e, ValidationError) else str(e)
+            telemetry.count("jarvis_llm_invalid_extractions_total", function=function_schema.get("name"))
+            telemetry.event("llm.invalid_extraction", function=function_schema.get("name"), error=error)
+            return {}  # Return an empty dictionary if extraction fails
+        # Only validated results are cached, so a bad answer is retried.
+        self.cache.put(key, json.dumps(extracted_inputs), namespace)
+        return extracted_inputs
 
     def extract_function_inputs(
-        self, query: str, function_schema: Dict[str, Any]
+        self, query: str, function_schema: Union[str, Dict[str, Any]]
     ) -> Dict[str, Any]:
-        try:
-            print(f"OpenAILLM: Extracting function inputs for query: {query}")
-            print(f"OpenAILLM: Function schema: {function_schema}")
-
-            prompt = f"""
-            You are an AI assistant designed to extract input parameters from user queries based on a provided function schema.
-
-            Function Schema:
-            {json.dumps(function_schema, indent=2)}
-
-            User Query:
-            {query}
-
-            Extract the input parameters from the user query and return them as a JSON object with the following format:
-            {{
-                "parameter_name_1": "parameter_value_1",
-                "parameter_name_2": "parameter_value_2",
-                ...
-            }}
-
-            If a parameter is not provided in the user query or is not defined in the function schema, omit it from the JSON object. Ensure that the parameter names exactly match those defined in the function schema.
-
-            Extracted Inputs:
-            """
-
-            print(f"OpenAILLM: Sending request to OpenAI API with prompt: {prompt}")
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an AI assistant designed to extract input parameters from user queries based on a provided function schema.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=0.7,
-            )
-            print(f"OpenAILLM: Received response from OpenAI API: {response}")
-
-            extracted_inputs_str = response.choices[0].message.content.strip()
-            print(f"OpenAILLM: Extracted inputs string: {extracted_inputs_str}")
-            try:
-                if extracted_inputs_str:
-                    extracted_inputs = json.loads(extracted_inputs_str)
-                else:
-                    extracted_inputs = {}
-                print(f"OpenAILLM: Extracted inputs (before validation): {extracted_inputs}")
-
-                # Validate the extracted inputs against the function schema
-                validate(extracted_inputs, function_schema["parameters"])
-                print(f"OpenAILLM: Extracted inputs (after validation): {extracted_inputs}")
-                return extracted_inputs
-            except (json.JSONDecodeError, ValidationError) as e:
-                print("OpenAILLM: Error parsing or validating extracted inputs:")
-                if isinstance(e, ValidationError):
-                    error_details = e.message
-                    print(f"Validation error details: {error_details}")
-                else:
-                    print(str(e))
-                print("OpenAILLM: Extracted inputs string:")
-                print(extracted_inputs_str)
-                return {}  # Return an empty dictionary if extraction fails
-        except Exception as e:
-            print("OpenAILLM: Error in extract_function_inputs:")
-            print(str(e))
-            raise e
+        with telemetry.span("llm", labels={"call": "extract_function_inputs", "backend": "openai"}) as span:
+            function_schema, key, namespace, messages = self._extraction_request(query, function_schema)
+            # Exact matches only: near-duplicate queries differ in exactly the
+            # argument values ("go to documents" vs "go to downloads").
+            cached = self.cache.get(key, namespace)
+            span.set(function=function_schema.get("name"), cache="hit" if cached is not None else "miss")
+            if cached is not None:
+                return json.loads(cached)
+            text = self._completion("llm.extract_function_inputs", messages)
+            return self._parse_extraction(text, function_schema, key, namespace)
+
+    async def aextract_function_inputs(
+        self, query: str, function_schema: Union[str, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        with telemetry.span("llm", labels={"call": "extract_function_inputs", "backend": "openai"}) as span:
+            function_schema, key, namespace, messages = self._extraction_request(query, function_schema)
+            # Exact matches only: near-duplicate queries differ in exactly the
+            # argument values ("go to documents" vs "go to downloads").
+            cached = self.cache.get(key, namespace)
+            span.set(function=function_schema.get("name"), cache="hit" if cached is not None else "miss")
+            if cached is not None:
+                return json.loads(cached)
+            text = await self._acompletion("llm.extract_function_inputs", messages)
+            return self._parse_extraction(text, function_schema, key, namespace)
@@ -0,0 +1,14 @@
+import os
+
+
+def cache_dir(*parts: str) -> str:
+    path = os.path.join(
+        os.getenv("JARVIS_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "jarvis"),
+        *parts,
+    )
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def daemon_socket() -> str:
+    return os.getenv("JARVIS_SOCKET") or os.path.join(cache_dir(), "daemon.sock")
@@ -0,0 +1,201 @@
+import asyncio
+import codecs
+import os
+import signal
+import sys
+import time
+from typing import Callable, NamedTuple, Optional
+
+HEAD_BYTES = int(os.getenv("JARVIS_OUTPUT_HEAD_BYTES", str(16 * 1024)))
+TAIL_BYTES = int(os.getenv("JARVIS_OUTPUT_TAIL_BYTES", str(48 * 1024)))
+CHUNK_BYTES = 64 * 1024
+
+
+class RingBuffer:
+    # Keeps the first head_size bytes and a rolling window of the last
+    # tail_size bytes, so memory stays bounded however much is written.
+
+    def __init__(self, head_size: int = HEAD_BYTES, tail_size: int = TAIL_BYTES):
+        self.head_size = head_size
+        self.tail_size = tail_size
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+
+    def write(self, data: bytes) -> None:
+        self.total += len(data)
+        room = self.head_size - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if data:
+            self.tail += data
+            excess = len(self.tail) - self.tail_size
+            if excess > 0:
+                del self.tail[:excess]
+
+    @property
+    def dropped(self) -> int:
+        return self.total - len(self.head) - len(self.tail)
+
+    def getvalue(self) -> str:
+        head = self.head.decode("utf-8", errors="replace")
+        tail = self.tail.decode("utf-8", errors="replace")
+        if self.dropped:
+            return f"{head}\n... [{self.dropped} bytes omitted] ...\n{tail}"
+        return head + tail
+
+
+class RunResult(NamedTuple):
+    returncode: Optional[int]
+    stdout: str
+    stderr: str
+    duration: float
+    timed_out: bool
+    interrupted: bool
+
+
+def _kill(process: asyncio.subprocess.Process) -> None:
+    if process.returncode is not None:
+        return
+    # The command runs through a shell in its own session; take the whole
+    # group down so grandchildren don't outlive it.
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        try:
+            process.kill()
+        except ProcessLookupError:
+            pass
+
+
+async def _pump(stream: asyncio.StreamReader, buffer: RingBuffer, echo: Optional[Callable[[bytes], None]]) -> None:
+    while True:
+        chunk = await stream.read(CHUNK_BYTES)
+        if not chunk:
+            return
+        buffer.write(chunk)
+        if echo is not None:
+            echo(chunk)
+
+
+def _echo(stream=None, write: Optional[Callable[[str], None]] = None) -> Optional[Callable[[bytes], None]]:
+    if write is not None:
+        # One decoder per stream, so a character split across chunks survives.
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        return lambda chunk: write(decoder.decode(chunk))
+    binary = getattr(stream, "buffer", None)
+    if binary is None:
+        return None
+
+    def echo(chunk: bytes) -> None:
+        binary.write(chunk)
+        binary.flush()
+
+    return echo
+
+
+def _watch_stdin(loop: asyncio.AbstractEventLoop, interrupted: asyncio.Event) -> bool:
+    # Pressing space (then enter) stops the run, as the old select loop did.
+    if not sys.stdin.isatty():
+        return False
+
+    def on_input():
+        if sys.stdin.read(1) == " ":
+            interrupted.set()
+
+    try:
+        loop.add_reader(sys.stdin.fileno(), on_input)
+    except (NotImplementedError, ValueError, OSError):
+        return False
+    return True
+
+
+async def run_async(
+    command: str,
+    cwd: Optional[str] = None,
+    timeout: Optional[float] = None,
+    stdout: Optional[RingBuffer] = None,
+    stderr: Optional[RingBuffer] = None,
+    passthrough: bool = False,
+    interruptible: bool = False,
+    write: Optional[Callable[[str], None]] = None,
+) -> RunResult:
+    # With passthrough, output is echoed to this process's stdout and stderr
+    # as it arrives, or to write when given.
+    stdout = stdout if stdout is not None else RingBuffer()
+    stderr = stderr if stderr is not None else RingBuffer()
+    started = time.monotonic()
+    process = await asyncio.create_subprocess_shell(
+        command,
+        cwd=cwd,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=True,
+    )
+
+    loop = asyncio.get_running_loop()
+    interrupted = asyncio.Event()
+    watching = interruptible and _watch_stdin(loop, interrupted)
+    pumps = asyncio.gather(
+        _pump(process.stdout, stdout, _echo(sys.stdout, write) if passthrough else None),
+        _pump(process.stderr, stderr, _echo(sys.stderr, write) if passthrough else None),
+        process.wait(),
+    )
+    interrupt = asyncio.ensure_future(interrupted.wait())
+    timed_out = False
+    try:
+        done, _ = await asyncio.wait({pumps, interrupt}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        if pumps not in done:
+            timed_out = not interrupted.is_set()
+            _kill(process)
+            await process.wait()
+            # Give the readers a moment to drain what is already buffered.
+            await asyncio.wait({pumps}, timeout=1)
+    except asyncio.CancelledError:
+        _kill(process)
+        raise
+    finally:
+        interrupt.cancel()
+        if not pumps.done():
+            pumps.cancel()
+        if watching:
+            loop.remove_reader(sys.stdin.fileno())
+
+    return RunResult(
+        returncode=process.returncode,
+        stdout=stdout.getvalue(),
+        stderr=stderr.getvalue(),
+        duration=time.monotonic() - started,
+        timed_out=timed_out,
+        interrupted=interrupted.is_set(),
+    )
+
+
+def run_command(
+    command: str,
+    cwd: Optional[str] = None,
+    timeout: Optional[float] = None,
+    passthrough: bool = False,
+    interruptible: bool = False,
+    write: Optional[Callable[[str], None]] = None,
+) -> RunResult:
+    stdout = RingBuffer()
+    stderr = RingBuffer()
+    started = time.monotonic()
+    try:
+        return asyncio.run(
+            run_async(command, cwd, timeout, stdout, stderr, passthrough, interruptible, write)
+        )
+    except KeyboardInterrupt:
+        # Ctrl-C cancels the run; the coroutine has already killed the
+        # process, so report whatever was captured.
+        return RunResult(
+            returncode=None,
+            stdout=stdout.getvalue(),
+            stderr=stderr.getvalue(),
+            duration=time.monotonic() - started,
+            timed_out=False,
+            interrupted=True,
+        )
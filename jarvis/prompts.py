@@ -0,0 +1,34 @@
+import json
+from functools import lru_cache
+
+EXTRACTION_SYSTEM_PROMPT = "You are an AI assistant designed to extract input parameters from user queries based on a provided function schema."
+EXTRACTION_PROMPT_HEAD = """
+            You are an AI assistant designed to extract input parameters from user queries based on a provided function schema.
+
+            Function Schema:
+            {schema}
+
+            User Query:
+            """
+EXTRACTION_PROMPT_TAIL = """
+
+            Extract the input parameters from the user query and return them as a JSON object with the following format:
+            {
+                "parameter_name_1": "parameter_value_1",
+                "parameter_name_2": "parameter_value_2",
+                ...
+            }
+
+            If a parameter is not provided in the user query or is not defined in the function schema, omit it from the JSON object. Ensure that the parameter names exactly match those defined in the function schema.
+
+            Extracted Inputs:
+            """
+
+
+@lru_cache(maxsize=128)
+def extraction_prompt_head(schema_json: str) -> str:
+    return EXTRACTION_PROMPT_HEAD.format(schema=json.dumps(json.loads(schema_json), indent=2))
+
+
+def extraction_prompt(schema_json: str, query: str) -> str:
+    return extraction_prompt_head(schema_json) + query + EXTRACTION_PROMPT_TAIL
@@ -0,0 +1,54 @@
+import argparse
+import json
+import os
+import socket
+import sys
+
+from .paths import daemon_socket
+
+
+def main():
+    # A thin client for jarvis.daemon: it only reads input, forwards it and
+    # prints the streamed reply, so it starts without loading any of Jarvis.
+    parser = argparse.ArgumentParser(description="Talk to a running Jarvis daemon")
+    parser.add_argument("--socket", help="socket path (default: $JARVIS_SOCKET or <cache dir>/daemon.sock)")
+    parser.add_argument("--session", help="resume a session by id")
+    args = parser.parse_args()
+
+    path = args.socket or daemon_socket()
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(path)
+    except OSError:
+        print(f"No Jarvis daemon is listening on {path}; start one with python -m jarvis.daemon")
+        sys.exit(1)
+
+    session = args.session
+    with connection, connection.makefile("rwb") as stream:
+        while True:
+            try:
+                user_input = input("User: ")
+            except EOFError:
+                break
+            if user_input.lower() == 'exit':
+                break
+
+            request = {"session": session, "cwd": os.getcwd(), "input": user_input}
+            stream.write(json.dumps(request).encode() + b"\n")
+            stream.flush()
+            for line in stream:
+                message = json.loads(line)
+                if "text" in message:
+                    print(message["text"], end="", flush=True)
+                if "error" in message:
+                    print(f"Error: {message['error']}")
+                if message.get("done"):
+                    session = message["session"]
+                    break
+            else:
+                print("The daemon closed the connection")
+                break
+
+
+if __name__ == "__main__":
+    main()
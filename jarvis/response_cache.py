@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from .paths import cache_dir
+
+CACHE_ENTRIES = int(os.getenv("JARVIS_RESPONSE_CACHE_SIZE", "2000"))
+CACHE_TTL = float(os.getenv("JARVIS_RESPONSE_CACHE_TTL", str(7 * 24 * 3600)))
+SIMILARITY_THRESHOLD = float(os.getenv("JARVIS_SEMANTIC_CACHE_THRESHOLD", "0.97"))
+
+
+def cache_key(*parts: Any) -> str:
+    raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_entries: int = CACHE_ENTRIES,
+        ttl: float = CACHE_TTL,
+        encoder=None,
+        similarity_threshold: float = SIMILARITY_THRESHOLD,
+    ):
+        if path is None:
+            path = os.path.join(cache_dir(), "responses.sqlite3")
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.encoder = encoder
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, namespace TEXT NOT NULL, response TEXT NOT NULL, "
+            "created REAL NOT NULL, last_used REAL NOT NULL, embedding BLOB)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_namespace ON responses (namespace)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._conn.commit()
+
+    def _embed(self, query: str) -> Optional[np.ndarray]:
+        if self.encoder is None:
+            return None
+        vector = np.asarray(self.encoder([query])[0], dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _similar(self, namespace: str, vector: np.ndarray, now: float) -> Optional[Tuple[str, str]]:
+        rows = self._conn.execute(
+            "SELECT key, response, embedding FROM responses "
+            "WHERE namespace = ? AND embedding IS NOT NULL AND created > ?",
+            (namespace, now - self.ttl),
+        ).fetchall()
+        rows = [row for row in rows if len(row[2]) == vector.nbytes]
+        if not rows:
+            return None
+        matrix = np.frombuffer(b"".join(row[2] for row in rows), dtype=np.float32).reshape(len(rows), -1)
+        scores = matrix @ vector
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity_threshold:
+            return None
+        return rows[best][0], rows[best][1]
+
+    def get(self, key: str, namespace: str = "", query: Optional[str] = None) -> Optional[str]:
+        # Exact match first; only near-duplicate queries within the same
+        # namespace (model, schema, earlier messages) are compared.
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] <= self.ttl:
+                self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+                self.hits += 1
+                return row[0]
+
+        if query is not None and self.encoder is not None:
+            vector = self._embed(query)
+            with self._lock:
+                match = self._similar(namespace, vector, now)
+                if match is not None:
+                    self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, match[0]))
+                    self._conn.commit()
+                    self.semantic_hits += 1
+                    return match[1]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, response: str, namespace: str = "", query: Optional[str] = None) -> None:
+        vector = self._embed(query) if query is not None else None
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, namespace, response, created, last_used, embedding) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, namespace, response, now, now, vector.tobytes() if vector is not None else None),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM responses WHERE created <= ?", (now - self.ttl,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        return {
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "entries": entries,
+        }
+
+    def summary(self) -> str:
+        stats = self.stats()
+        lookups = stats["hits"] + stats["semantic_hits"] + stats["misses"]
+        if not lookups:
+            return "Response cache: no lookups"
+        rate = (stats["hits"] + stats["semantic_hits"]) / lookups
+        return (
+            f"Response cache: {stats['hits']} exact hits, {stats['semantic_hits']} semantic hits, "
+            f"{stats['misses']} misses ({rate:.0%} hit rate), {stats['entries']} entries"
+        )
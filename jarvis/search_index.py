@@ -0,0 +1,441 @@
+import fnmatch
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from .file_reader import is_binary
+from .paths import cache_dir
+
+MAX_FILE_BYTES = int(os.getenv("JARVIS_SEARCH_MAX_FILE_BYTES", str(1024 * 1024)))
+# Outside a repository the index is rooted at the cwd, which may be ~ or /;
+# past this many files the walk stops.
+MAX_INDEX_FILES = int(os.getenv("JARVIS_SEARCH_MAX_FILES", "100000"))
+REFRESH_INTERVAL = 2.0
+MAX_MATCHES_PER_FILE = 5
+MAX_LINE_CHARS = 200
+ALWAYS_SKIP = {".git", ".hg", ".svn"}
+# Bumped whenever the trigram scheme changes, so old indexes are rebuilt.
+INDEX_VERSION = 2
+
+
+class Match(NamedTuple):
+    path: str
+    line_number: int
+    line: str
+
+
+def _trigrams(text: str) -> Set[int]:
+    # Casefolded so the prefilter never drops a case-insensitive match,
+    # including non-ASCII ones; case-sensitive searches just see a superset.
+    data = text.casefold().encode("utf-8")
+    return {
+        (data[i] << 16) | (data[i + 1] << 8) | data[i + 2]
+        for i in range(len(data) - 2)
+    }
+
+
+def _gitignore_regex(pattern: str) -> str:
+    out = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            out.append("/.*")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        elif pattern[i] == "[":
+            end = pattern.find("]", i + 1)
+            if end < 0:
+                out.append(re.escape(pattern[i]))
+                i += 1
+            else:
+                body = pattern[i + 1:end].replace("\\", "\\\\")
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = end + 1
+        elif pattern[i] == "\\" and i + 1 < len(pattern):
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(out)
+
+
+class GitIgnore:
+    # Enough of gitignore(5) for ranking out build output and dependencies:
+    # comments, negation, directory-only and anchored patterns, and **.
+
+    def __init__(self):
+        self._rules: List[Tuple[str, "re.Pattern", bool, bool]] = []
+
+    def load(self, directory: str) -> None:
+        try:
+            with open(os.path.join(directory, ".gitignore"), errors="replace") as ignore_file:
+                lines = ignore_file.read().splitlines()
+        except OSError:
+            return
+        for line in lines:
+            line = line.rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            # A slash anywhere but the end anchors the pattern, "/build/" too.
+            anchored = "/" in line
+            line = line.lstrip("/")
+            regex = _gitignore_regex(line)
+            if not anchored:
+                regex = f"(?:.*/)?{regex}"
+            self._rules.append((directory, re.compile(f"^{regex}$"), negate, dir_only))
+
+    def ignored(self, path: str, is_dir: bool) -> bool:
+        result = False
+        for base, regex, negate, dir_only in self._rules:
+            if dir_only and not is_dir:
+                continue
+            if not path.startswith(base + os.sep):
+                continue
+            if regex.match(os.path.relpath(path, base).replace(os.sep, "/")):
+                result = not negate
+        return result
+
+
+def _required_literals(pattern: str) -> List[str]:
+    # Literal runs every match must contain, used to narrow candidates by
+    # trigram. Anything we can't reason about simply yields fewer literals.
+    if "|" in pattern:
+        return []
+    runs = []
+    current = ""
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\" and i + 1 < len(pattern):
+            escaped = pattern[i + 1]
+            if not escaped.isalnum():
+                current += escaped
+            else:
+                runs.append(current)
+                current = ""
+            i += 2
+            continue
+        if c in "*?{":
+            runs.append(current[:-1])
+            current = ""
+            if c == "{":
+                end = pattern.find("}", i)
+                i = end + 1 if end >= 0 else i + 1
+            else:
+                i += 1
+            continue
+        if c in "+.^$)":
+            runs.append(current)
+            current = ""
+        elif c == "[":
+            runs.append(current)
+            current = ""
+            end = pattern.find("]", i + 2)
+            i = end + 1 if end >= 0 else len(pattern)
+            continue
+        elif c == "(":
+            # Group contents may be optional; skip to the matching paren.
+            runs.append(current)
+            current = ""
+            depth = 0
+            while i < len(pattern):
+                if pattern[i] == "\\":
+                    i += 2
+                    continue
+                depth += pattern[i] == "("
+                depth -= pattern[i] == ")"
+                i += 1
+                if depth == 0:
+                    break
+            if i < len(pattern) and pattern[i] in "*?{":
+                i += 1
+            continue
+        else:
+            current += c
+        i += 1
+    runs.append(current)
+    return [run for run in runs if len(run.encode()) >= 3]
+
+
+class SearchIndex:
+    def __init__(self, root: str, db_path: Optional[str] = None, max_files: int = MAX_INDEX_FILES):
+        self.root = os.path.abspath(root)
+        self.max_files = max_files
+        # Set when the last walk stopped at max_files.
+        self.truncated = False
+        if db_path is None:
+            digest = hashlib.sha256(self.root.encode()).hexdigest()[:16]
+            db_path = os.path.join(cache_dir("search"), f"{digest}.sqlite3")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+            self._conn.executescript(
+                f"""
+                DROP TABLE IF EXISTS postings;
+                DROP TABLE IF EXISTS files;
+                PRAGMA user_version = {INDEX_VERSION};
+                """
+            )
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS files (
+                id INTEGER PRIMARY KEY,
+                path TEXT UNIQUE NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                indexed INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                trigram INTEGER NOT NULL,
+                file_id INTEGER NOT NULL,
+                PRIMARY KEY (trigram, file_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_by_file ON postings (file_id);
+            """
+        )
+        self._last_refresh = 0.0
+
+    def _walk(self) -> Dict[str, os.stat_result]:
+        found = {}
+        ignore = GitIgnore()
+        # Breadth first, so a capped walk covers the shallow files.
+        queue = deque([self.root])
+        self.truncated = False
+        while queue:
+            directory = queue.popleft()
+            ignore.load(directory)
+            try:
+                with os.scandir(directory) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.name in ALWAYS_SKIP:
+                    continue
+                try:
+                    if entry.is_symlink():
+                        continue
+                    if entry.is_dir():
+                        if not ignore.ignored(entry.path, True):
+                            queue.append(entry.path)
+                    elif entry.is_file() and not ignore.ignored(entry.path, False):
+                        if len(found) >= self.max_files:
+                            self.truncated = True
+                            return found
+                        found[entry.path] = entry.stat()
+                except OSError:
+                    continue
+        return found
+
+    def _index_file(self, path: str, stat: os.stat_result) -> Set[int]:
+        if stat.st_size > MAX_FILE_BYTES:
+            return set()
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+        except OSError:
+            return set()
+        if is_binary(data[:8192]):
+            return set()
+        # Decoded the same way search() reads files.
+        return _trigrams(data.decode("utf-8", errors="replace"))
+
+    def refresh(self, force: bool = False) -> Tuple[int, int]:
+        with self._lock:
+            if not force and time.monotonic() - self._last_refresh < REFRESH_INTERVAL:
+                return 0, 0
+            on_disk = self._walk()
+            known = {
+                path: (file_id, mtime_ns, size)
+                for file_id, path, mtime_ns, size in self._conn.execute(
+                    "SELECT id, path, mtime_ns, size FROM files"
+                )
+            }
+            removed = [known[path][0] for path in known.keys() - on_disk.keys()]
+            changed = [
+                (path, stat)
+                for path, stat in on_disk.items()
+                if path not in known or known[path][1:] != (stat.st_mtime_ns, stat.st_size)
+            ]
+            with self._conn:
+                for file_id in removed:
+                    self._conn.execute("DELETE FROM postings WHERE file_id = ?", (file_id,))
+                    self._conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+                for path, stat in changed:
+                    trigrams = self._index_file(path, stat)
+                    if path in known:
+                        file_id = known[path][0]
+                        self._conn.execute("DELETE FROM postings WHERE file_id = ?", (file_id,))
+                        self._conn.execute(
+                            "UPDATE files SET mtime_ns = ?, size = ?, indexed = ? WHERE id = ?",
+                            (stat.st_mtime_ns, stat.st_size, bool(trigrams), file_id),
+                        )
+                    else:
+                        file_id = self._conn.execute(
+                            "INSERT INTO files (path, mtime_ns, size, indexed) VALUES (?, ?, ?, ?)",
+                            (path, stat.st_mtime_ns, stat.st_size, bool(trigrams)),
+                        ).lastrowid
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO postings (trigram, file_id) VALUES (?, ?)",
+                        ((trigram, file_id) for trigram in trigrams),
+                    )
+            self._last_refresh = time.monotonic()
+            return len(changed), len(removed)
+
+    def _candidates(self, literals: Iterable[str], scope: str) -> List[str]:
+        trigrams = set()
+        for literal in literals:
+            trigrams |= _trigrams(literal)
+        prefix = os.path.join(scope, "")
+        with self._lock:
+            if not trigrams:
+                rows = self._conn.execute(
+                    "SELECT path FROM files WHERE indexed AND substr(path, 1, ?) = ?",
+                    (len(prefix), prefix),
+                )
+                return [path for (path,) in rows]
+            # Intersect posting lists, rarest trigram first.
+            counts = sorted(
+                (self._conn.execute("SELECT COUNT(*) FROM postings WHERE trigram = ?", (t,)).fetchone()[0], t)
+                for t in trigrams
+            )
+            if counts[0][0] == 0:
+                return []
+            # A handful of the rarest trigrams narrows things down enough;
+            # the regex does the rest.
+            counts = counts[:8]
+            placeholders = " INTERSECT ".join(
+                "SELECT file_id FROM postings WHERE trigram = ?" for _ in counts
+            )
+            rows = self._conn.execute(
+                f"SELECT path FROM files WHERE id IN ({placeholders}) AND substr(path, 1, ?) = ?",
+                [t for _, t in counts] + [len(prefix), prefix],
+            )
+            return [path for (path,) in rows]
+
+    def search(
+        self,
+        pattern: str,
+        scope: Optional[str] = None,
+        regex: bool = False,
+        case_sensitive: bool = False,
+        glob: Optional[str] = None,
+        max_results: int = 50,
+    ) -> Tuple[List[Match], int]:
+        self.refresh()
+        flags = 0 if case_sensitive else re.IGNORECASE
+        compiled = re.compile(pattern if regex else re.escape(pattern), flags)
+        literals = _required_literals(pattern) if regex else [pattern]
+        candidates = self._candidates(literals, scope or self.root)
+        if glob:
+            candidates = [p for p in candidates if fnmatch.fnmatch(os.path.basename(p), glob)]
+
+        per_file = []
+        for path in candidates:
+            try:
+                with open(path, encoding="utf-8", errors="replace") as file:
+                    text = file.read()
+            except OSError:
+                continue
+            if not compiled.search(text):
+                continue
+            hits = []
+            count = 0
+            for number, line in enumerate(text.splitlines(), 1):
+                if compiled.search(line):
+                    count += 1
+                    if len(hits) < MAX_MATCHES_PER_FILE:
+                        hits.append(Match(path, number, line.strip()[:MAX_LINE_CHARS]))
+            per_file.append((count, path, hits))
+
+        # Files with more hits first, then shallower paths.
+        per_file.sort(key=lambda item: (-item[0], item[1].count(os.sep), item[1]))
+        total = sum(count for count, _, _ in per_file)
+        matches = [hit for _, _, hits in per_file for hit in hits][:max_results]
+        return matches, total
+
+    def find(
+        self, pattern: str, scope: Optional[str] = None, max_results: int = 50
+    ) -> Tuple[List[str], int]:
+        self.refresh()
+        prefix = os.path.join(scope or self.root, "")
+        with self._lock:
+            paths = [
+                path
+                for (path,) in self._conn.execute(
+                    "SELECT path FROM files WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)
+                )
+            ]
+        has_wildcards = any(c in pattern for c in "*?[")
+        needle = pattern.lower()
+        ranked = []
+        for path in paths:
+            name = os.path.basename(path)
+            relative = path[len(prefix):]
+            if has_wildcards:
+                target = relative if "/" in pattern else name
+                if not fnmatch.fnmatch(target, pattern):
+                    continue
+                rank = 0
+            elif name.lower() == needle:
+                rank = 0
+            elif needle in name.lower():
+                rank = 1
+            elif needle in relative.lower():
+                rank = 2
+            else:
+                continue
+            ranked.append((rank, relative.count(os.sep), relative))
+        ranked.sort()
+        return [os.path.join(prefix, relative) for _, _, relative in ranked[:max_results]], len(ranked)
+
+
+_indexes: Dict[str, SearchIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def project_root(path: str) -> str:
+    # Index the whole repository when inside one, so moving around it keeps
+    # reusing the same index.
+    current = os.path.abspath(path)
+    while True:
+        if os.path.isdir(os.path.join(current, ".git")):
+            return current
+        parent = os.path.dirname(current)
+        if parent == current:
+            return os.path.abspath(path)
+        current = parent
+
+
+def get_search_index(path: str) -> SearchIndex:
+    root = project_root(path)
+    with _indexes_lock:
+        if root not in _indexes:
+            _indexes[root] = SearchIndex(root)
+        return _indexes[root]
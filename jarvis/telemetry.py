@@ -0,0 +1,241 @@
+import contextvars
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+
+from .paths import cache_dir
+
+TRACE_ENABLED = os.getenv("JARVIS_TRACE", "1").lower() not in ("0", "false", "no", "off")
+LOG_PAYLOADS = os.getenv("JARVIS_LOG_PAYLOADS", "").lower() in ("1", "true", "yes", "on")
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+FLUSH_LINES = 64
+
+_SECRET_KEY = re.compile(r"key|token|secret|password|authorization", re.IGNORECASE)
+_SECRET_VALUE = re.compile(r"\b(sk-[A-Za-z0-9_-]{4})[A-Za-z0-9_-]+|\b(Bearer\s+)\S+")
+
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("jarvis_span", default=None)
+_ids = itertools.count(1)
+
+
+def redact(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {
+            key: "***" if isinstance(key, str) and _SECRET_KEY.search(key) else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    if isinstance(value, str):
+        return _SECRET_VALUE.sub(lambda m: (m.group(1) or m.group(2)) + "***", value)
+    return value
+
+
+def _label_key(labels: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        total = 0
+        result = []
+        for bound, count in zip(list(BUCKETS) + ["+Inf"], self.counts):
+            total += count
+            result.append((str(bound), total))
+        return result
+
+
+class Span:
+    def __init__(self, telemetry: "Telemetry", name: str, labels: Dict[str, Any], attrs: Dict[str, Any]):
+        self.telemetry = telemetry
+        self.name = name
+        self.labels = labels
+        self.attrs = attrs
+        self.id = next(_ids)
+        self.parent = _current.get()
+        self.trace = self.parent.trace if self.parent is not None else self.id
+        self.started = time.perf_counter()
+        self.duration: Optional[float] = None
+        self._token = None
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def find(self, name: str) -> Optional["Span"]:
+        span = self
+        while span is not None and span.name != name:
+            span = span.parent
+        return span
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        _current.reset(self._token)
+        self.duration = time.perf_counter() - self.started
+        if exc is not None:
+            self.attrs.setdefault("error", f"{exc_type.__name__}: {exc}")
+        self.telemetry._finish(self)
+
+
+class Telemetry:
+    # Spans go to a JSON-lines trace; counters and histograms are kept in
+    # memory and written out as Prometheus text and JSON on flush().
+
+    def __init__(self, enabled: bool = TRACE_ENABLED, log_payloads: bool = LOG_PAYLOADS, directory: Optional[str] = None):
+        self.enabled = enabled
+        self.log_payloads = log_payloads
+        self.directory = directory
+        self.counters: Dict[str, Dict[tuple, float]] = {}
+        self.histograms: Dict[str, Dict[tuple, Histogram]] = {}
+        self._lines: List[str] = []
+        self._lock = threading.Lock()
+
+    def _path(self, name: str) -> str:
+        if self.directory is None:
+            self.directory = os.getenv("JARVIS_TELEMETRY_DIR") or cache_dir("telemetry")
+        return os.path.join(self.directory, name)
+
+    def span(self, name: str, labels: Optional[Dict[str, Any]] = None, **attrs: Any) -> Span:
+        # Every span also feeds a jarvis_<name>_seconds histogram, split by
+        # labels; attributes only go to the trace.
+        return Span(self, name, labels or {}, attrs)
+
+    def current(self) -> Optional[Span]:
+        return _current.get()
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self._lines.append(line)
+            if len(self._lines) < FLUSH_LINES:
+                return
+            lines, self._lines = self._lines, []
+        self._append(lines)
+
+    def _append(self, lines: List[str]) -> None:
+        if lines:
+            with open(self._path("trace.jsonl"), "a") as trace_file:
+                trace_file.write("\n".join(lines) + "\n")
+
+    def _finish(self, span: Span) -> None:
+        self.observe(f"jarvis_{span.name.replace('.', '_')}_seconds", span.duration, **span.labels)
+        self._write({
+            "ts": round(time.time(), 6),
+            "trace": span.trace,
+            "span": span.id,
+            "parent": span.parent.id if span.parent is not None else None,
+            "name": span.name,
+            "ms": round(span.duration * 1000, 3),
+            **span.labels,
+            **span.attrs,
+        })
+
+    def event(self, name: str, **attrs: Any) -> None:
+        span = _current.get()
+        self._write({
+            "ts": round(time.time(), 6),
+            "trace": span.trace if span is not None else None,
+            "parent": span.id if span is not None else None,
+            "name": name,
+            **attrs,
+        })
+
+    def payload(self, name: str, **data: Any) -> None:
+        # Full request and response bodies, only when explicitly enabled.
+        if self.log_payloads:
+            self.event(name, **redact(data))
+
+    def count(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(seconds)
+
+    def prometheus(self) -> str:
+        def labels_text(key, extra=()):
+            pairs = list(key) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            for name, series in sorted(self.counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{labels_text(key)} {value:g}")
+            for name, series in sorted(self.histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in sorted(series.items()):
+                    for bound, total in histogram.cumulative():
+                        lines.append(f"{name}_bucket{labels_text(key, [('le', bound)])} {total}")
+                    lines.append(f"{name}_sum{labels_text(key)} {histogram.sum:.6f}")
+                    lines.append(f"{name}_count{labels_text(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": {
+                    name: [{"labels": dict(key), "value": value} for key, value in sorted(series.items())]
+                    for name, series in sorted(self.counters.items())
+                },
+                "histograms": {
+                    name: [
+                        {
+                            "labels": dict(key),
+                            "count": histogram.count,
+                            "sum": histogram.sum,
+                            "buckets": dict(histogram.cumulative()),
+                        }
+                        for key, histogram in sorted(series.items())
+                    ]
+                    for name, series in sorted(self.histograms.items())
+                },
+            }
+
+    def flush(self) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            lines, self._lines = self._lines, []
+        self._append(lines)
+        for name, content in (("metrics.prom", self.prometheus()), ("metrics.json", json.dumps(self.snapshot(), indent=2))):
+            path = self._path(name)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as metrics_file:
+                metrics_file.write(content)
+            os.replace(tmp_path, path)
+
+
+telemetry = Telemetry()
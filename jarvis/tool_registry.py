@@ -0,0 +1,171 @@
+import inspect
+import json
+import typing
+from typing import Any, Callable, Dict, List, Optional
+
+from jsonschema import validators
+
+from .telemetry import telemetry
+
+_JSON_TYPES = {
+    str: "string",
+    int: "integer",
+    float: "number",
+    bool: "boolean",
+    list: "array",
+    dict: "object",
+}
+
+
+class ToolArgumentError(ValueError):
+    pass
+
+
+def compile_validator(schema: Dict[str, Any]):
+    validator_cls = validators.validator_for(schema)
+    validator_cls.check_schema(schema)
+    return validator_cls(schema)
+
+
+def _property_schema(annotation) -> Dict[str, Any]:
+    description = None
+    if typing.get_origin(annotation) is typing.Annotated:
+        annotation, *extras = typing.get_args(annotation)
+        description = next((e for e in extras if isinstance(e, str)), None)
+
+    nullable = False
+    if typing.get_origin(annotation) is typing.Union:
+        # Optional[X] is X or null; models often send the null explicitly.
+        args = [a for a in typing.get_args(annotation) if a is not type(None)]
+        nullable = len(args) < len(typing.get_args(annotation))
+        annotation = args[0] if len(args) == 1 else str
+
+    if typing.get_origin(annotation) is typing.Literal:
+        values = list(typing.get_args(annotation))
+        schema = {"type": _JSON_TYPES[type(values[0])], "enum": values}
+    elif typing.get_origin(annotation) in (list, List):
+        (item,) = typing.get_args(annotation) or (str,)
+        schema = {"type": "array", "items": {"type": _JSON_TYPES.get(item, "string")}}
+    else:
+        schema = {"type": _JSON_TYPES.get(annotation, "string")}
+
+    if nullable:
+        schema["type"] = [schema["type"], "null"]
+        if "enum" in schema:
+            schema["enum"] = schema["enum"] + [None]
+    if description:
+        schema["description"] = description
+    return schema
+
+
+class Tool:
+    def __init__(self, name: str, handler: Callable[..., str], read_only: bool = False):
+        self.name = name
+        self.handler = handler
+        self.read_only = read_only
+        self.description = (inspect.getdoc(handler) or name).split("\n\n")[0].replace("\n", " ")
+
+        hints = typing.get_type_hints(handler, include_extras=True)
+        # The first parameter is the ToolContext and is not part of the schema.
+        params = list(inspect.signature(handler).parameters.values())[1:]
+        properties = {}
+        required = []
+        for param in params:
+            properties[param.name] = _property_schema(hints.get(param.name, str))
+            if param.default is inspect.Parameter.empty:
+                required.append(param.name)
+
+        self.parameters = {
+            "type": "object",
+            "properties": properties,
+            "required": required,
+        }
+        self.validator = compile_validator(self.parameters)
+
+    @property
+    def schema(self) -> Dict[str, Any]:
+        return {
+            "type": "function",
+            "function": {
+                "name": self.name,
+                "description": self.description,
+                "parameters": self.parameters,
+            },
+        }
+
+    def parse_arguments(self, arguments: Optional[str]) -> Dict[str, Any]:
+        try:
+            parsed = json.loads(arguments) if arguments else {}
+        except json.JSONDecodeError as e:
+            raise ToolArgumentError(f"arguments are not valid JSON: {e}")
+        error = next(iter(self.validator.iter_errors(parsed)), None)
+        if error is not None:
+            raise ToolArgumentError(error.message)
+        # An explicit null means the parameter's default.
+        return {key: value for key, value in parsed.items() if value is not None}
+
+
+class ToolRegistry:
+    def __init__(self):
+        self._tools: Dict[str, Tool] = {}
+        self._validators: Dict[str, Any] = {}
+
+    def tool(self, read_only: bool = False, name: Optional[str] = None):
+        def decorator(handler):
+            tool = Tool(name or handler.__name__, handler, read_only=read_only)
+            self._tools[tool.name] = tool
+            return handler
+
+        return decorator
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def __iter__(self):
+        return iter(self._tools.values())
+
+    def get(self, name: str) -> Optional[Tool]:
+        return self._tools.get(name)
+
+    def is_read_only(self, name: str) -> bool:
+        tool = self._tools.get(name)
+        return tool is not None and tool.read_only
+
+    def schemas(self) -> List[Dict[str, Any]]:
+        return [tool.schema for tool in self._tools.values()]
+
+    def validator_for(self, function_schema: Dict[str, Any]):
+        tool = self._tools.get(function_schema.get("name"))
+        if tool is not None and tool.parameters == function_schema.get("parameters"):
+            return tool.validator
+
+        # Schemas that did not come from the registry are compiled once and
+        # kept, keyed by their canonical JSON.
+        key = json.dumps(function_schema.get("parameters", {}), sort_keys=True)
+        validator = self._validators.get(key)
+        if validator is None:
+            validator = compile_validator(function_schema.get("parameters", {}))
+            self._validators[key] = validator
+        return validator
+
+    def call(self, ctx, name: str, arguments: Optional[str]) -> str:
+        tool = self._tools.get(name)
+        if tool is None:
+            telemetry.count("jarvis_tool_calls_total", tool="unknown", status="unknown")
+            return f"Unknown tool: {name}"
+        status = "error"
+        with telemetry.span("tool", labels={"tool": name}) as span:
+            try:
+                try:
+                    kwargs = tool.parse_arguments(arguments)
+                except ToolArgumentError as e:
+                    status = "invalid"
+                    output = f"Invalid arguments for {name}: {e}"
+                else:
+                    output = tool.handler(ctx, **kwargs)
+                    status = "ok"
+                span.set(status=status, output_bytes=len(output))
+                telemetry.count("jarvis_tool_output_bytes_total", len(output), tool=name)
+                return output
+            finally:
+                telemetry.count("jarvis_tool_calls_total", tool=name, status=status)
@@ -0,0 +1,434 @@
+import os
+import re
+import sys
+import time
+from collections import deque
+from typing import Annotated, Any, Callable, Deque, Dict, List, Literal, NamedTuple, Optional
+
+from .compactor import CHARS_PER_TOKEN, tool_budget
+from .copy_engine import CopyStats, copy_file, copy_tree, is_unchanged
+from .file_reader import ReadError, read_text
+from .fs_index import DirectoryIndex, fuzzy_match
+from .jobs import JobManager
+from .listing import ListingError, list_entries
+from .proc_runner import run_command
+from .search_index import get_search_index
+from .tool_registry import ToolRegistry
+from .trash import Trash, TrashError
+
+registry = ToolRegistry()
+index = DirectoryIndex()
+jobs = JobManager()
+trash = Trash()
+
+EXECUTE_TIMEOUT = float(os.getenv("JARVIS_EXECUTE_TIMEOUT", "600"))
+SCRIPT_TIMEOUT = float(os.getenv("JARVIS_SCRIPT_TIMEOUT", "120"))
+MAX_WAIT_SECONDS = 300
+MAX_LISTED_DIRECTORIES = 50
+TOOL_HISTORY = int(os.getenv("JARVIS_TOOL_HISTORY", "8"))
+# Left out of a page for its footer and the compactor's rounding.
+PAGE_FOOTER_CHARS = 400
+
+
+class ToolResult(NamedTuple):
+    name: str
+    arguments: str
+    output: str
+    cwd: str
+
+
+class ToolContext:
+    def __init__(
+        self,
+        cwd: str,
+        config: Optional[Dict[str, Any]] = None,
+        write: Optional[Callable[[str], None]] = None,
+        owner: Optional[str] = None,
+    ):
+        self.cwd = cwd
+        self.config = config if config is not None else {"directories": {}}
+        # Where tools show progress and live output. None is this process's
+        # terminal; the daemon points it at the client for each turn.
+        self.write = write
+        # Scopes jobs and trash entries to one daemon session.
+        self.owner = owner
+        # The latest results sent back to the model, for the session header.
+        self.history: Deque[ToolResult] = deque(maxlen=TOOL_HISTORY)
+        self.output_chars = 0
+
+    def resolve(self, path: str) -> str:
+        return os.path.abspath(os.path.join(self.cwd, os.path.expanduser(path)))
+
+    def show(self, text: str, stream=None) -> None:
+        if self.write is not None:
+            self.write(text)
+        else:
+            print(text, end="", file=stream or sys.stdout, flush=True)
+
+    def page_chars(self, tool: str) -> int:
+        # The largest page that fits the tool's output budget whole.
+        budget = tool_budget(tool, self.config.get("tool_budgets")) * CHARS_PER_TOKEN
+        return max(budget - PAGE_FOOTER_CHARS, PAGE_FOOTER_CHARS)
+
+    def remember(self, name: str, arguments: str, output: str, cwd: str) -> None:
+        self.history.append(ToolResult(name, arguments, output, cwd))
+        self.output_chars += len(output)
+
+
+def _changed_directory(ctx: ToolContext, new_directory: str, matched: Optional[str] = None) -> str:
+    ctx.cwd = os.path.abspath(new_directory)
+    output = f"Changed current directory to {ctx.cwd}"
+    if matched is not None:
+        output += f" (closest match for '{matched}')"
+    directories = sorted(index.subdirectories(ctx.cwd), key=str.casefold)
+    if directories:
+        listed = directories[:MAX_LISTED_DIRECTORIES]
+        if len(directories) > len(listed):
+            listed.append(f"+{len(directories) - len(listed):,} more directories")
+        output += f"\nDirectories in the current directory: {', '.join(listed)}"
+    return output
+
+
+@registry.tool(read_only=True)
+def list_directory_contents(
+    ctx: ToolContext,
+    pattern: Annotated[Optional[str], "Only list names matching this glob, e.g. '*.py'"] = None,
+    sort: Annotated[Literal["name", "size", "mtime"], "Sort order; size and mtime list the largest or newest first"] = "name",
+    reverse: Annotated[bool, "Reverse the sort order"] = False,
+    entry_type: Annotated[Literal["all", "file", "dir", "symlink"], "Only list entries of this type"] = "all",
+    page_size: Annotated[Optional[int], "Maximum number of entries to return"] = None,
+    cursor: Annotated[Optional[str], "Continuation cursor returned by a previous listing"] = None,
+) -> str:
+    """List the contents of the current directory
+
+    Directories are marked with a trailing / and symlinks with @. Sorting by
+    size or mtime also shows each entry's size and modification time. Long
+    listings are returned a page at a time with a cursor to continue from.
+    """
+    try:
+        return list_entries(
+            index, ctx.cwd, pattern, sort, reverse, entry_type, page_size, cursor, ctx.page_chars("list_directory_contents")
+        )
+    except ListingError as e:
+        return str(e)
+
+
+@registry.tool()
+def change_directory(
+    ctx: ToolContext,
+    directory: Annotated[str, "The directory to change to (relative or absolute path)"],
+) -> str:
+    """Change the current directory"""
+    new_directory = ctx.resolve(directory)
+    if index.is_dir(new_directory):
+        return _changed_directory(ctx, new_directory)
+
+    shortcuts = ctx.config["directories"]
+    shortcut = shortcuts.get(directory)
+    if shortcut is not None and index.is_dir(shortcut):
+        return _changed_directory(ctx, shortcut)
+
+    # Resolve typos like "documnets" locally instead of costing another
+    # model round trip. Subdirectories win over shortcuts on a tie.
+    try:
+        subdirectories = index.subdirectories(ctx.cwd)
+    except OSError:
+        subdirectories = []
+    match = fuzzy_match(directory, subdirectories)
+    if match is not None:
+        return _changed_directory(ctx, os.path.join(ctx.cwd, match), matched=directory)
+    match = fuzzy_match(directory, list(shortcuts))
+    if match is not None and index.is_dir(shortcuts[match]):
+        return _changed_directory(ctx, shortcuts[match], matched=directory)
+    return "Invalid directory"
+
+
+@registry.tool(read_only=True)
+def get_current_directory(ctx: ToolContext) -> str:
+    """Get the current working directory"""
+    return ctx.cwd
+
+
+@registry.tool(read_only=True)
+def read_file(
+    ctx: ToolContext,
+    file_path: Annotated[str, "The path to the file to read"],
+    offset: Annotated[Optional[int], "Byte offset to start reading from"] = None,
+    length: Annotated[Optional[int], "Maximum number of bytes to return"] = None,
+    start_line: Annotated[Optional[int], "First line to return (1-based)"] = None,
+    end_line: Annotated[Optional[int], "Last line to return (inclusive)"] = None,
+    mode: Annotated[Literal["head", "tail"], "Read from the start or the end of the file"] = "head",
+    cursor: Annotated[Optional[str], "Continuation cursor returned by a previous read"] = None,
+) -> str:
+    """Read the contents of a file
+
+    Large files are returned a page at a time with a cursor to continue from,
+    and binary files are summarized instead of decoded.
+    """
+    try:
+        return read_text(
+            ctx.resolve(file_path), offset, length, start_line, end_line, mode, cursor, ctx.page_chars("read_file")
+        )
+    except FileNotFoundError:
+        return "File not found"
+    except IsADirectoryError:
+        return "Path is a directory"
+    except ReadError as e:
+        return str(e)
+
+
+@registry.tool()
+def execute_file(
+    ctx: ToolContext,
+    file_path: Annotated[str, "The path to the file to execute"],
+    timeout: Annotated[Optional[int], "Seconds to wait before the process is killed"] = None,
+) -> str:
+    """Execute a file"""
+    full_path = os.path.join(ctx.cwd, file_path)
+    result = run_command(
+        full_path,
+        cwd=ctx.cwd,
+        timeout=timeout or EXECUTE_TIMEOUT,
+        passthrough=True,
+        # Only a local terminal can press space to stop the run.
+        interruptible=ctx.write is None,
+        write=ctx.write,
+    )
+    if result.interrupted:
+        ctx.show(f"\nExecution of {full_path} was interrupted by the user.\n")
+        return f"Execution interrupted by the user.\nOutput: {result.stdout}\nError: {result.stderr}"
+    if result.timed_out:
+        return f"Execution timed out after {timeout or EXECUTE_TIMEOUT}s:\nOutput: {result.stdout}\nError: {result.stderr}"
+    if result.returncode != 0:
+        return f"Error executing file:\nOutput: {result.stdout}\nError: {result.stderr}"
+    return f"File executed successfully:\nOutput: {result.stdout}\nError: {result.stderr}"
+
+
+def _index_note(search_index) -> List[str]:
+    if not search_index.truncated:
+        return []
+    return [f"[only the first {search_index.max_files:,} files under {search_index.root} are indexed; search from a smaller directory]"]
+
+
+@registry.tool(read_only=True)
+def search_files(
+    ctx: ToolContext,
+    pattern: Annotated[str, "Text or regular expression to search file contents for"],
+    regex: Annotated[Optional[bool], "Treat the pattern as a regular expression"] = False,
+    case_sensitive: Annotated[Optional[bool], "Match case exactly"] = False,
+    glob: Annotated[Optional[str], "Only search files whose name matches this glob, e.g. *.py"] = None,
+    max_results: Annotated[Optional[int], "Maximum number of matching lines to return"] = 50,
+) -> str:
+    """Search the contents of files under the current directory and return matching lines with line numbers"""
+    search_index = get_search_index(ctx.cwd)
+    try:
+        matches, total = search_index.search(pattern, ctx.cwd, regex, case_sensitive, glob, max_results or 50)
+    except re.error as e:
+        return f"Invalid regular expression: {e}"
+    lines = [f"{os.path.relpath(m.path, ctx.cwd)}:{m.line_number}: {m.line}" for m in matches] or ["No matches"]
+    if total > len(matches):
+        lines.append(f"[showing {len(matches)} of {total} matching lines]")
+    return "\n".join(lines + _index_note(search_index))
+
+
+@registry.tool(read_only=True)
+def find_files(
+    ctx: ToolContext,
+    pattern: Annotated[str, "File name, part of a name, or glob such as *.md or src/**/test_*.py"],
+    max_results: Annotated[Optional[int], "Maximum number of paths to return"] = 50,
+) -> str:
+    """Find files by name under the current directory"""
+    search_index = get_search_index(ctx.cwd)
+    paths, total = search_index.find(pattern, ctx.cwd, max_results or 50)
+    lines = [os.path.relpath(path, ctx.cwd) for path in paths] or ["No files found"]
+    if total > len(paths):
+        lines.append(f"[showing {len(paths)} of {total} files]")
+    return "\n".join(lines + _index_note(search_index))
+
+
+@registry.tool()
+def start_job(
+    ctx: ToolContext,
+    command: Annotated[str, "The shell command to run in the background"],
+) -> str:
+    """Start a long-running shell command in the background and return a job id to check on later"""
+    job = jobs.start(command, ctx.cwd, ctx.owner)
+    return f"Started job {job.id}: {command}"
+
+
+def _get_job(ctx: ToolContext, job_id: str):
+    job = jobs.get(job_id, ctx.owner)
+    if job is None:
+        raise ValueError(f"No job with id {job_id}")
+    return job
+
+
+@registry.tool(read_only=True)
+def job_status(
+    ctx: ToolContext,
+    job_id: Annotated[Optional[str], "The job to report on; omit to list all jobs"] = None,
+) -> str:
+    """Show the status of background jobs"""
+    if job_id is not None:
+        try:
+            return _get_job(ctx, job_id).describe()
+        except ValueError as e:
+            return str(e)
+    return "\n".join(job.describe() for job in jobs.list(ctx.owner)) or "No jobs"
+
+
+@registry.tool(read_only=True)
+def job_output(
+    ctx: ToolContext,
+    job_id: Annotated[str, "The job whose output to read"],
+    offset: Annotated[Optional[int], "Byte offset to read from, e.g. the next offset of a previous call"] = None,
+    tail_bytes: Annotated[Optional[int], "Number of bytes to return from the end when no offset is given"] = None,
+) -> str:
+    """Read the output of a background job"""
+    try:
+        job = _get_job(ctx, job_id)
+    except ValueError as e:
+        return str(e)
+    text, start, end = jobs.read_output(job, offset, tail_bytes)
+    return f"{text}\n[{job.describe()}; bytes {start}-{end}, next offset={end}]"
+
+
+# Not read-only, though it changes nothing: a wait of minutes would hold
+# one of the few workers other read-only calls in the step need.
+@registry.tool()
+def wait_job(
+    ctx: ToolContext,
+    job_id: Annotated[str, "The job to wait for"],
+    timeout: Annotated[Optional[int], "Seconds to wait at most"] = None,
+) -> str:
+    """Wait for a background job to finish and return the end of its output"""
+    try:
+        job = _get_job(ctx, job_id)
+    except ValueError as e:
+        return str(e)
+    finished = jobs.wait(job, min(timeout or 30, MAX_WAIT_SECONDS))
+    text, _, end = jobs.read_output(job, tail_bytes=4096)
+    prefix = "" if finished else "Still running after the timeout.\n"
+    return f"{prefix}{text}\n[{job.describe()}; next offset={end}]"
+
+
+@registry.tool()
+def kill_job(
+    ctx: ToolContext,
+    job_id: Annotated[str, "The job to stop"],
+) -> str:
+    """Stop a background job"""
+    try:
+        job = _get_job(ctx, job_id)
+    except ValueError as e:
+        return str(e)
+    if not jobs.kill(job):
+        return f"Job {job_id} is not running: {job.describe()}"
+    return f"Killed job {job_id}"
+
+
+def _copy_progress(ctx: ToolContext):
+    return lambda stats: ctx.show(f"\rCopying: {stats.progress()}", sys.stderr)
+
+
+@registry.tool()
+def copy_file_or_directory(
+    ctx: ToolContext,
+    src_path: Annotated[str, "The path to the source file or directory"],
+    dst_path: Annotated[str, "The path to the destination directory"],
+    incremental: Annotated[Optional[bool], "Skip files whose size and modification time already match"] = False,
+    checksum: Annotated[Optional[bool], "With incremental, compare file contents instead of modification times"] = False,
+) -> str:
+    """Copy a file or directory into another directory
+
+    An existing destination directory gets the source under its own name;
+    otherwise the destination is the new path. Symlinks inside a directory
+    are copied as symlinks, and modes and modification times are kept.
+    """
+    src_path = ctx.resolve(src_path)
+    dst_path = ctx.resolve(dst_path)
+    if not os.path.exists(src_path):
+        return "Source file or directory not found"
+    if os.path.isdir(dst_path):
+        dst_path = os.path.join(dst_path, os.path.basename(src_path))
+    if os.path.exists(dst_path) and os.path.samefile(src_path, dst_path):
+        return "Source and destination are the same"
+    if os.path.isdir(src_path) and os.path.abspath(dst_path).startswith(os.path.join(src_path, "")):
+        return "Destination is inside the source directory"
+
+    try:
+        if os.path.isfile(src_path):
+            src_stat = os.stat(src_path)
+            stats = CopyStats()
+            stats.files_total = 1
+            if incremental and is_unchanged(src_path, dst_path, src_stat, checksum):
+                stats.add(False, 0)
+            else:
+                stats.add(True, copy_file(src_path, dst_path, src_stat))
+            stats.finished = time.monotonic()
+        else:
+            stats = copy_tree(src_path, dst_path, incremental, checksum, progress=_copy_progress(ctx))
+            ctx.show("\n", sys.stderr)
+    except FileNotFoundError:
+        return "Source file or directory not found"
+    index.invalidate(os.path.dirname(dst_path))
+    return f"{'Copy finished with errors' if stats.errors else 'Copy successful'}: {stats.summary()}"
+
+
+@registry.tool()
+def remove_file_or_directory(
+    ctx: ToolContext,
+    path: Annotated[str, "The path to the file or directory to remove"],
+) -> str:
+    """Remove a file or directory"""
+    path = ctx.resolve(path)
+    try:
+        trash.remove(path, ctx.owner)
+    except FileNotFoundError:
+        return "File or directory not found"
+    except TrashError as e:
+        return f"Error removing {path}: {e}"
+    return "Removal successful (moved to trash; undo_remove restores it)"
+
+
+@registry.tool()
+def undo_remove(
+    ctx: ToolContext,
+    path: Annotated[Optional[str], "The original path to restore; omit to restore the most recent removal"] = None,
+) -> str:
+    """Restore a file or directory removed with remove_file_or_directory"""
+    try:
+        entry = trash.restore(ctx.resolve(path) if path is not None else None, ctx.owner)
+    except TrashError as e:
+        return str(e)
+    return f"Restored {entry.original}"
+
+
+@registry.tool()
+def read_script_output(
+    ctx: ToolContext,
+    script_path: Annotated[str, "The path to the script to execute"],
+    timeout: Annotated[Optional[int], "Seconds to wait before the script is killed"] = None,
+) -> str:
+    """Read the output of a script"""
+    result = run_command(script_path, cwd=ctx.cwd, timeout=timeout or SCRIPT_TIMEOUT)
+    if result.timed_out:
+        return f"Error executing script: timed out after {timeout or SCRIPT_TIMEOUT}s\n{result.stdout}"
+    if result.interrupted:
+        return f"Error executing script: interrupted\n{result.stdout}"
+    if result.returncode != 0:
+        return f"Error executing script: Command '{script_path}' returned non-zero exit status {result.returncode}.\n{result.stdout}{result.stderr}"
+    return result.stdout
+
+
+@registry.tool()
+def activate_virtual_env(
+    ctx: ToolContext,
+    venv_path: Annotated[str, "The path to the virtual environment"],
+) -> str:
+    """Activate a virtual environment"""
+    try:
+        os.system(f"source {venv_path}/bin/activate")
+        return "Virtual environment activated"
+    except Exception as e:
+        return f"Error activating virtual environment: {str(e)}"
@@ -0,0 +1,255 @@
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from .paths import cache_dir
+
+MAX_TRASH_BYTES = int(os.getenv("JARVIS_TRASH_MAX_BYTES", str(5 * 1024 ** 3)))
+MAX_TRASH_AGE = float(os.getenv("JARVIS_TRASH_MAX_AGE", str(24 * 3600)))
+RECLAIM_INTERVAL = 30.0
+RECLAIM_WORKERS = 4
+
+
+class TrashError(Exception):
+    pass
+
+
+class TrashEntry:
+    def __init__(
+        self,
+        entry_id: str,
+        original: str,
+        location: str,
+        removed_at: float,
+        size: Optional[int] = None,
+        owner: Optional[str] = None,
+    ):
+        self.id = entry_id
+        self.original = original
+        self.location = location
+        self.removed_at = removed_at
+        self.size = size
+        # The daemon session that removed it; None outside the daemon.
+        self.owner = owner
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "original": self.original,
+            "location": self.location,
+            "removed_at": self.removed_at,
+            "size": self.size,
+            "owner": self.owner,
+        }
+
+
+def _mount_point(path: str) -> str:
+    device = os.lstat(path).st_dev
+    while True:
+        parent = os.path.dirname(path)
+        if parent == path or os.lstat(parent).st_dev != device:
+            return path
+        path = parent
+
+
+def _tree_size(path: str) -> int:
+    total = 0
+    stack = [path]
+    while stack:
+        current = stack.pop()
+        try:
+            stat = os.lstat(current)
+        except OSError:
+            continue
+        total += stat.st_size
+        if os.path.isdir(current) and not os.path.islink(current):
+            try:
+                with os.scandir(current) as it:
+                    stack.extend(entry.path for entry in it)
+            except OSError:
+                pass
+    return total
+
+
+def _delete_path(path: str) -> None:
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class Trash:
+    def __init__(
+        self,
+        max_bytes: int = MAX_TRASH_BYTES,
+        max_age: float = MAX_TRASH_AGE,
+        state_dir: Optional[str] = None,
+    ):
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.state_dir = state_dir
+        self._entries: Dict[str, TrashEntry] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._loaded = False
+
+    @property
+    def _state_path(self) -> str:
+        if self.state_dir is None:
+            self.state_dir = cache_dir("trash")
+        return os.path.join(self.state_dir, "index.json")
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self._state_path) as state_file:
+                for item in json.load(state_file):
+                    if os.path.lexists(item["location"]):
+                        self._entries[item["id"]] = TrashEntry(
+                            item["id"], item["original"], item["location"], item["removed_at"],
+                            item.get("size"), item.get("owner"),
+                        )
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError):
+            pass
+
+    def _save(self) -> None:
+        # Unique per thread too: another Trash on the same state directory
+        # may be saving from its reclaim thread.
+        tmp_path = f"{self._state_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as state_file:
+            json.dump([entry.to_dict() for entry in self._entries.values()], state_file)
+        os.replace(tmp_path, self._state_path)
+
+    def _trash_dir_for(self, path: str) -> str:
+        # rename() only works within one filesystem, so pick a trash
+        # directory on the same device as the entry being removed.
+        parent = os.path.dirname(path)
+        device = os.stat(parent).st_dev
+        candidates = [
+            os.path.join(self.state_dir or cache_dir("trash"), "files"),
+            os.path.join(_mount_point(parent), f".jarvis-trash-{os.getuid()}"),
+            os.path.join(parent, ".jarvis-trash"),
+        ]
+        for candidate in candidates:
+            try:
+                os.makedirs(candidate, exist_ok=True)
+                if os.stat(candidate).st_dev == device and os.access(candidate, os.W_OK):
+                    return candidate
+            except OSError:
+                continue
+        raise TrashError(f"No writable trash directory on the filesystem of {path}")
+
+    def _start(self) -> None:
+        # Called with the lock held.
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._reclaim_loop, name="jarvis-trash", daemon=True)
+            self._thread.start()
+
+    def start(self) -> None:
+        with self._lock:
+            self._load()
+            if self._entries:
+                self._start()
+
+    def remove(self, path: str, owner: Optional[str] = None) -> TrashEntry:
+        path = os.path.abspath(path)
+        if not os.path.lexists(path):
+            raise FileNotFoundError(path)
+        with self._lock:
+            self._load()
+            entry_id = uuid.uuid4().hex[:8]
+            location = os.path.join(self._trash_dir_for(path), f"{entry_id}-{os.path.basename(path)}")
+            os.rename(path, location)
+            entry = TrashEntry(entry_id, path, location, time.time(), owner=owner)
+            self._entries[entry_id] = entry
+            self._save()
+            self._start()
+        self._wake.set()
+        return entry
+
+    def restore(self, path: Optional[str] = None, owner: Optional[str] = None) -> TrashEntry:
+        # An owner only gets back its own removals, never another daemon
+        # session's.
+        with self._lock:
+            self._load()
+            candidates = sorted(self._entries.values(), key=lambda e: e.removed_at, reverse=True)
+            if owner is not None:
+                candidates = [e for e in candidates if e.owner == owner]
+            if path is not None:
+                path = os.path.abspath(path)
+                candidates = [e for e in candidates if e.original == path or e.id == os.path.basename(path)]
+            if not candidates:
+                raise TrashError("Nothing in the trash to restore" if path is None else f"{path} is not in the trash")
+            entry = candidates[0]
+            if os.path.lexists(entry.original):
+                raise TrashError(f"{entry.original} already exists")
+            os.makedirs(os.path.dirname(entry.original), exist_ok=True)
+            os.rename(entry.location, entry.original)
+            del self._entries[entry.id]
+            self._save()
+        return entry
+
+    def entries(self) -> List[TrashEntry]:
+        with self._lock:
+            self._load()
+            return sorted(self._entries.values(), key=lambda e: e.removed_at)
+
+    def _delete(self, location: str, pool: ThreadPoolExecutor) -> None:
+        if os.path.isdir(location) and not os.path.islink(location):
+            # Fan the top-level children out over the pool; big trees are
+            # usually wide (node_modules, build output).
+            with os.scandir(location) as it:
+                children = [entry.path for entry in it]
+            list(pool.map(_delete_path, children))
+        _delete_path(location)
+
+    def reclaim(self, everything: bool = False) -> int:
+        for entry in self.entries():
+            if entry.size is None:
+                entry.size = _tree_size(entry.location)
+
+        now = time.time()
+        with self._lock:
+            ordered = sorted(self._entries.values(), key=lambda e: e.removed_at)
+            total = sum(entry.size or 0 for entry in ordered)
+            evict = []
+            for entry in ordered:
+                if everything or now - entry.removed_at > self.max_age or total > self.max_bytes:
+                    evict.append(entry)
+                    total -= entry.size or 0
+            # Once evicted an entry can no longer be restored.
+            for entry in evict:
+                del self._entries[entry.id]
+            self._save()
+
+        with ThreadPoolExecutor(max_workers=RECLAIM_WORKERS, thread_name_prefix="jarvis-reclaim") as pool:
+            for entry in evict:
+                try:
+                    self._delete(entry.location, pool)
+                except OSError:
+                    pass
+        return len(evict)
+
+    def _reclaim_loop(self) -> None:
+        while True:
+            self._wake.wait(RECLAIM_INTERVAL)
+            self._wake.clear()
+            try:
+                self.reclaim()
+            except Exception:
+                pass
+            with self._lock:
+                if not self._entries:
+                    self._thread = None
+                    return
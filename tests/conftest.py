@@ -0,0 +1,52 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+# Metrics are still counted, but no trace files are written.
+os.environ["JARVIS_TRACE"] = "0"
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "stub(statuses, delay): how the stub chat completions server responds")
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    path = tmp_path / "cache"
+    monkeypatch.setenv("JARVIS_CACHE_DIR", str(path))
+    return path
+
+
+@pytest.fixture
+def mock_api(monkeypatch):
+    # A fresh mock API per test. Clients are shared per API key, so each
+    # server gets its own key and with it a client pointed at it.
+    from mock_api import load_sessions, start_server
+
+    server = start_server(load_sessions([os.path.join(ROOT, "benchmarks", "sessions")]))
+    monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+    monkeypatch.setenv("OPENAI_API_KEY", f"sk-test-{server.server_port}")
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def encoder():
+    # The mock API's hashed bag-of-words embedding, computed locally, so
+    # nothing needs a tokenizer download.
+    from semantic_router.encoders import BaseEncoder
+
+    from mock_api import _embedding
+
+    class BagOfWordsEncoder(BaseEncoder):
+        name: str = "bag-of-words"
+        score_threshold: float = 0.5
+
+        def __call__(self, docs):
+            return [_embedding(doc) for doc in docs]
+
+    return BagOfWordsEncoder()
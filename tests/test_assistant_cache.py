@@ -0,0 +1,31 @@
+import json
+
+from jarvis import main_agent
+from jarvis.tools import ToolContext
+
+
+def test_cached_assistant_is_reused(mock_api):
+    first = main_agent.get_assistant_id()
+    second = main_agent.get_assistant_id()
+    assert first == second
+    assert mock_api.state.requests.get("create_assistant") == 1
+
+
+def test_deleted_assistant_is_recreated(mock_api, tmp_path, cache_dir):
+    stale = main_agent.get_assistant_id()
+    main_agent.get_client().beta.assistants.delete(stale)
+
+    output = []
+    context = ToolContext(str(tmp_path))
+    main_agent.run_turn(stale, "Hello Jarvis", context=context, write=output.append)
+    assert "Hello!" in "".join(output)
+
+    with open(cache_dir / "assistants.json") as cache_file:
+        replacement = next(iter(json.load(cache_file).values()))["assistant_id"]
+    assert replacement != stale
+    assert main_agent.get_assistant_id() == replacement
+
+    # Callers still holding the old ID go straight to the replacement.
+    runs = mock_api.state.requests["create_run"]
+    main_agent.run_turn(stale, "Hello Jarvis", context=context, write=output.append)
+    assert mock_api.state.requests["create_run"] == runs + 1
@@ -0,0 +1,140 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import openai
+import pytest
+
+from jarvis import clients, openai_llm
+from jarvis.openai_llm import OpenAILLM
+
+
+class StubServer:
+    # Chat completions only: answers with the scripted statuses in order
+    # (200 once they run out), after an optional delay, and records how
+    # many requests were in flight at once.
+
+    def __init__(self, statuses=(), delay=0.0):
+        self.statuses = list(statuses)
+        self.delay = delay
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub.lock:
+                    stub.requests += 1
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                    status = stub.statuses.pop(0) if stub.statuses else 200
+                try:
+                    time.sleep(stub.delay)
+                    if status == 200:
+                        payload = {
+                            "id": "chatcmpl-stub",
+                            "object": "chat.completion",
+                            "created": int(time.time()),
+                            "model": body["model"],
+                            "choices": [{
+                                "index": 0,
+                                "finish_reason": "stop",
+                                "message": {"role": "assistant", "content": "echo: " + body["messages"][-1]["content"]},
+                            }],
+                        }
+                    else:
+                        payload = {"error": {"message": f"stub {status}", "type": "server_error"}}
+                    data = json.dumps(payload).encode()
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    # Keep the SDK's backoff short.
+                    self.send_header("retry-after-ms", "10")
+                    self.end_headers()
+                    self.wfile.write(data)
+                finally:
+                    with stub.lock:
+                        stub.in_flight -= 1
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}/v1"
+
+
+@pytest.fixture
+def stub(monkeypatch, request):
+    marker = request.node.get_closest_marker("stub")
+    server = StubServer(**(marker.kwargs if marker else {}))
+    monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+    monkeypatch.setenv("OPENAI_API_KEY", f"sk-stub-{server.server.server_port}")
+    yield server
+    server.server.shutdown()
+
+
+def ask(text="hi"):
+    return clients.get_openai_client().chat.completions.create(
+        model="gpt-3.5-turbo", messages=[{"role": "user", "content": text}]
+    )
+
+
+def test_client_is_shared_per_key(stub):
+    assert clients.get_openai_client() is clients.get_openai_client()
+    assert clients.get_openai_client("sk-other") is not clients.get_openai_client()
+
+
+@pytest.mark.stub(statuses=[429, 503, 500])
+def test_rate_limits_and_server_errors_are_retried(stub):
+    assert ask().choices[0].message.content == "echo: hi"
+    assert stub.requests == 4
+
+
+@pytest.mark.stub(statuses=[500] * 10)
+def test_retries_are_bounded(stub):
+    with pytest.raises(openai.InternalServerError):
+        ask()
+    assert stub.requests == clients.MAX_RETRIES + 1
+
+
+@pytest.mark.stub(delay=1.0)
+def test_requests_time_out(stub, monkeypatch):
+    monkeypatch.setattr(clients, "TIMEOUT", 0.2)
+    monkeypatch.setattr(clients, "MAX_RETRIES", 0)
+    start = time.perf_counter()
+    with pytest.raises(openai.APITimeoutError):
+        ask()
+    assert time.perf_counter() - start < 0.9
+
+
+@pytest.mark.stub(delay=0.05)
+def test_batch_concurrency_is_limited(stub, encoder):
+    llm = OpenAILLM(encoder=encoder)
+    prompts = [[{"role": "user", "content": f"prompt {i}"}] for i in range(12)]
+    replies = llm.generate_batch(prompts, concurrency=3)
+    assert replies == [f"echo: prompt {i}" for i in range(12)]
+    assert stub.requests == 12
+    assert stub.max_in_flight == 3
+
+
+@pytest.mark.stub()
+def test_batch_closes_its_async_clients(stub, encoder, monkeypatch):
+    created = []
+
+    def tracked(api_key=None):
+        client = clients.get_async_openai_client(api_key)
+        created.append(client)
+        return client
+
+    monkeypatch.setattr(openai_llm, "get_async_openai_client", tracked)
+    llm = OpenAILLM(encoder=encoder)
+    llm.generate_batch([[{"role": "user", "content": "hi"}]] * 2)
+    assert created and all(client.is_closed() for client in created)
@@ -0,0 +1,38 @@
+from jarvis.compactor import compact, compact_tool_output, estimate_tokens, tool_budget
+
+
+def test_small_output_is_untouched():
+    assert compact("a\nb\n", 100) == "a\nb\n"
+
+
+def test_lines_are_trimmed_and_summarized():
+    text = "\n".join(f"src/file{i}.py:1: match" for i in range(500))
+    output = compact(text, 200)
+    assert estimate_tokens(output) <= 220
+    assert output.startswith("src/file0.py:1: match\n")
+    assert "more .py files]" in output.splitlines()[-1]
+
+
+def test_listing_entries_are_summarized_by_extension():
+    text = ", ".join([f"n{i}.log" for i in range(400)] + ["dir/"] * 10)
+    output = compact(text, 100)
+    assert output.splitlines()[0].startswith("n0.log, n1.log")
+    assert "more .log files" in output and "more directories" in output
+
+
+def test_plain_footer_is_kept():
+    text = "\n".join("x" * 50 for _ in range(100)) + "\n[lines 1-100 of 5000 bytes]"
+    assert compact(text, 200).endswith("\n[lines 1-100 of 5000 bytes]")
+
+
+def test_stale_cursor_footer_is_dropped():
+    text = "\n".join("x" * 50 for _ in range(100)) + "\n[bytes 0-5100 of 9000 bytes; continue with cursor=abc]"
+    output = compact(text, 200)
+    assert "cursor=abc" not in output
+    assert "smaller page" in output.splitlines()[-1]
+
+
+def test_tool_budgets():
+    assert tool_budget("read_file") == 20000
+    assert tool_budget("search_files", {"search_files": 10}) == 10
+    assert compact_tool_output("search_files", "y\n" * 100, {"search_files": 10}).count("\n") < 30
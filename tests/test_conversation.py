@@ -0,0 +1,54 @@
+import pytest
+
+from jarvis import main_agent
+from jarvis.conversation import Conversation, state_header
+from jarvis.intent_router import IntentRouter
+from jarvis.tools import ToolContext, index, registry
+
+
+def test_failed_turn_moves_the_session_to_a_reseeded_thread(mock_api, tmp_path):
+    assistant_id = main_agent.get_assistant_id()
+    conversation = Conversation(ToolContext(str(tmp_path)))
+    output = []
+    main_agent.run_session_turn(assistant_id, conversation, "Where am I?", write=output.append)
+    stuck = conversation.thread_id
+
+    def broken(text):
+        raise RuntimeError("client went away")
+
+    with pytest.raises(RuntimeError):
+        main_agent.run_session_turn(assistant_id, conversation, "What files are here?", write=broken)
+    assert conversation.thread_id is None
+
+    main_agent.run_session_turn(assistant_id, conversation, "What files are here?", write=output.append)
+    assert conversation.thread_id not in (None, stuck)
+    seeded = mock_api.state.threads[conversation.thread_id]
+    assert seeded[0] == {"role": "user", "content": "Where am I?"}
+    assert "There is a README.md" in "".join(output)
+
+
+def test_fast_path_results_reach_the_state_header(tmp_path):
+    (tmp_path / "notes.txt").write_text("todo")
+    (tmp_path / "logs").mkdir()
+    context = ToolContext(str(tmp_path))
+    router = IntentRouter(registry, index)
+
+    assert router.handle(context, "ls") == "logs/, notes.txt"
+    assert router.handle(context, "cd logs").startswith("Changed current directory")
+    header = state_header(context)
+    assert f"cwd: {tmp_path / 'logs'}" in header
+    assert "list_directory_contents() -> logs/, notes.txt" in header
+    assert "change_directory(directory=logs)" in header
+
+
+def test_state_header_is_only_sent_when_it_changes(tmp_path):
+    context = ToolContext(str(tmp_path))
+    conversation = Conversation(context)
+    assert conversation.message("hi").startswith("[Session state]")
+    conversation.thread_id = "thread"
+    assert conversation.message("again") == "again"
+
+    context.remember("get_current_directory", "{}", str(tmp_path), str(tmp_path))
+    assert conversation.message("now").startswith("[Session state]")
+    conversation.compact()
+    assert conversation.message("new thread").startswith("[Session state]")
@@ -0,0 +1,54 @@
+import os
+
+from jarvis.copy_engine import copy_file, copy_tree, is_unchanged
+
+
+def make_tree(root, files):
+    for name, content in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+
+
+def test_copy_file_keeps_content_and_mtime(tmp_path):
+    src, dst = tmp_path / "src.bin", tmp_path / "dst.bin"
+    src.write_bytes(os.urandom(300_000))
+    os.utime(src, (1_600_000_000, 1_600_000_000))
+    assert copy_file(str(src), str(dst)) == 300_000
+    assert dst.read_bytes() == src.read_bytes()
+    assert int(dst.stat().st_mtime) == 1_600_000_000
+
+
+def test_copy_tree_copies_nested_files_and_symlinks(tmp_path):
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    make_tree(src, {"a.txt": b"a", "sub/b.txt": b"bb", "sub/deeper/c.txt": b"ccc"})
+    os.symlink("a.txt", src / "link")
+
+    stats = copy_tree(str(src), str(dst), workers=4)
+    assert stats.errors == []
+    assert (stats.files_total, stats.files_copied, stats.bytes_copied) == (3, 3, 6)
+    assert (dst / "sub" / "deeper" / "c.txt").read_bytes() == b"ccc"
+    assert os.readlink(dst / "link") == "a.txt"
+
+
+def test_incremental_copy_skips_unchanged_files(tmp_path):
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    make_tree(src, {"a.txt": b"same", "b.txt": b"old"})
+    copy_tree(str(src), str(dst))
+
+    (src / "b.txt").write_bytes(b"newer")
+    stats = copy_tree(str(src), str(dst), incremental=True)
+    assert (stats.files_copied, stats.files_skipped) == (1, 1)
+    assert (dst / "b.txt").read_bytes() == b"newer"
+    assert "skipped 1 unchanged" in stats.summary()
+
+
+def test_checksum_catches_same_size_and_mtime(tmp_path):
+    src, dst = tmp_path / "src.txt", tmp_path / "dst.txt"
+    src.write_bytes(b"abc")
+    dst.write_bytes(b"xyz")
+    os.utime(src, (1_600_000_000, 1_600_000_000))
+    os.utime(dst, (1_600_000_000, 1_600_000_000))
+    src_stat = os.stat(src)
+    assert is_unchanged(str(src), str(dst), src_stat, checksum=False)
+    assert not is_unchanged(str(src), str(dst), src_stat, checksum=True)
@@ -0,0 +1,72 @@
+import asyncio
+import os
+import socket
+import threading
+
+import pytest
+
+from jarvis.daemon import Daemon, DaemonRunning, serve
+
+
+def start(daemon, path):
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    task = loop.create_task(serve(daemon, path, ready.set))
+
+    def run():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+        loop.close()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert ready.wait(5)
+
+    def stop():
+        loop.call_soon_threadsafe(task.cancel)
+        thread.join(5)
+        daemon.shutdown()
+
+    return stop
+
+
+def test_serve_replaces_a_stale_socket(tmp_path):
+    path = str(tmp_path / "d.sock")
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(path)
+    stale.close()
+
+    stop = start(Daemon("asst", {"directories": {}}), path)
+    try:
+        with socket.socket(socket.AF_UNIX) as client:
+            client.connect(path)
+    finally:
+        stop()
+    assert not os.path.exists(path)
+
+
+def test_serve_leaves_a_running_daemon_alone(tmp_path):
+    path = str(tmp_path / "d.sock")
+    stop = start(Daemon("asst", {"directories": {}}), path)
+    try:
+        with pytest.raises(DaemonRunning):
+            asyncio.run(serve(Daemon("asst", {"directories": {}}), path))
+        with socket.socket(socket.AF_UNIX) as client:
+            client.connect(path)
+    finally:
+        stop()
+
+
+def test_a_busy_session_is_not_evicted(tmp_path):
+    daemon = Daemon("asst", {"directories": {}}, max_sessions=1)
+    busy = daemon.session(None, str(tmp_path))
+    busy.active += 1
+    other = daemon.session(None, str(tmp_path))
+    assert set(daemon.sessions) == {busy.id, other.id}
+
+    busy.active -= 1
+    daemon.session(None, str(tmp_path))
+    assert busy.id not in daemon.sessions
+    daemon.shutdown()
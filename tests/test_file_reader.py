@@ -0,0 +1,89 @@
+import os
+import re
+
+import pytest
+
+from jarvis.file_reader import ReadError, read_text
+
+
+def cursor_of(output):
+    match = re.search(r"cursor=([\w-]+)\]$", output)
+    return match.group(1) if match else None
+
+
+def test_cursor_pages_through_the_whole_file(tmp_path):
+    path = tmp_path / "big.log"
+    lines = [f"line {i}\n" for i in range(2000)]
+    path.write_text("".join(lines))
+
+    pages, cursor = [], None
+    while True:
+        output = read_text(str(path), length=1000, cursor=cursor)
+        cursor = cursor_of(output)
+        pages.append(output.rsplit("[", 1)[0])
+        if cursor is None:
+            break
+    assert len(pages) > 2
+    # Pages break after a newline, so nothing is split or lost.
+    assert "".join(pages) == "".join(lines)
+
+
+def test_changed_file_rejects_the_cursor(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("x\n" * 1000)
+    cursor = cursor_of(read_text(str(path), length=100))
+    assert cursor
+
+    with open(path, "a") as file:
+        file.write("more\n")
+    with pytest.raises(ReadError, match="changed"):
+        read_text(str(path), cursor=cursor)
+    with pytest.raises(ReadError, match="Invalid"):
+        read_text(str(path), cursor="not-a-cursor")
+
+
+def test_line_range_and_tail(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("".join(f"{i}\n" for i in range(1, 101)))
+
+    output = read_text(str(path), start_line=10, end_line=12)
+    assert output.startswith("10\n11\n12\n[lines 10-12 of")
+    assert "cursor=" not in output
+
+    tail = read_text(str(path), mode="tail", length=20)
+    assert tail.split("\n[")[0].endswith("100")
+
+
+def test_small_and_binary_files(tmp_path):
+    path = tmp_path / "small.txt"
+    path.write_text("hello\n")
+    assert read_text(str(path)) == "hello\n"
+
+    binary = tmp_path / "blob.bin"
+    binary.write_bytes(b"\x00\x01\x02" * 100)
+    assert "binary" in read_text(str(binary)).lower()
+
+
+def test_line_range_cursor_stops_at_end_line(tmp_path):
+    path = tmp_path / "a.txt"
+    lines = [f"line {i}\n" for i in range(1, 2001)]
+    path.write_text("".join(lines))
+
+    pages, cursor = [], None
+    output = read_text(str(path), start_line=1, end_line=900, max_bytes=100)
+    while True:
+        pages.append(output.rsplit("[", 1)[0])
+        cursor = cursor_of(output)
+        if cursor is None:
+            break
+        output = read_text(str(path), cursor=cursor, max_bytes=100)
+    assert "".join(pages) == "".join(lines[:900])
+    assert re.search(r"\[lines \d+-900 of \d+ bytes\]$", output)
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/status"), reason="needs /proc")
+def test_pseudo_files_are_read_despite_a_zero_size(tmp_path):
+    assert os.stat("/proc/self/status").st_size == 0
+    assert read_text("/proc/self/status").startswith("Name:")
+    (tmp_path / "empty.txt").touch()
+    assert read_text(str(tmp_path / "empty.txt")) == ""
@@ -0,0 +1,22 @@
+from jarvis.intent_router import DEFAULT_THRESHOLD, IntentRouter
+from jarvis.tool_registry import ToolRegistry
+from jarvis.tools import ToolContext, index, registry
+
+
+def test_embedding_threshold_never_drops_below_the_routing_threshold():
+    assert IntentRouter(registry, index).embedding_threshold == DEFAULT_THRESHOLD
+    assert IntentRouter(registry, index, embedding_threshold=0.5).embedding_threshold == DEFAULT_THRESHOLD
+    assert IntentRouter(registry, index, threshold=0.5, embedding_threshold=0.8).embedding_threshold == 0.8
+
+
+def test_a_failing_tool_falls_back_to_the_model(tmp_path):
+    broken = ToolRegistry()
+
+    @broken.tool(read_only=True)
+    def get_current_directory(ctx) -> str:
+        """Get the current working directory"""
+        raise PermissionError("cwd vanished")
+
+    router = IntentRouter(broken, index)
+    assert router.handle(ToolContext(str(tmp_path)), "pwd") is None
+    assert router.counters["tool_errors"] == 1 and router.counters["fast_path"] == 0
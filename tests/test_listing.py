@@ -0,0 +1,76 @@
+import re
+
+import pytest
+
+from jarvis.compactor import compact_tool_output
+from jarvis.fs_index import DirectoryIndex
+from jarvis.listing import ListingError, list_entries
+from jarvis.tools import ToolContext, list_directory_contents, read_file
+
+
+def cursor_of(output):
+    match = re.search(r"cursor=([\w-]+)\]$", output)
+    return match.group(1) if match else None
+
+
+def names(output):
+    return [name for name in output.split("\n[")[0].split(", ") if name]
+
+
+@pytest.fixture
+def directory(tmp_path):
+    for i in range(50):
+        (tmp_path / f"file{i:02}.txt").write_text("x" * i)
+    (tmp_path / "sub").mkdir()
+    return tmp_path
+
+
+def test_cursor_pages_through_every_entry(directory):
+    index = DirectoryIndex(use_inotify=False)
+    seen, cursor = [], None
+    while True:
+        output = list_entries(index, str(directory), page_size=7, cursor=cursor)
+        seen += names(output)
+        cursor = cursor_of(output)
+        if cursor is None:
+            break
+    assert seen == ["file%02d.txt" % i for i in range(50)] + ["sub/"]
+
+
+def test_cursor_is_bound_to_its_query(directory):
+    index = DirectoryIndex(use_inotify=False)
+    cursor = cursor_of(list_entries(index, str(directory), page_size=10))
+    with pytest.raises(ListingError, match="different listing"):
+        list_entries(index, str(directory), sort="size", cursor=cursor)
+
+
+def test_pages_shrink_to_fit_max_chars(directory):
+    index = DirectoryIndex(use_inotify=False)
+    output = list_entries(index, str(directory), max_chars=100)
+    assert 1 < len(names(output)) < 10
+    assert cursor_of(output)
+
+
+def paged(tool, ctx, **kwargs):
+    # Calls a paged tool and compacts its output the way the agent does.
+    seen, cursor = "", None
+    while True:
+        output = compact_tool_output(tool.__name__, tool(ctx, cursor=cursor, **kwargs), ctx.config["tool_budgets"])
+        assert "cut short" not in output
+        seen += output.rsplit("\n[", 1)[0] + "\n"
+        cursor = cursor_of(output)
+        if cursor is None:
+            return seen
+
+
+def test_tool_pages_fit_the_budget_so_cursors_reach_everything(tmp_path):
+    lines = "".join(f"line {i:05}\n" for i in range(5000))
+    (tmp_path / "big.txt").write_text(lines)
+    ctx = ToolContext(str(tmp_path), {"directories": {}, "tool_budgets": {"read_file": 500}})
+    assert paged(read_file, ctx, file_path="big.txt") == lines
+
+    for i in range(300):
+        (tmp_path / f"entry-with-a-long-name-{i:03}.txt").touch()
+    ctx.config["tool_budgets"]["list_directory_contents"] = 300
+    listed = paged(list_directory_contents, ctx).replace("\n", ", ").split(", ")
+    assert len([name for name in listed if name.startswith("entry-")]) == 300
@@ -0,0 +1,35 @@
+import json
+
+from jarvis.openai_llm import OpenAILLM
+from jarvis.prompts import extraction_prompt
+from jarvis.tools import registry
+
+CHANGE_DIRECTORY = registry.get("change_directory").schema["function"]
+
+
+def extraction_key(query):
+    return extraction_prompt(json.dumps(CHANGE_DIRECTORY, sort_keys=True, separators=(",", ":")), query)
+
+
+def test_semantic_cache_is_not_used_for_extraction(mock_api, encoder):
+    mock_api.state.completions.update({
+        extraction_key("go to documents"): '{"directory": "documents"}',
+        extraction_key("go to downloads"): '{"directory": "downloads"}',
+    })
+    llm = OpenAILLM(encoder=encoder, semantic_cache=True)
+    # Any embedding would count as a near duplicate.
+    llm.cache.similarity_threshold = -1.0
+
+    assert llm.extract_function_inputs("go to documents", "change_directory") == {"directory": "documents"}
+    assert llm.extract_function_inputs("go to downloads", "change_directory") == {"directory": "downloads"}
+    assert llm.extract_function_inputs("go to documents", "change_directory") == {"directory": "documents"}
+    assert mock_api.state.requests["chat_completion"] == 2
+
+
+def test_semantic_cache_serves_near_duplicate_text(mock_api, encoder):
+    llm = OpenAILLM(encoder=encoder, semantic_cache=True)
+    llm.cache.similarity_threshold = -1.0
+    first = llm.generate_text([{"role": "user", "content": "Say hello"}])
+    second = llm.generate_text([{"role": "user", "content": "Say hello please"}])
+    assert first == second == "Hello!"
+    assert mock_api.state.requests["chat_completion"] == 1
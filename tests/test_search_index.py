@@ -0,0 +1,62 @@
+from jarvis.search_index import SearchIndex
+
+
+def make_index(tmp_path, files):
+    root = tmp_path / "project"
+    for name, content in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+    return SearchIndex(str(root), str(tmp_path / "index.sqlite3")), root
+
+
+def test_case_insensitive_search_finds_non_ascii_matches(tmp_path):
+    index, root = make_index(tmp_path, {"fruit.txt": "Der Äpfelbaum blüht\n", "other.txt": "nothing here\n"})
+    matches, total = index.search("äpfelbaum")
+    assert total == 1
+    assert matches[0].path == str(root / "fruit.txt")
+    assert matches[0].line_number == 1
+
+
+def test_case_sensitive_search_still_filters(tmp_path):
+    index, _ = make_index(tmp_path, {"a.py": "def Main():\n    pass\n"})
+    assert index.search("def main", case_sensitive=True)[1] == 0
+    assert index.search("def Main", case_sensitive=True)[1] == 1
+    assert index.search("DEF MAIN")[1] == 1
+
+
+def test_regex_literals_narrow_candidates(tmp_path):
+    index, root = make_index(tmp_path, {"a.log": "ERROR 42 failed\n", "b.log": "INFO 42 ok\n"})
+    matches, total = index.search(r"error \d+ FAILED", regex=True)
+    assert total == 1
+    assert matches[0].path == str(root / "a.log")
+
+
+def test_changed_files_are_reindexed(tmp_path):
+    index, root = make_index(tmp_path, {"notes.txt": "old text\n"})
+    assert index.search("new text")[1] == 0
+    (root / "notes.txt").write_text("brand new text\n", encoding="utf-8")
+    index.refresh(force=True)
+    assert index.search("new text")[1] == 1
+
+
+def test_leading_slash_anchors_gitignore_patterns(tmp_path):
+    files = {
+        ".gitignore": "/build/\nout/\n",
+        "build/a.txt": "needle\n",
+        "sub/build/b.txt": "needle\n",
+        "out/c.txt": "needle\n",
+        "sub/out/d.txt": "needle\n",
+    }
+    index, root = make_index(tmp_path, files)
+    paths = {match.path for match in index.search("needle")[0]}
+    assert paths == {str(root / "sub" / "build" / "b.txt")}
+
+
+def test_walk_stops_at_max_files(tmp_path):
+    index, root = make_index(tmp_path, {f"d{i}/f.txt": "needle\n" for i in range(5)} | {"top.txt": "needle\n"})
+    assert not index.truncated
+    capped = SearchIndex(str(root), str(tmp_path / "capped.sqlite3"), max_files=2)
+    matches, total = capped.search("needle")
+    assert capped.truncated and total == 2
+    assert str(root / "top.txt") in {match.path for match in matches}
@@ -0,0 +1,29 @@
+import json
+
+from jarvis.tools import ToolContext, registry
+
+
+def test_optional_parameters_accept_null(tmp_path):
+    (tmp_path / "README.md").write_text("hello\n")
+    (tmp_path / "a.py").write_text("")
+    ctx = ToolContext(str(tmp_path))
+
+    arguments = {"file_path": "README.md", "offset": None, "length": None, "cursor": None}
+    assert registry.call(ctx, "read_file", json.dumps(arguments)) == "hello\n"
+    assert registry.call(ctx, "list_directory_contents", '{"pattern": null, "page_size": null}') == "a.py, README.md"
+
+
+def test_optional_schemas_are_nullable_and_others_are_not():
+    properties = registry.get("read_file").parameters["properties"]
+    assert properties["offset"]["type"] == ["integer", "null"]
+    assert properties["file_path"]["type"] == "string"
+    assert properties["mode"]["type"] == "string"
+
+    ctx = ToolContext("/")
+    output = registry.call(ctx, "read_file", '{"file_path": null}')
+    assert output.startswith("Invalid arguments for read_file")
+
+
+def test_wait_job_stays_off_the_read_only_pool():
+    assert registry.is_read_only("job_status")
+    assert not registry.is_read_only("wait_job")
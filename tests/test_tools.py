@@ -0,0 +1,88 @@
+import os
+import stat
+
+from jarvis.tools import (
+    ToolContext,
+    copy_file_or_directory,
+    execute_file,
+    job_status,
+    jobs,
+    kill_job,
+    remove_file_or_directory,
+    start_job,
+    undo_remove,
+)
+
+
+def make_script(path, body):
+    path.write_text(f"#!/bin/sh\n{body}\n")
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+
+
+def test_execute_file_streams_to_the_context_writer(tmp_path, capsys):
+    make_script(tmp_path / "hello.sh", "echo 'héllo'; echo oops >&2")
+    written = []
+    ctx = ToolContext(str(tmp_path), write=written.append)
+
+    output = execute_file(ctx, "hello.sh")
+    assert output.startswith("File executed successfully")
+    assert "héllo\n" in "".join(written) and "oops\n" in "".join(written)
+    assert capsys.readouterr() == ("", "")
+
+
+def test_copy_progress_goes_to_the_context_writer(tmp_path, capsys):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "a.txt").write_text("a")
+    written = []
+    ctx = ToolContext(str(tmp_path), write=written.append)
+
+    assert copy_file_or_directory(ctx, "src", "dst").startswith("Copy successful")
+    assert any(text.startswith("\rCopying: 1/1 files") for text in written)
+    assert os.path.exists(tmp_path / "dst" / "a.txt")
+    assert capsys.readouterr() == ("", "")
+
+
+def test_jobs_and_trash_are_scoped_to_their_session(tmp_path):
+    first = ToolContext(str(tmp_path), owner="first")
+    second = ToolContext(str(tmp_path), owner="second")
+    try:
+        job_id = start_job(first, "true").split()[2].rstrip(":")
+        assert job_status(second) == "No jobs"
+        assert kill_job(second, job_id) == f"No job with id {job_id}"
+        assert job_status(first).startswith(f"job {job_id} ")
+    finally:
+        jobs.shutdown()
+
+    (tmp_path / "mine.txt").write_text("first")
+    (tmp_path / "theirs.txt").write_text("second")
+    remove_file_or_directory(first, "mine.txt")
+    remove_file_or_directory(second, "theirs.txt")
+    assert undo_remove(first) == f"Restored {tmp_path / 'mine.txt'}"
+    assert not (tmp_path / "theirs.txt").exists()
+    assert undo_remove(first).startswith("Nothing in the trash")
+    assert undo_remove(second, "theirs.txt") == f"Restored {tmp_path / 'theirs.txt'}"
+
+
+def test_directories_are_copied_into_an_existing_destination(tmp_path):
+    src = tmp_path / "src"
+    (src / "inner").mkdir(parents=True)
+    (src / "inner" / "a.txt").write_text("a")
+    os.symlink("inner/a.txt", src / "link")
+    (src / "inner").chmod(0o750)
+    os.utime(src / "inner", (1_600_000_000, 1_600_000_000))
+    (tmp_path / "backup").mkdir()
+    ctx = ToolContext(str(tmp_path), write=lambda text: None)
+
+    assert copy_file_or_directory(ctx, "src", "backup").startswith("Copy successful")
+    copied = tmp_path / "backup" / "src"
+    assert (copied / "inner" / "a.txt").read_text() == "a"
+    # Symlinks stay symlinks; directory modes and times are kept.
+    assert os.readlink(copied / "link") == "inner/a.txt"
+    assert stat.S_IMODE((copied / "inner").stat().st_mode) == 0o750
+    assert int((copied / "inner").stat().st_mtime) == 1_600_000_000
+
+    # A file source behaves the same way.
+    (tmp_path / "notes.txt").write_text("n")
+    copy_file_or_directory(ctx, "notes.txt", "backup")
+    assert (tmp_path / "backup" / "notes.txt").read_text() == "n"
@@ -0,0 +1,104 @@
+import os
+
+import pytest
+
+from jarvis.trash import Trash, TrashError
+
+
+def make_trash(tmp_path, **kwargs):
+    state_dir = tmp_path / "state"
+    state_dir.mkdir()
+    return Trash(state_dir=str(state_dir), **kwargs)
+
+
+def test_remove_then_restore_round_trips(tmp_path):
+    trash = make_trash(tmp_path)
+    path = tmp_path / "notes.txt"
+    path.write_text("keep me")
+
+    entry = trash.remove(str(path))
+    assert not path.exists()
+    assert [e.id for e in trash.entries()] == [entry.id]
+
+    assert trash.restore(str(path)).id == entry.id
+    assert path.read_text() == "keep me"
+    assert trash.entries() == []
+
+
+def test_restore_without_path_takes_the_newest(tmp_path):
+    trash = make_trash(tmp_path)
+    first, second = tmp_path / "first.txt", tmp_path / "second.txt"
+    first.write_text("1")
+    second.write_text("2")
+    trash.remove(str(first))
+    trash.remove(str(second))
+
+    assert trash.restore().original == str(second)
+    assert second.exists() and not first.exists()
+
+
+def test_restore_errors(tmp_path):
+    trash = make_trash(tmp_path)
+    with pytest.raises(TrashError):
+        trash.restore()
+
+    path = tmp_path / "a.txt"
+    path.write_text("old")
+    trash.remove(str(path))
+    path.write_text("new")
+    with pytest.raises(TrashError, match="already exists"):
+        trash.restore(str(path))
+
+
+def test_entries_survive_a_restart(tmp_path):
+    trash = make_trash(tmp_path)
+    path = tmp_path / "dir"
+    (path / "inner").mkdir(parents=True)
+    trash.remove(str(path))
+
+    reloaded = Trash(state_dir=trash.state_dir)
+    assert [e.original for e in reloaded.entries()] == [str(path)]
+    reloaded.restore(str(path))
+    assert (path / "inner").is_dir()
+
+
+def test_reclaim_deletes_over_budget_and_everything(tmp_path):
+    trash = make_trash(tmp_path, max_bytes=5)
+    for name in ("old.bin", "new.bin"):
+        (tmp_path / name).write_bytes(b"x" * 4)
+        trash.remove(str(tmp_path / name))
+
+    # Over the byte budget: the oldest entry goes first. remove() also wakes
+    # the background reclaimer, so only the outcome is checked here.
+    trash.reclaim()
+    assert [e.original for e in trash.entries()] == [str(tmp_path / "new.bin")]
+
+    location = trash.entries()[0].location
+    assert trash.reclaim(everything=True) == 1
+    assert trash.entries() == []
+    assert not os.path.lexists(location)
+
+
+def test_restore_without_path_only_sees_the_owners_entries(tmp_path):
+    trash = make_trash(tmp_path)
+    mine, theirs = tmp_path / "mine.txt", tmp_path / "theirs.txt"
+    mine.write_text("1")
+    theirs.write_text("2")
+    trash.remove(str(mine), owner="a")
+    trash.remove(str(theirs), owner="b")
+
+    assert trash.restore(owner="a").original == str(mine)
+    with pytest.raises(TrashError):
+        trash.restore(owner="a")
+    assert Trash(state_dir=trash.state_dir).restore(owner="b").original == str(theirs)
+
+
+def test_restore_by_path_is_scoped_to_the_owner(tmp_path):
+    trash = make_trash(tmp_path)
+    path = tmp_path / "secret.txt"
+    path.write_text("mine")
+    trash.remove(str(path), owner="a")
+
+    with pytest.raises(TrashError, match="not in the trash"):
+        trash.restore(str(path), owner="b")
+    assert trash.restore(str(path), owner="a").original == str(path)